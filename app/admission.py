@@ -0,0 +1,173 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Admission control in front of the API routes. Each request is classed as a
+write (any non-GET), a heavy analytics read or a cheap read; each class has
+its own concurrency limit (APP_ADMIT_READ / _ANALYTICS / _WRITE) and a
+bounded wait queue (APP_ADMIT_QUEUE). A request that finds the queue full,
+or waits longer than APP_ADMIT_WAIT_MS, is answered 503 with Retry-After at
+once instead of slowing every other request down. APP_ADMISSION=0 disables it.
+"""
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.config import (
+    PROBE_PATHS,
+    get_admission_limit,
+    get_admission_queue,
+    get_admission_wait_ms,
+    is_admission_enabled,
+)
+
+REQUEST_CLASSES = ("read", "analytics", "write")
+# GET routes served by the analytics lane.
+ANALYTICS_PREFIXES = (
+    "/api/domains",
+    "/api/assessment-trends",
+    "/api/portfolio",
+    "/api/evolution",
+    "/api/asset-coverage",
+    "/api/practices/",
+)
+ANALYTICS_SUFFIXES = ("/asset-rollup",)
+# Probes and operator routes stay reachable while the API is saturated.
+EXEMPT_PREFIXES = PROBE_PATHS + ("/api/admin/",)
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Request class of an API call, or None when it is not admission-controlled."""
+    index = path.find("/api/")
+    if index < 0:
+        return None
+    api_path = path[index:]
+    if api_path.startswith(EXEMPT_PREFIXES):
+        return None
+    if method in WRITE_METHODS:
+        return "write"
+    if api_path.startswith(ANALYTICS_PREFIXES) or api_path.endswith(ANALYTICS_SUFFIXES):
+        return "analytics"
+    return "read"
+
+
+class AdmissionClass:
+    def __init__(self, name: str, limit: int, queue_limit: int) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._stats = {"admitted": 0, "queued": 0, "shed": 0, "timed_out": 0, "max_waiting": 0}
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._stats["admitted"] += 1
+            return True
+        if len(self._waiters) >= self.queue_limit or timeout <= 0:
+            self._stats["shed"] += 1
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        self._stats["max_waiting"] = max(self._stats["max_waiting"], len(self._waiters))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended: pass it on.
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            self._stats["timed_out"] += 1
+            return False
+        self._stats["admitted"] += 1
+        return True
+
+    def release(self) -> None:
+        # The slot goes straight to the oldest live waiter; active is unchanged.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update(
+            {
+                "limit": self.limit,
+                "queue_limit": self.queue_limit,
+                "active": self.active,
+                "waiting": len(self._waiters),
+            }
+        )
+        return stats
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        queue_limit: Optional[int] = None,
+        wait_ms: Optional[float] = None,
+    ) -> None:
+        limits = limits or {}
+        queue_limit = get_admission_queue() if queue_limit is None else queue_limit
+        self.wait_seconds = (get_admission_wait_ms() if wait_ms is None else wait_ms) / 1000
+        self.classes = {
+            name: AdmissionClass(name, limits.get(name) or get_admission_limit(name), queue_limit)
+            for name in REQUEST_CLASSES
+        }
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.wait_seconds))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": is_admission_enabled(),
+            "wait_ms": round(self.wait_seconds * 1000, 1),
+            "classes": {name: admission.stats() for name, admission in self.classes.items()},
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+        self.enabled = is_admission_enabled()
+
+    async def __call__(self, scope, receive, send) -> None:
+        request_class = None
+        if self.enabled and scope["type"] == "http":
+            request_class = classify(scope["method"], scope["path"])
+        if request_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        admission = self.controller.classes[request_class]
+        if not await admission.acquire(self.controller.wait_seconds):
+            response = JSONResponse(
+                {"detail": "server busy, retry later", "class": request_class},
+                status_code=503,
+                headers={"Retry-After": str(self.controller.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
@@ -0,0 +1,212 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Audit payload storage. In "delta" mode an update keeps the full after-image
+in new_data and only the previous values of the changed fields in old_data;
+payloads above COMPRESS_THRESHOLD bytes are stored as zlib BLOBs. Readers go
+through decode_audit_pair(), which rebuilds full before/after views for both
+formats.
+
+Usage: python -m app.audit [--convert] [--chunk-size N]
+"""
+
+import argparse
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.config import AUDIT_STORAGE_MODES, get_audit_storage_mode
+
+DELTA_KEY = "$delta"
+COMPRESS_THRESHOLD = 256
+COMPRESS_LEVEL = 6
+
+Raw = Union[str, bytes, None]
+
+
+def serialize_full(payload: Optional[Dict[str, Any]]) -> Optional[str]:
+    if payload is None:
+        return None
+    return json.dumps(payload, ensure_ascii=True, sort_keys=True)
+
+
+def _pack(payload: Dict[str, Any]) -> Union[str, bytes]:
+    text = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    data = text.encode("utf-8")
+    if len(data) < COMPRESS_THRESHOLD:
+        return text
+    packed = zlib.compress(data, COMPRESS_LEVEL)
+    return packed if len(packed) < len(data) else text
+
+
+def decode_payload(raw: Raw) -> Optional[Dict[str, Any]]:
+    if raw is None:
+        return None
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = zlib.decompress(bytes(raw)).decode("utf-8")
+    return json.loads(raw)
+
+
+def encode_audit_pair(
+    old_data: Optional[Dict[str, Any]],
+    new_data: Optional[Dict[str, Any]],
+    mode: Optional[str] = None,
+) -> Tuple[Raw, Raw]:
+    if (mode or get_audit_storage_mode()) == "full":
+        return serialize_full(old_data), serialize_full(new_data)
+    if old_data is not None and new_data is not None:
+        changed = {
+            key: value
+            for key, value in old_data.items()
+            if key not in new_data or new_data[key] != value
+        }
+        removed = [key for key in new_data if key not in old_data]
+        delta: Dict[str, Any] = {DELTA_KEY: changed}
+        if removed:
+            delta["$removed"] = removed
+        return _pack(delta), _pack(new_data)
+    return (
+        _pack(old_data) if old_data is not None else None,
+        _pack(new_data) if new_data is not None else None,
+    )
+
+
+def decode_audit_pair(
+    old_raw: Raw, new_raw: Raw
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    new_data = decode_payload(new_raw)
+    old_data = decode_payload(old_raw)
+    if old_data is not None and DELTA_KEY in old_data:
+        rebuilt = dict(new_data or {})
+        for key in old_data.get("$removed", []):
+            rebuilt.pop(key, None)
+        rebuilt.update(old_data[DELTA_KEY])
+        old_data = rebuilt
+    return old_data, new_data
+
+
+def audit_row_view(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Return an audit row with old_data/new_data as full JSON text."""
+    old_data, new_data = decode_audit_pair(row.get("old_data"), row.get("new_data"))
+    view = dict(row)
+    view["old_data"] = serialize_full(old_data)
+    view["new_data"] = serialize_full(new_data)
+    return view
+
+
+def diff_audit_pair(
+    old_data: Optional[Dict[str, Any]],
+    new_data: Optional[Dict[str, Any]],
+    ignore: Tuple[str, ...] = ("id", "updated_at"),
+) -> List[Dict[str, Any]]:
+    """Fields whose value differs between the before and after images."""
+    old_data = old_data or {}
+    new_data = new_data or {}
+    changes = []
+    for field in sorted(set(old_data) | set(new_data)):
+        if field in ignore:
+            continue
+        old_value = old_data.get(field)
+        new_value = new_data.get(field)
+        if old_value != new_value:
+            changes.append({"field": field, "old": old_value, "new": new_value})
+    return changes
+
+
+def measure_audit_storage(conn) -> Dict[str, Any]:
+    row = conn.execute(
+        """
+        SELECT
+            COUNT(*) AS row_count,
+            COALESCE(SUM(
+                COALESCE(length(CAST(old_data AS BLOB)), 0)
+                + COALESCE(length(CAST(new_data AS BLOB)), 0)
+            ), 0) AS payload_bytes
+        FROM audit_log;
+        """
+    ).fetchone()
+    count = int(row["row_count"] or 0)
+    total = int(row["payload_bytes"] or 0)
+    return {
+        "rows": count,
+        "payload_bytes": total,
+        "bytes_per_row": round(total / count, 1) if count else 0.0,
+    }
+
+
+def convert_audit_chunk(
+    conn, after_id: int, chunk_size: int, mode: str = "delta"
+) -> Tuple[int, int]:
+    """Re-encode one chunk of rows with id > after_id; returns (last_id, converted)."""
+    rows = conn.execute(
+        """
+        SELECT id, old_data, new_data
+        FROM audit_log
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?;
+        """,
+        (after_id, chunk_size),
+    ).fetchall()
+    converted = 0
+    for row in rows:
+        old_data, new_data = decode_audit_pair(row["old_data"], row["new_data"])
+        old_raw, new_raw = encode_audit_pair(old_data, new_data, mode)
+        if (old_raw, new_raw) != (row["old_data"], row["new_data"]):
+            conn.execute(
+                "UPDATE audit_log SET old_data = ?, new_data = ? WHERE id = ?;",
+                (old_raw, new_raw, row["id"]),
+            )
+            converted += 1
+    last_id = rows[-1]["id"] if rows else after_id
+    return last_id, converted
+
+
+def convert_audit_log(
+    conn, chunk_size: int = 500, mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """Re-encode every row in ``mode``, by default the configured APP_AUDIT_STORAGE."""
+    mode = get_audit_storage_mode() if mode is None else mode
+    before = measure_audit_storage(conn)
+    last_id = 0
+    converted = 0
+    while True:
+        next_id, changed = convert_audit_chunk(conn, last_id, chunk_size, mode)
+        conn.commit()
+        converted += changed
+        if next_id == last_id:
+            break
+        last_id = next_id
+    after = measure_audit_storage(conn)
+    return {"mode": mode, "converted_rows": converted, "before": before, "after": after}
+
+
+def main() -> None:
+    from app.db import connect, init_db
+
+    parser = argparse.ArgumentParser(description="Measure or convert audit payload storage.")
+    parser.add_argument("--convert", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--mode",
+        choices=sorted(AUDIT_STORAGE_MODES),
+        default=None,
+        help="default: APP_AUDIT_STORAGE",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    conn = connect()
+    try:
+        if args.convert:
+            report = convert_audit_log(conn, args.chunk_size, args.mode)
+        else:
+            report = measure_audit_storage(conn)
+    finally:
+        conn.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Online backups through the SQLite backup API. Pages are copied a few at a
+time with a short sleep in between, so the writer is never locked out for
+the whole copy. Each backup gets a sha256 sidecar (sha256sum format); a
+restore verifies it, checks the copy, then copies it over the live file in
+place so every server worker keeps a valid handle on it.
+
+Usage: python -m app.backup [--compress] | --list | --verify NAME | --restore NAME
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from app import cache
+from app.config import get_backup_dir, get_backup_pages, get_backup_sleep_ms
+from app.db import _normalize_db_path, apply_migrations, connect
+from app.writer import restore_database
+
+BACKUP_PREFIX = "app-"
+_NAME_RE = re.compile(r"^app-\d{8}-\d{6}(-\d+)?\.db(\.gz)?$")
+_CHUNK = 1 << 20
+
+
+def _checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _sidecar(path: Path) -> Path:
+    return path.with_name(path.name + ".sha256")
+
+
+def backup_path(name: str, backup_dir: Optional[Path] = None) -> Path:
+    if not _NAME_RE.match(name):
+        raise ValueError("invalid backup name")
+    return (backup_dir or get_backup_dir()) / name
+
+
+def _new_name(backup_dir: Path, compress: bool) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    suffix = ".db.gz" if compress else ".db"
+    name = f"{BACKUP_PREFIX}{stamp}{suffix}"
+    counter = 1
+    while (backup_dir / name).exists():
+        name = f"{BACKUP_PREFIX}{stamp}-{counter}{suffix}"
+        counter += 1
+    return name
+
+
+def _integrity(path: Path) -> str:
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def create_backup(
+    db_path: Union[Path, str, None] = None,
+    backup_dir: Optional[Path] = None,
+    compress: bool = False,
+    pages: Optional[int] = None,
+    sleep_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    backup_dir = backup_dir or get_backup_dir()
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    pages = pages or get_backup_pages()
+    sleep_ms = get_backup_sleep_ms() if sleep_ms is None else sleep_ms
+    name = _new_name(backup_dir, compress)
+    target = backup_dir / name
+    copy = backup_dir / f".{name}.part.db"
+
+    steps = 0
+
+    def _progress(status: int, remaining: int, total: int) -> None:
+        nonlocal steps
+        steps += 1
+
+    started = time.perf_counter()
+    source = connect(db_path)
+    destination = sqlite3.connect(copy)
+    try:
+        source.backup(destination, pages=pages, progress=_progress, sleep=sleep_ms / 1000)
+    finally:
+        destination.close()
+        source.close()
+
+    try:
+        if compress:
+            with copy.open("rb") as raw, gzip.open(target, "wb", compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, _CHUNK)
+        else:
+            os.replace(copy, target)
+        database_bytes = copy.stat().st_size if copy.exists() else target.stat().st_size
+    finally:
+        if copy.exists():
+            copy.unlink()
+
+    checksum = _checksum(target)
+    _sidecar(target).write_text(f"{checksum}  {name}\n", encoding="utf-8")
+    return {
+        "name": name,
+        "bytes": target.stat().st_size,
+        "database_bytes": database_bytes,
+        "compressed": compress,
+        "sha256": checksum,
+        "steps": steps,
+        "pages_per_step": pages,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def list_backups(backup_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    backup_dir = backup_dir or get_backup_dir()
+    if not backup_dir.exists():
+        return []
+    backups = []
+    for path in sorted(backup_dir.glob(f"{BACKUP_PREFIX}*")):
+        if not _NAME_RE.match(path.name):
+            continue
+        backups.append(
+            {
+                "name": path.name,
+                "bytes": path.stat().st_size,
+                "compressed": path.suffix == ".gz",
+                "has_checksum": _sidecar(path).exists(),
+            }
+        )
+    return backups
+
+
+def verify_backup(name: str, backup_dir: Optional[Path] = None) -> Dict[str, Any]:
+    path = backup_path(name, backup_dir)
+    if not path.exists():
+        raise FileNotFoundError(name)
+    sidecar = _sidecar(path)
+    expected = sidecar.read_text(encoding="utf-8").split()[0] if sidecar.exists() else None
+    actual = _checksum(path)
+    return {"name": name, "sha256": actual, "expected": expected, "ok": expected == actual}
+
+
+def _stage_restore(path: Path, db_path: Path) -> Path:
+    # Staged next to the live file, on the same filesystem as its -wal.
+    staged = db_path.with_name(f".{db_path.name}.restore")
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as packed, staged.open("wb") as raw:
+            shutil.copyfileobj(packed, raw, _CHUNK)
+    else:
+        shutil.copyfile(path, staged)
+    return staged
+
+
+def restore_backup(
+    name: str,
+    db_path: Union[Path, str, None] = None,
+    backup_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    verification = verify_backup(name, backup_dir)
+    if not verification["ok"]:
+        raise ValueError(f"checksum mismatch for {name}")
+    target = _normalize_db_path(db_path)
+    staged = _stage_restore(backup_path(name, backup_dir), target)
+    try:
+        integrity = _integrity(staged)
+        if integrity != "ok":
+            raise ValueError(f"integrity check failed: {integrity}")
+        # A backup taken before later migrations is brought up to date
+        # before it goes live.
+        conn = connect(staged)
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
+
+        restore_database(target, staged)
+    finally:
+        if staged.exists():
+            staged.unlink()
+
+    # Entries for the old content can no longer match (new generation); free them.
+    cache.invalidate()
+    return {"restored": name, "sha256": verification["sha256"], "db_path": str(target)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Online backup and restore of the database.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--list", action="store_true")
+    group.add_argument("--verify", metavar="NAME")
+    group.add_argument("--restore", metavar="NAME")
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--pages", type=int, default=None)
+    parser.add_argument("--sleep-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.list:
+        report: Any = list_backups()
+    elif args.verify:
+        report = verify_backup(args.verify)
+    elif args.restore:
+        report = restore_backup(args.restore)
+    else:
+        report = create_backup(compress=args.compress, pages=args.pages, sleep_ms=args.sleep_ms)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
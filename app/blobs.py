@@ -0,0 +1,130 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Content-addressed blob store for evidence attachments. Files live under
+APP_DATA_DIR/blobs/<aa>/<bb>/<sha256>, so identical uploads are kept once;
+SQLite only holds the attachment metadata. Unreferenced blobs are removed by
+collect_garbage after a grace period, which keeps an upload that is still
+waiting for its metadata row safe.
+
+Usage: python -m app.blobs --gc [--grace-seconds N]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import get_blob_dir
+from app.db import connect, init_db
+
+_SHA_RE = re.compile(r"^[0-9a-f]{64}$")
+GC_GRACE_SECONDS = 3600
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+def blob_path(sha256: str, blob_dir: Optional[Path] = None) -> Path:
+    if not _SHA_RE.match(sha256):
+        raise ValueError("invalid sha256")
+    return (blob_dir or get_blob_dir()) / sha256[:2] / sha256[2:4] / sha256
+
+
+class BlobWriter:
+    """Receives an upload chunk by chunk, hashing it on the way to disk."""
+
+    def __init__(self, max_bytes: int, blob_dir: Optional[Path] = None) -> None:
+        self.blob_dir = blob_dir or get_blob_dir()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        incoming = self.blob_dir / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        fd, name = tempfile.mkstemp(dir=incoming)
+        self._handle = os.fdopen(fd, "wb")
+        self._temp = Path(name)
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise BlobTooLarge(f"attachment exceeds {self.max_bytes} bytes")
+        self._digest.update(chunk)
+        self._handle.write(chunk)
+
+    def commit(self) -> Dict[str, Any]:
+        self._handle.close()
+        sha256 = self._digest.hexdigest()
+        target = blob_path(sha256, self.blob_dir)
+        deduplicated = target.exists()
+        if deduplicated:
+            self._temp.unlink()
+            # Refresh the mtime so garbage collection grants a new grace period.
+            os.utime(target)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._temp, target)
+        return {"sha256": sha256, "size": self.size, "deduplicated": deduplicated}
+
+    def abort(self) -> None:
+        self._handle.close()
+        if self._temp.exists():
+            self._temp.unlink()
+
+
+def collect_garbage(
+    conn, blob_dir: Optional[Path] = None, grace_seconds: float = GC_GRACE_SECONDS
+) -> Dict[str, int]:
+    blob_dir = blob_dir or get_blob_dir()
+    referenced = {row[0] for row in conn.execute("SELECT DISTINCT sha256 FROM attachment;")}
+    cutoff = time.time() - grace_seconds
+    removed = kept = freed = 0
+    if blob_dir.exists():
+        for path in blob_dir.glob("??/??/*"):
+            if path.name in referenced:
+                kept += 1
+                continue
+            stat = path.stat()
+            if stat.st_mtime > cutoff:
+                kept += 1
+                continue
+            path.unlink()
+            removed += 1
+            freed += stat.st_size
+        for path in (blob_dir / "incoming").glob("*"):
+            if path.stat().st_mtime <= cutoff:
+                path.unlink()
+    return {"removed": removed, "kept": kept, "freed_bytes": freed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the attachment blob store.")
+    parser.add_argument("--gc", action="store_true")
+    parser.add_argument("--grace-seconds", type=float, default=GC_GRACE_SECONDS)
+    args = parser.parse_args()
+
+    init_db()
+    conn = connect()
+    try:
+        if args.gc:
+            report = collect_garbage(conn, grace_seconds=args.grace_seconds)
+        else:
+            row = conn.execute(
+                "SELECT COUNT(*) AS attachments, COUNT(DISTINCT sha256) AS blobs,"
+                " COALESCE(SUM(size), 0) AS logical_bytes FROM attachment;"
+            ).fetchone()
+            report = dict(row)
+    finally:
+        conn.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Per-route execution budgets for read queries. QueryBudgetMiddleware tags
+each /api request with its route and budget; call_with_reader arms an SQLite
+progress handler on the read connection which aborts the running statement
+once the budget is spent. The route then answers 503, the interrupted query
+is written to the slow query log and the violation is counted.
+
+Defaults: APP_QUERY_BUDGET_MS (cheap reads, 5000) and
+APP_QUERY_BUDGET_ANALYTICS_MS (15000); per-route overrides in
+APP_QUERY_BUDGETS="/api/evolution=2000,/api/portfolio=off". Writes and
+/api/admin/* run without a budget: interrupting a group commit would roll
+back unrelated requests, and operator tools are expected to be slow.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from app.admission import classify
+from app.config import get_query_budget_ms, get_query_budget_overrides
+from app.querylog import get_slow_query_log
+
+# SQLite VM instructions between two deadline checks.
+PROGRESS_STEPS = 1000
+
+_ID_SEGMENT_RE = re.compile(r"/\d+(?=/|$)")
+_current: ContextVar[Optional[Tuple[str, float]]] = ContextVar("query_budget", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, route: str, budget_ms: float, sql: Optional[str]) -> None:
+        super().__init__(f"query budget of {budget_ms:g} ms exceeded on {route}")
+        self.route = route
+        self.budget_ms = budget_ms
+        self.sql = sql
+
+
+def route_key(path: str) -> str:
+    """API route with tenant prefix stripped and numeric ids folded: /api/x/{id}."""
+    index = path.find("/api/")
+    return _ID_SEGMENT_RE.sub("/{id}", path[index:] if index >= 0 else path)
+
+
+class BudgetPolicy:
+    def __init__(self) -> None:
+        self.defaults = {name: get_query_budget_ms(name) for name in ("read", "analytics")}
+        # Longest prefix first so /api/x/y overrides /api/x.
+        self.overrides = sorted(
+            get_query_budget_overrides().items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def budget_for(self, route: str) -> Optional[float]:
+        for prefix, budget_ms in self.overrides:
+            if route.startswith(prefix):
+                return budget_ms
+        request_class = classify("GET", route)
+        if request_class is None:
+            return None
+        return self.defaults[request_class]
+
+
+class _BudgetStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._violations: Dict[str, int] = {}
+
+    def record(self, route: str) -> None:
+        with self._lock:
+            self._violations[route] = self._violations.get(route, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            by_route = dict(self._violations)
+        return {"violations": sum(by_route.values()), "by_route": by_route}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._violations.clear()
+
+
+_stats = _BudgetStats()
+
+
+def budget_stats(policy: Optional[BudgetPolicy] = None) -> Dict[str, Any]:
+    stats = _stats.snapshot()
+    if policy is not None:
+        stats["defaults_ms"] = dict(policy.defaults)
+        stats["overrides_ms"] = dict(policy.overrides)
+    return stats
+
+
+def reset_budget_stats() -> None:
+    _stats.clear()
+
+
+class _Deadline:
+    def __init__(self, budget_ms: float) -> None:
+        self.started = time.perf_counter()
+        self.deadline = self.started + budget_ms / 1000
+        self.tripped = False
+
+    def __call__(self) -> int:
+        if time.perf_counter() >= self.deadline:
+            self.tripped = True
+            return 1
+        return 0
+
+
+def run_with_budget(conn: sqlite3.Connection, fn, *args: Any) -> Any:
+    """Run ``fn(conn, *args)`` under the budget of the current request, if any."""
+    current = _current.get()
+    if current is None:
+        return fn(conn, *args)
+    route, budget_ms = current
+    deadline = _Deadline(budget_ms)
+    conn.set_progress_handler(deadline, PROGRESS_STEPS)
+    try:
+        return fn(conn, *args)
+    except sqlite3.OperationalError:
+        if not deadline.tripped:
+            raise
+        conn.set_progress_handler(None, 0)
+        elapsed_ms = (time.perf_counter() - deadline.started) * 1000
+        sql, params = getattr(conn, "last_query", None) or ("", ())
+        _stats.record(route)
+        get_slow_query_log().record_budget_violation(
+            conn, sql, params, elapsed_ms, route, budget_ms
+        )
+        raise QueryBudgetExceeded(route, budget_ms, sql or None) from None
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+class QueryBudgetMiddleware:
+    """Binds the route budget to the request context; lanes copy it to workers."""
+
+    def __init__(self, app, policy: Optional[BudgetPolicy] = None) -> None:
+        self.app = app
+        self.policy = policy or BudgetPolicy()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or "/api/" not in scope["path"]:
+            await self.app(scope, receive, send)
+            return
+        route = route_key(scope["path"])
+        budget_ms = self.policy.budget_for(route)
+        token = _current.set((route, budget_ms) if budget_ms else None)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,170 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Result cache for read functions taking ``conn`` first. An entry is keyed on
+the database, the function and its arguments, and stamped with the
+revisions of the tables the function reads: any write to one of them (the
+revision triggers see every INSERT, UPDATE and DELETE, from any connection
+or process) makes the next call recompute and replace the entry. Entries
+are evicted least-recently-used once APP_CACHE_MAX_ENTRIES or
+APP_CACHE_MAX_MB is exceeded.
+
+Cached results are shared between callers and must not be mutated.
+"""
+
+import functools
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.config import get_cache_max_bytes, get_cache_max_entries
+from app.revisions import get_database_key, get_revisions
+
+
+class _Entry:
+    __slots__ = ("revisions", "value", "size")
+
+    def __init__(self, revisions: Tuple[int, ...], value: Any, size: int) -> None:
+        self.revisions = revisions
+        self.value = value
+        self.size = size
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class ResultCache:
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, event: str) -> None:
+        stats = self._stats.setdefault(
+            name, {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+        )
+        stats[event] += 1
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def get(self, name: str, key: Hashable, revisions: Tuple[int, ...]) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.revisions == revisions:
+                self._entries.move_to_end(key)
+                self._count(name, "hits")
+                return True, entry.value
+            if entry is not None:
+                # Written to since: the old result can never be served again.
+                self._drop(key)
+                self._count(name, "stale")
+            self._count(name, "misses")
+            return False, None
+
+    def put(self, name: str, key: Hashable, revisions: Tuple[int, ...], value: Any) -> None:
+        size = _estimate_size(value)
+        max_entries = self.max_entries or get_cache_max_entries()
+        max_bytes = self.max_bytes or get_cache_max_bytes()
+        if size > max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(revisions, value, size)
+            self._bytes += size
+            while len(self._entries) > max_entries or self._bytes > max_bytes:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                self._count(old_key[0], "evictions")
+
+    def invalidate(self, name: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if name is None or key[0] == name]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            functions = {name: dict(values) for name, values in self._stats.items()}
+            entries = len(self._entries)
+            size = self._bytes
+        hits = sum(values["hits"] for values in functions.values())
+        misses = sum(values["misses"] for values in functions.values())
+        for values in functions.values():
+            lookups = values["hits"] + values["misses"]
+            values["hit_rate"] = round(values["hits"] / lookups, 4) if lookups else 0.0
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries or get_cache_max_entries(),
+            "max_bytes": self.max_bytes or get_cache_max_bytes(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "functions": functions,
+        }
+
+
+_cache = ResultCache()
+
+
+def cached(
+    tables: Iterable[str], vary: Optional[Callable[[], Hashable]] = None
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Cache ``fn(conn, *args)`` until one of ``tables`` changes.
+
+    ``vary`` adds a key part for results that also depend on something other
+    than the data, such as the current date.
+    """
+    names = tuple(tables)
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(conn, *args: Any, **kwargs: Any) -> Any:
+            try:
+                key = (
+                    name,
+                    get_database_key(conn),
+                    args,
+                    tuple(sorted(kwargs.items())),
+                    vary() if vary else None,
+                )
+                hash(key)
+            except TypeError:
+                return fn(conn, *args, **kwargs)
+            revisions = get_revisions(conn, names)
+            hit, value = _cache.get(name, key, revisions)
+            if hit:
+                return value
+            value = fn(conn, *args, **kwargs)
+            _cache.put(name, key, revisions, value)
+            return value
+
+        wrapper.cache_name = name
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
+
+
+def invalidate(fn: Optional[Callable[..., Any]] = None) -> int:
+    """Drop every entry of ``fn``, or of all functions."""
+    return _cache.invalidate(fn.cache_name if fn is not None else None)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
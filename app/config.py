@@ -4,14 +4,64 @@ Date: 2026-01-18
 """
 
 import os
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
 APP_DATA_DIR_ENV = "APP_DATA_DIR"
 APP_DEFAULT_LANG_ENV = "APP_DEFAULT_LANG"
 APP_TEST_DATA_ENV = "APP_TEST_DATA"
 APP_ALLOW_QUIT_ENV = "APP_ALLOW_QUIT"
+APP_ALLOW_ADMIN_ENV = "APP_ALLOW_ADMIN"
+APP_SLOW_QUERY_MS_ENV = "APP_SLOW_QUERY_MS"
+APP_WRITE_QUEUE_ENV = "APP_WRITE_QUEUE"
+APP_WRITE_BATCH_MS_ENV = "APP_WRITE_BATCH_MS"
+APP_WRITE_BATCH_SIZE_ENV = "APP_WRITE_BATCH_SIZE"
+APP_WRITE_DURABILITY_ENV = "APP_WRITE_DURABILITY"
+APP_WRITE_TIMEOUT_MS_ENV = "APP_WRITE_TIMEOUT_MS"
+APP_DB_READ_WORKERS_ENV = "APP_DB_READ_WORKERS"
+APP_DB_ANALYTICS_WORKERS_ENV = "APP_DB_ANALYTICS_WORKERS"
+APP_DB_WRITE_WORKERS_ENV = "APP_DB_WRITE_WORKERS"
+APP_AUDIT_RETENTION_DAYS_ENV = "APP_AUDIT_RETENTION_DAYS"
+APP_AUDIT_ARCHIVE_CHUNK_ENV = "APP_AUDIT_ARCHIVE_CHUNK"
+APP_AUDIT_STORAGE_ENV = "APP_AUDIT_STORAGE"
+AUDIT_STORAGE_MODES = {"full", "delta"}
+APP_CHECKPOINT_EVERY_ENV = "APP_CHECKPOINT_EVERY"
+APP_CHECKPOINT_INTERVAL_ENV = "APP_CHECKPOINT_INTERVAL"
+APP_MIGRATION_CHUNK_ENV = "APP_MIGRATION_CHUNK"
+APP_MIGRATION_PAUSE_MS_ENV = "APP_MIGRATION_PAUSE_MS"
+APP_BACKUP_PAGES_ENV = "APP_BACKUP_PAGES"
+APP_BACKUP_SLEEP_MS_ENV = "APP_BACKUP_SLEEP_MS"
+APP_MULTI_TENANT_ENV = "APP_MULTI_TENANT"
+APP_TENANT_HEADER_ENV = "APP_TENANT_HEADER"
+APP_DB_HANDLES_ENV = "APP_DB_HANDLES"
+APP_WORKERS_ENV = "APP_WORKERS"
+APP_DB_BUSY_TIMEOUT_MS_ENV = "APP_DB_BUSY_TIMEOUT_MS"
+APP_DB_BUSY_RETRIES_ENV = "APP_DB_BUSY_RETRIES"
+# Set by app.server in the workers it forks; not meant to be set by hand.
+APP_SERVER_MASTER_PID_ENV = "APP_SERVER_MASTER_PID"
+APP_ATTACHMENT_MAX_MB_ENV = "APP_ATTACHMENT_MAX_MB"
+APP_CACHE_MAX_ENTRIES_ENV = "APP_CACHE_MAX_ENTRIES"
+APP_CACHE_MAX_MB_ENV = "APP_CACHE_MAX_MB"
+APP_REPORT_WORKERS_ENV = "APP_REPORT_WORKERS"
+APP_STARTUP_PROFILE_ENV = "APP_STARTUP_PROFILE"
+APP_ADMISSION_ENV = "APP_ADMISSION"
+APP_ADMIT_READ_ENV = "APP_ADMIT_READ"
+APP_ADMIT_ANALYTICS_ENV = "APP_ADMIT_ANALYTICS"
+APP_ADMIT_WRITE_ENV = "APP_ADMIT_WRITE"
+APP_ADMIT_QUEUE_ENV = "APP_ADMIT_QUEUE"
+APP_ADMIT_WAIT_MS_ENV = "APP_ADMIT_WAIT_MS"
+APP_QUERY_BUDGET_MS_ENV = "APP_QUERY_BUDGET_MS"
+APP_QUERY_BUDGET_ANALYTICS_MS_ENV = "APP_QUERY_BUDGET_ANALYTICS_MS"
+APP_QUERY_BUDGETS_ENV = "APP_QUERY_BUDGETS"
+WRITE_DURABILITY_MODES = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
 SUPPORTED_LANGS = {"en", "fr"}
+# Probe and control routes: no database, no tenant, reachable during startup.
+PROBE_PATHS = ("/api/healthz", "/api/readyz", "/api/config", "/api/quit")
+
+# Tenant of the request being served; set by app.tenants.TenantMiddleware and
+# carried into DB worker threads with the copied context.
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
 
 
 def get_app_data_dir() -> Path:
@@ -21,8 +71,35 @@ def get_app_data_dir() -> Path:
     return (Path(__file__).resolve().parents[1] / "data").resolve()
 
 
+def get_tenant_data_dir() -> Path:
+    tenant = current_tenant.get()
+    if tenant:
+        return get_app_data_dir() / "tenants" / tenant
+    return get_app_data_dir()
+
+
 def get_db_path() -> Path:
-    return get_app_data_dir() / "app.db"
+    return get_tenant_data_dir() / "app.db"
+
+
+def get_log_dir() -> Path:
+    return get_app_data_dir() / "logs"
+
+
+def get_archive_dir() -> Path:
+    return get_tenant_data_dir() / "archive"
+
+
+def get_backup_dir() -> Path:
+    return get_tenant_data_dir() / "backups"
+
+
+def get_blob_dir() -> Path:
+    return get_tenant_data_dir() / "blobs"
+
+
+def get_report_dir() -> Path:
+    return get_tenant_data_dir() / "reports"
 
 
 def ensure_data_dir() -> Path:
@@ -46,3 +123,201 @@ def is_quit_allowed(client_host: Optional[str]) -> bool:
         return True
     value = os.getenv(APP_ALLOW_QUIT_ENV, "")
     return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def is_admin_allowed(client_host: Optional[str]) -> bool:
+    if client_host in {"127.0.0.1", "::1"}:
+        return True
+    value = os.getenv(APP_ALLOW_ADMIN_ENV, "")
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def get_slow_query_threshold_ms() -> Optional[float]:
+    value = os.getenv(APP_SLOW_QUERY_MS_ENV, "200").strip().lower()
+    if value in {"", "off", "none", "disabled"}:
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        return 200.0
+    return threshold if threshold >= 0 else None
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def is_write_queue_enabled() -> bool:
+    value = os.getenv(APP_WRITE_QUEUE_ENV, "1")
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def get_write_batch_ms() -> float:
+    return max(0.0, _env_number(APP_WRITE_BATCH_MS_ENV, 5.0))
+
+
+def get_write_batch_size() -> int:
+    return max(1, int(_env_number(APP_WRITE_BATCH_SIZE_ENV, 64)))
+
+
+def get_write_timeout_ms() -> float:
+    return max(1.0, _env_number(APP_WRITE_TIMEOUT_MS_ENV, 30000.0))
+
+
+def get_write_durability() -> str:
+    value = os.getenv(APP_WRITE_DURABILITY_ENV, "full").strip().lower()
+    return value if value in WRITE_DURABILITY_MODES else "full"
+
+
+def get_lane_workers(lane: str) -> int:
+    defaults = {
+        "read": (APP_DB_READ_WORKERS_ENV, 4),
+        "analytics": (APP_DB_ANALYTICS_WORKERS_ENV, 2),
+        "write": (APP_DB_WRITE_WORKERS_ENV, 2),
+    }
+    env_name, default = defaults[lane]
+    return max(1, int(_env_number(env_name, default)))
+
+
+def get_audit_retention_days() -> int:
+    return max(1, int(_env_number(APP_AUDIT_RETENTION_DAYS_ENV, 365)))
+
+
+def get_audit_archive_chunk() -> int:
+    return max(1, int(_env_number(APP_AUDIT_ARCHIVE_CHUNK_ENV, 500)))
+
+
+def get_audit_storage_mode() -> str:
+    value = os.getenv(APP_AUDIT_STORAGE_ENV, "delta").strip().lower()
+    return value if value in AUDIT_STORAGE_MODES else "delta"
+
+
+def get_checkpoint_every() -> int:
+    return max(1, int(_env_number(APP_CHECKPOINT_EVERY_ENV, 100)))
+
+
+def get_checkpoint_interval() -> float:
+    return max(0.0, _env_number(APP_CHECKPOINT_INTERVAL_ENV, 300.0))
+
+
+def get_migration_chunk() -> int:
+    return max(1, int(_env_number(APP_MIGRATION_CHUNK_ENV, 500)))
+
+
+def get_migration_pause_ms() -> float:
+    return max(0.0, _env_number(APP_MIGRATION_PAUSE_MS_ENV, 5.0))
+
+
+def get_backup_pages() -> int:
+    return max(1, int(_env_number(APP_BACKUP_PAGES_ENV, 64)))
+
+
+def get_backup_sleep_ms() -> float:
+    return max(0.0, _env_number(APP_BACKUP_SLEEP_MS_ENV, 5.0))
+
+
+def is_multi_tenant_enabled() -> bool:
+    value = os.getenv(APP_MULTI_TENANT_ENV, "")
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def get_tenant_header() -> str:
+    return os.getenv(APP_TENANT_HEADER_ENV, "").strip().lower() or "x-tenant"
+
+
+def get_db_handle_limit() -> int:
+    return max(1, int(_env_number(APP_DB_HANDLES_ENV, 64)))
+
+
+def get_workers() -> int:
+    return max(1, int(_env_number(APP_WORKERS_ENV, 1)))
+
+
+def get_busy_timeout_ms() -> float:
+    return max(0.0, _env_number(APP_DB_BUSY_TIMEOUT_MS_ENV, 5000.0))
+
+
+def get_busy_retries() -> int:
+    return max(0, int(_env_number(APP_DB_BUSY_RETRIES_ENV, 5)))
+
+
+def get_server_master_pid() -> Optional[int]:
+    value = int(_env_number(APP_SERVER_MASTER_PID_ENV, 0))
+    return value if value > 0 else None
+
+
+def get_attachment_max_bytes() -> int:
+    return int(max(0.0, _env_number(APP_ATTACHMENT_MAX_MB_ENV, 50.0)) * 1024 * 1024)
+
+
+def get_cache_max_entries() -> int:
+    return max(1, int(_env_number(APP_CACHE_MAX_ENTRIES_ENV, 1024)))
+
+
+def get_cache_max_bytes() -> int:
+    return max(1, int(_env_number(APP_CACHE_MAX_MB_ENV, 32.0) * 1024 * 1024))
+
+
+def get_report_workers() -> int:
+    return max(1, int(_env_number(APP_REPORT_WORKERS_ENV, 2)))
+
+
+def is_startup_profile_enabled() -> bool:
+    value = os.getenv(APP_STARTUP_PROFILE_ENV, "")
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def is_admission_enabled() -> bool:
+    value = os.getenv(APP_ADMISSION_ENV, "1")
+    return value.strip().lower() not in {"0", "false", "no", "off"}
+
+
+def get_admission_limit(request_class: str) -> int:
+    defaults = {
+        "read": (APP_ADMIT_READ_ENV, 32),
+        "analytics": (APP_ADMIT_ANALYTICS_ENV, 4),
+        "write": (APP_ADMIT_WRITE_ENV, 16),
+    }
+    env_name, default = defaults[request_class]
+    return max(1, int(_env_number(env_name, default)))
+
+
+def get_admission_queue() -> int:
+    return max(0, int(_env_number(APP_ADMIT_QUEUE_ENV, 64)))
+
+
+def get_admission_wait_ms() -> float:
+    return max(0.0, _env_number(APP_ADMIT_WAIT_MS_ENV, 2000.0))
+
+
+def _budget_ms(value: str, default: Optional[float]) -> Optional[float]:
+    value = value.strip().lower()
+    if value in {"off", "none", "disabled"}:
+        return None
+    try:
+        budget = float(value)
+    except ValueError:
+        return default
+    return budget if budget > 0 else None
+
+
+def get_query_budget_ms(request_class: str) -> Optional[float]:
+    defaults = {
+        "read": (APP_QUERY_BUDGET_MS_ENV, 5000.0),
+        "analytics": (APP_QUERY_BUDGET_ANALYTICS_MS_ENV, 15000.0),
+    }
+    env_name, default = defaults[request_class]
+    return _budget_ms(os.getenv(env_name, "") or str(default), default)
+
+
+def get_query_budget_overrides() -> Dict[str, Optional[float]]:
+    """Per-route budgets from APP_QUERY_BUDGETS="/api/evolution=2000,/api/x=off"."""
+    overrides: Dict[str, Optional[float]] = {}
+    for item in os.getenv(APP_QUERY_BUDGETS_ENV, "").split(","):
+        route, _, value = item.partition("=")
+        if route.strip().startswith("/api/") and value.strip():
+            overrides[route.strip()] = _budget_ms(value, None)
+    return overrides
@@ -3,14 +3,102 @@ Author: eric vanoverbeke
 Date: 2026-01-18
 """
 
+import argparse
 import sqlite3
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from app.config import ensure_data_dir, get_db_path
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows runs a single process
+    fcntl = None
+
+from app.audit import convert_audit_chunk
+from app.config import (
+    ensure_data_dir,
+    get_audit_storage_mode,
+    get_busy_timeout_ms,
+    get_db_path,
+    get_migration_chunk,
+    get_migration_pause_ms,
+)
+from app.querylog import ProfiledConnection
+from app.revisions import REVISION_SCHEMA_SQL, revision_triggers_sql
+from app.rollup import ROLLUP_BACKFILL_MARKER_SQL, ROLLUP_SCHEMA_SQL, add_rollup_range
+
+
+
+class DataMigration:
+    """A backfill applied in bounded chunks, resumable from stored progress.
+
+    ``step(conn, last_key, chunk_size)`` processes the rows after
+    ``last_key`` and returns the new key, or None once nothing is left.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        step: Callable[[sqlite3.Connection, int, int], Optional[int]],
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.step = step
+        self.chunk_size = chunk_size
+
+
+def _backfill_score_updated_at(conn, last_id: int, chunk_size: int) -> Optional[int]:
+    rows = conn.execute(
+        "SELECT id FROM practice_score WHERE id > ? ORDER BY id LIMIT ?;",
+        (last_id, chunk_size),
+    ).fetchall()
+    if not rows:
+        return None
+    next_id = rows[-1][0]
+    conn.execute(
+        """
+        UPDATE practice_score
+        SET updated_at = datetime('now')
+        WHERE id > ? AND id <= ? AND updated_at IS NULL;
+        """,
+        (last_id, next_id),
+    )
+    return next_id
+
+
+def _reencode_audit_payloads(conn, last_id: int, chunk_size: int) -> Optional[int]:
+    next_id, _ = convert_audit_chunk(conn, last_id, chunk_size, get_audit_storage_mode())
+    return None if next_id == last_id else next_id
 
 
-MIGRATIONS: Iterable[Tuple[int, str]] = (
+def _backfill_activity_rollup(conn, last_id: int, chunk_size: int) -> Optional[int]:
+    # Rows audited after migration 6 are counted by its trigger; only older
+    # ones are backfilled. Databases that ran the former one-statement
+    # backfill in migration 6 have no marker and nothing to do.
+    if not _table_exists(conn, "rollup_backfill"):
+        return None
+    upto_id = conn.execute("SELECT MAX(upto_id) FROM rollup_backfill;").fetchone()[0] or 0
+    next_id = conn.execute(
+        """
+        SELECT MAX(id) FROM (
+            SELECT id FROM audit_log WHERE id > ? AND id <= ? ORDER BY id LIMIT ?
+        );
+        """,
+        (last_id, upto_id, chunk_size),
+    ).fetchone()[0]
+    if next_id is None:
+        conn.execute("DROP TABLE rollup_backfill;")
+        return None
+    add_rollup_range(conn, last_id, next_id)
+    # Rollup readers are cached on the audit_log revision; counts changed.
+    conn.execute(
+        "UPDATE table_revision SET revision = revision + 1 WHERE table_name = 'audit_log';"
+    )
+    return next_id
+
+
+MIGRATIONS: Iterable[Tuple[int, Union[str, DataMigration]]] = (
     (
         1,
         """
@@ -105,22 +193,136 @@ MIGRATIONS: Iterable[Tuple[int, str]] = (
     ),
     (
         3,
+        # A non-constant DEFAULT cannot be added to a populated table, so the
+        # column is nullable, new rows get it from a trigger and existing rows
+        # are filled in by the chunked data migration 8.
         """
-        ALTER TABLE practice_score
-        ADD COLUMN updated_at TEXT NOT NULL DEFAULT (datetime('now'));
+        ALTER TABLE practice_score ADD COLUMN updated_at TEXT;
 
-        UPDATE practice_score
-        SET updated_at = datetime('now')
-        WHERE updated_at IS NULL;
+        CREATE TRIGGER IF NOT EXISTS trg_practice_score_updated_at
+        AFTER INSERT ON practice_score
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE practice_score SET updated_at = datetime('now') WHERE id = NEW.id;
+        END;
         """,
     ),
+    (
+        4,
+        """
+        CREATE INDEX IF NOT EXISTS idx_objective_domain
+        ON objective (domain_id);
+
+        CREATE INDEX IF NOT EXISTS idx_practice_objective
+        ON practice (objective_id);
+
+        CREATE INDEX IF NOT EXISTS idx_asset_practice_practice
+        ON asset_practice (practice_id);
+
+        CREATE INDEX IF NOT EXISTS idx_audit_log_created_at
+        ON audit_log (created_at);
+        """,
+    ),
+    (
+        5,
+        """
+        CREATE TABLE IF NOT EXISTS score_checkpoint (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assessment_id INTEGER NOT NULL,
+            audit_id INTEGER NOT NULL,
+            as_of TEXT NOT NULL,
+            scores BLOB NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY (assessment_id) REFERENCES assessment(id) ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_score_checkpoint_assessment
+        ON score_checkpoint (assessment_id, as_of);
+
+        CREATE INDEX IF NOT EXISTS idx_audit_log_entity
+        ON audit_log (entity_type, entity_id);
+        """,
+    ),
+    (6, ROLLUP_SCHEMA_SQL + ROLLUP_BACKFILL_MARKER_SQL),
+    (7, REVISION_SCHEMA_SQL),
+    (8, DataMigration("backfill practice_score.updated_at", _backfill_score_updated_at)),
+    (9, DataMigration("re-encode audit payloads", _reencode_audit_payloads)),
+    (
+        10,
+        """
+        CREATE TABLE IF NOT EXISTS attachment (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            practice_score_id INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            content_type TEXT,
+            size INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT (datetime('now')),
+            FOREIGN KEY (practice_score_id) REFERENCES practice_score(id) ON DELETE CASCADE
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_attachment_score
+        ON attachment (practice_score_id);
+
+        CREATE INDEX IF NOT EXISTS idx_attachment_sha256
+        ON attachment (sha256);
+        """
+        + revision_triggers_sql("attachment"),
+    ),
+    (
+        11,
+        # Framework text per language; domain/objective/practice keep the
+        # seeded text as the fallback for languages without a translation.
+        """
+        CREATE TABLE IF NOT EXISTS framework_text (
+            entity_type TEXT NOT NULL CHECK (entity_type IN ('domain', 'objective', 'practice')),
+            entity_id INTEGER NOT NULL,
+            lang TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            PRIMARY KEY (lang, entity_type, entity_id)
+        ) WITHOUT ROWID;
+        """
+        + revision_triggers_sql("framework_text"),
+    ),
+    (
+        12,
+        # Optional per-asset maturity. The primary key doubles as the rollup
+        # index: one assessment is a contiguous range, grouped by practice,
+        # and the score sits in the same b-tree (WITHOUT ROWID), so rolling up
+        # millions of rows never leaves the index. The secondary indexes serve
+        # per-asset lookups and the cascades from asset and practice deletes.
+        """
+        CREATE TABLE IF NOT EXISTS asset_practice_score (
+            assessment_id INTEGER NOT NULL,
+            practice_id INTEGER NOT NULL,
+            asset_id INTEGER NOT NULL,
+            score INTEGER NOT NULL CHECK (score IN (0, 1, 2, 3)),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (assessment_id, practice_id, asset_id),
+            FOREIGN KEY (assessment_id) REFERENCES assessment(id) ON DELETE CASCADE,
+            FOREIGN KEY (practice_id) REFERENCES practice(id) ON DELETE CASCADE,
+            FOREIGN KEY (asset_id) REFERENCES asset(id) ON DELETE CASCADE
+        ) WITHOUT ROWID;
+
+        CREATE INDEX IF NOT EXISTS idx_asset_practice_score_asset
+        ON asset_practice_score (asset_id, assessment_id);
+
+        CREATE INDEX IF NOT EXISTS idx_asset_practice_score_practice
+        ON asset_practice_score (practice_id);
+        """
+        + revision_triggers_sql("asset_practice_score"),
+    ),
+    (13, DataMigration("backfill activity_rollup", _backfill_activity_rollup)),
 )
 
 
 def _normalize_db_path(db_path: Union[Path, str, None]) -> Path:
     if db_path is None:
         ensure_data_dir()
-        return get_db_path()
+        path = get_db_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
     path = Path(db_path).expanduser().resolve()
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
@@ -128,12 +330,50 @@ def _normalize_db_path(db_path: Union[Path, str, None]) -> Path:
 
 def connect(db_path: Union[Path, str, None] = None) -> sqlite3.Connection:
     path = _normalize_db_path(db_path)
-    conn = sqlite3.connect(path)
+    conn = sqlite3.connect(
+        path, timeout=get_busy_timeout_ms() / 1000, factory=ProfiledConnection
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
     return conn
 
 
+def connect_readonly(db_path: Union[Path, str, None] = None) -> sqlite3.Connection:
+    """Reader connection: opened with mode=ro and query_only, never takes a write lock."""
+    path = _normalize_db_path(db_path)
+    conn = sqlite3.connect(
+        f"{path.as_uri()}?mode=ro",
+        uri=True,
+        timeout=get_busy_timeout_ms() / 1000,
+        factory=ProfiledConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    return conn
+
+
+@contextmanager
+def migration_lock(db_path: Union[Path, str, None] = None) -> Iterator[None]:
+    """Cross-process lock so only one server worker migrates or seeds a database."""
+    path = _normalize_db_path(db_path)
+    if fcntl is None:
+        yield
+        return
+    with path.with_name(path.name + ".lock").open("a+b") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (name,)
+    ).fetchone()
+    return row is not None
+
+
 def _current_schema_version(conn: sqlite3.Connection) -> int:
     conn.execute(
         """
@@ -147,19 +387,158 @@ def _current_schema_version(conn: sqlite3.Connection) -> int:
     return int(row["version"] or 0)
 
 
-def apply_migrations(conn: sqlite3.Connection) -> None:
-    current_version = _current_schema_version(conn)
-    for version, sql in MIGRATIONS:
-        if version > current_version:
-            conn.executescript(sql)
-            conn.execute("INSERT INTO schema_version (version) VALUES (?);", (version,))
+def _ensure_progress_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS migration_progress (
+            version INTEGER PRIMARY KEY,
+            last_key INTEGER NOT NULL DEFAULT 0,
+            chunks INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+
+
+def _apply_schema_migration(conn: sqlite3.Connection, version: int, sql: str) -> None:
+    # executescript() commits first and then runs in autocommit mode; the
+    # explicit BEGIN/COMMIT keeps the DDL and its version row atomic.
+    try:
+        conn.executescript(
+            f"BEGIN;\n{sql}\nINSERT INTO schema_version (version) VALUES ({int(version)});\nCOMMIT;"
+        )
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def _apply_data_migration(
+    conn: sqlite3.Connection,
+    version: int,
+    migration: DataMigration,
+    on_progress: Optional[Callable[[int, str, int, int], None]] = None,
+) -> None:
+    _ensure_progress_table(conn)
+    conn.commit()
+    row = conn.execute(
+        "SELECT last_key, chunks FROM migration_progress WHERE version = ?;", (version,)
+    ).fetchone()
+    last_key, chunks = (int(row[0]), int(row[1])) if row else (0, 0)
+    chunk_size = migration.chunk_size or get_migration_chunk()
+    pause = get_migration_pause_ms() / 1000
+
+    while True:
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            next_key = migration.step(conn, last_key, chunk_size)
+            if next_key is None:
+                conn.execute("DELETE FROM migration_progress WHERE version = ?;", (version,))
+                conn.execute("INSERT INTO schema_version (version) VALUES (?);", (version,))
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO migration_progress (version, last_key, chunks, updated_at)
+                    VALUES (?, ?, ?, datetime('now'))
+                    ON CONFLICT (version) DO UPDATE SET
+                        last_key = excluded.last_key,
+                        chunks = excluded.chunks,
+                        updated_at = excluded.updated_at;
+                    """,
+                    (version, next_key, chunks + 1),
+                )
             conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if next_key is None:
+            return
+        last_key = next_key
+        chunks += 1
+        if on_progress is not None:
+            on_progress(version, migration.name, last_key, chunks)
+        if pause:
+            # Let queued writers and readers in between chunks.
+            time.sleep(pause)
+
+
+def apply_migrations(
+    conn: sqlite3.Connection,
+    on_progress: Optional[Callable[[int, str, int, int], None]] = None,
+) -> None:
+    is_empty = conn.execute("SELECT COUNT(*) FROM sqlite_master;").fetchone()[0] == 0
+    if is_empty:
+        # Only takes effect before the first table exists; lets retention
+        # hand freed pages back with PRAGMA incremental_vacuum.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    # Persistent: readers work from a snapshot and never wait for the writer.
+    conn.execute("PRAGMA journal_mode = WAL;")
+    current_version = _current_schema_version(conn)
+    conn.commit()
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        if isinstance(migration, DataMigration):
+            _apply_data_migration(conn, version, migration, on_progress)
+        else:
+            _apply_schema_migration(conn, version, migration)
+
+
+def migration_status(conn: sqlite3.Connection) -> Dict[str, Any]:
+    # Read-only: served from reader connections.
+    current_version = 0
+    if _table_exists(conn, "schema_version"):
+        row = conn.execute("SELECT MAX(version) AS version FROM schema_version;").fetchone()
+        current_version = int(row["version"] or 0)
+    progress: Dict[int, Dict[str, Any]] = {}
+    if _table_exists(conn, "migration_progress"):
+        progress = {
+            row["version"]: dict(row)
+            for row in conn.execute(
+                "SELECT version, last_key, chunks, updated_at FROM migration_progress;"
+            ).fetchall()
+        }
+    pending: List[Dict[str, Any]] = []
+    for version, migration in MIGRATIONS:
+        if version <= current_version:
+            continue
+        entry: Dict[str, Any] = {
+            "version": version,
+            "kind": "data" if isinstance(migration, DataMigration) else "schema",
+        }
+        if isinstance(migration, DataMigration):
+            entry["name"] = migration.name
+            entry["progress"] = progress.get(version)
+        pending.append(entry)
+    return {"schema_version": current_version, "pending": pending}
 
 
 def init_db(db_path: Union[Path, str, None] = None) -> Path:
-    conn = connect(db_path)
-    try:
-        apply_migrations(conn)
-    finally:
-        conn.close()
+    with migration_lock(db_path):
+        conn = connect(db_path)
+        try:
+            apply_migrations(conn)
+        finally:
+            conn.close()
     return _normalize_db_path(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply pending migrations online.")
+    parser.add_argument("db_path", nargs="?", default=None)
+    args = parser.parse_args()
+
+    def _report(version: int, name: str, last_key: int, chunks: int) -> None:
+        print(f"migration {version} ({name}): chunk {chunks}, up to key {last_key}")
+
+    with migration_lock(args.db_path):
+        conn = connect(args.db_path)
+        try:
+            apply_migrations(conn, _report)
+            print(f"schema version {_current_schema_version(conn)}")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Bounded executors ("lanes") for DB work. Cheap reads, heavy analytics and
+writes each get their own pool so a slow export can never hold up a save,
+and routes without DB access never touch a pool at all.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.budget import run_with_budget
+from app.config import get_lane_workers, get_write_timeout_ms, is_write_queue_enabled
+from app.db import connect, connect_readonly
+from app.writer import run_write, submit_to_writer
+
+
+def call_with_connection(fn: Callable[..., Any], *args: Any) -> Any:
+    conn = connect()
+    try:
+        return fn(conn, *args)
+    finally:
+        conn.close()
+
+
+def call_with_reader(fn: Callable[..., Any], *args: Any) -> Any:
+    conn = connect_readonly()
+    try:
+        # One read transaction per call: every query sees the same WAL
+        # snapshot, whatever the writer commits meanwhile.
+        conn.execute("BEGIN;")
+        return run_with_budget(conn, fn, *args)
+    finally:
+        conn.close()
+
+
+class DbLane:
+    def __init__(self, name: str, workers: int, readonly: bool = False) -> None:
+        self.name = name
+        self.workers = workers
+        self.readonly = readonly
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"db-{name}"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._stats = {"completed": 0, "failed": 0, "max_queued": 0, "wait_seconds": 0.0}
+
+    def _enter(self) -> float:
+        with self._lock:
+            self._queued += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._queued)
+        return time.perf_counter()
+
+    def _start(self, enqueued_at: float) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._stats["wait_seconds"] += time.perf_counter() - enqueued_at
+
+    def _finish(self, ok: bool) -> None:
+        with self._lock:
+            self._active -= 1
+            self._stats["completed" if ok else "failed"] += 1
+
+    def _tracked(self, enqueued_at: float, fn: Callable[..., Any], *args: Any) -> Any:
+        self._start(enqueued_at)
+        ok = False
+        try:
+            result = fn(*args)
+            ok = True
+            return result
+        finally:
+            self._finish(ok)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        enqueued_at = self._enter()
+        return await loop.run_in_executor(
+            self._executor, context.run, self._tracked, enqueued_at, fn, *args
+        )
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.readonly:
+            return await self.run(call_with_reader, fn, *args)
+        return await self.run(call_with_connection, fn, *args)
+
+    async def wait(self, future, timeout: Optional[float] = None) -> Any:
+        enqueued_at = self._enter()
+        self._start(enqueued_at)
+        ok = False
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            ok = True
+            return result
+        finally:
+            self._finish(ok)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"queued": self._queued, "active": self._active})
+        done = stats["completed"] + stats["failed"]
+        stats["avg_wait_ms"] = round(stats.pop("wait_seconds") * 1000 / done, 3) if done else 0.0
+        stats["name"] = self.name
+        stats["workers"] = self.workers
+        stats["readonly"] = self.readonly
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+READONLY_LANES = ("read", "analytics")
+
+_lanes: Dict[str, DbLane] = {}
+_lanes_lock = threading.Lock()
+
+
+def get_lane(name: str) -> DbLane:
+    with _lanes_lock:
+        lane = _lanes.get(name)
+        if lane is None:
+            lane = DbLane(name, get_lane_workers(name), readonly=name in READONLY_LANES)
+            _lanes[name] = lane
+        return lane
+
+
+def read_lane() -> DbLane:
+    return get_lane("read")
+
+
+def analytics_lane() -> DbLane:
+    return get_lane("analytics")
+
+
+def write_lane() -> DbLane:
+    return get_lane("write")
+
+
+async def submit_write(fn: Callable[..., Any], *args: Any) -> Any:
+    lane = write_lane()
+    if is_write_queue_enabled():
+        return await lane.wait(submit_to_writer(fn, *args), get_write_timeout_ms() / 1000)
+    return await lane.run(run_write, fn, *args)
+
+
+def lane_stats() -> Dict[str, Optional[Dict[str, Any]]]:
+    with _lanes_lock:
+        lanes = dict(_lanes)
+    return {name: lanes[name].stats() if name in lanes else None for name in ("read", "analytics", "write")}
@@ -0,0 +1,212 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Point-in-time view of an assessment's scores. A checkpoint stores every
+practice_score row of one assessment together with the last audit_log id it
+covers; reconstruction loads the nearest checkpoint at or before the
+requested time and replays only the audit rows written after it, reading the
+monthly retention archives for rows that no longer sit in audit_log.
+"""
+
+import json
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.audit import decode_payload
+from app.config import get_checkpoint_every, get_checkpoint_interval
+
+SCORE_FIELDS = (
+    "id",
+    "assessment_id",
+    "practice_id",
+    "score",
+    "evidence",
+    "poc",
+    "target_score",
+    "impact",
+    "effort",
+    "priority",
+    "target_date",
+    "notes",
+    "updated_at",
+)
+
+
+def _pack_scores(scores: Dict[int, Dict[str, Any]]) -> bytes:
+    text = json.dumps(
+        [scores[key] for key in sorted(scores)], ensure_ascii=False, separators=(",", ":")
+    )
+    return zlib.compress(text.encode("utf-8"))
+
+
+def _unpack_scores(raw: bytes) -> Dict[int, Dict[str, Any]]:
+    rows = json.loads(zlib.decompress(raw).decode("utf-8"))
+    return {row["practice_id"]: row for row in rows}
+
+
+def create_checkpoint(conn, assessment_id: int) -> int:
+    """Snapshot the current scores; must run inside the writer or a write lock."""
+    audit_row = conn.execute("SELECT COALESCE(MAX(id), 0) AS id FROM audit_log;").fetchone()
+    rows = conn.execute(
+        f"""
+        SELECT {", ".join(SCORE_FIELDS)}
+        FROM practice_score
+        WHERE assessment_id = ?;
+        """,
+        (assessment_id,),
+    ).fetchall()
+    scores = {row["practice_id"]: dict(row) for row in rows}
+    cursor = conn.execute(
+        """
+        INSERT INTO score_checkpoint (assessment_id, audit_id, as_of, scores)
+        VALUES (?, ?, datetime('now'), ?);
+        """,
+        (assessment_id, int(audit_row["id"]), _pack_scores(scores)),
+    )
+    conn.commit()
+    return int(cursor.lastrowid)
+
+
+def checkpoint_all(conn) -> List[int]:
+    rows = conn.execute("SELECT id FROM assessment ORDER BY id;").fetchall()
+    return [create_checkpoint(conn, row["id"]) for row in rows]
+
+
+def assessments_due(conn, min_changes: Optional[int] = None) -> List[int]:
+    threshold = get_checkpoint_every() if min_changes is None else min_changes
+    rows = conn.execute(
+        """
+        WITH last AS (
+            SELECT assessment_id, MAX(audit_id) AS audit_id
+            FROM score_checkpoint
+            GROUP BY assessment_id
+        )
+        SELECT ps.assessment_id AS assessment_id, COUNT(al.id) AS changes
+        FROM practice_score ps
+        LEFT JOIN last ON last.assessment_id = ps.assessment_id
+        JOIN audit_log al
+            ON al.entity_type = 'practice_score'
+           AND al.entity_id = ps.id
+           AND al.id > COALESCE(last.audit_id, 0)
+        GROUP BY ps.assessment_id
+        HAVING COUNT(al.id) >= ?
+        ORDER BY ps.assessment_id;
+        """,
+        (threshold,),
+    ).fetchall()
+    return [row["assessment_id"] for row in rows]
+
+
+def reconstruct_scores(
+    conn, assessment_id: int, as_of: str, archive_dir: Optional[Path] = None
+) -> Dict[int, Dict[str, Any]]:
+    checkpoint = conn.execute(
+        """
+        SELECT audit_id, scores
+        FROM score_checkpoint
+        WHERE assessment_id = ? AND as_of <= ?
+        ORDER BY as_of DESC, id DESC
+        LIMIT 1;
+        """,
+        (assessment_id, as_of),
+    ).fetchone()
+    if checkpoint is None:
+        scores: Dict[int, Dict[str, Any]] = {}
+        after_id = 0
+    else:
+        scores = _unpack_scores(checkpoint["scores"])
+        after_id = checkpoint["audit_id"]
+
+    rows = [
+        dict(row)
+        for row in conn.execute(
+            """
+            SELECT al.id AS id, al.new_data AS new_data
+            FROM practice_score ps
+            JOIN audit_log al
+                ON al.entity_type = 'practice_score'
+               AND al.entity_id = ps.id
+               AND al.id > ?
+            WHERE ps.assessment_id = ?
+              AND al.created_at <= ?
+            ORDER BY al.id;
+            """,
+            (after_id, assessment_id, as_of),
+        )
+    ]
+    # Retention moves old audit rows to monthly archive files; the ones past
+    # the checkpoint are replayed from there too. A row left in both by an
+    # interrupted archive run is applied once.
+    from app.retention import get_archived_score_changes
+
+    score_ids = [
+        row[0]
+        for row in conn.execute(
+            "SELECT id FROM practice_score WHERE assessment_id = ?;", (assessment_id,)
+        )
+    ]
+    seen = {row["id"] for row in rows}
+    archived = get_archived_score_changes(score_ids, after_id, as_of, archive_dir)
+    rows = sorted(
+        [row for row in archived if row["id"] not in seen] + rows, key=lambda row: row["id"]
+    )
+
+    for row in rows:
+        new_data = decode_payload(row["new_data"])
+        if new_data and "practice_id" in new_data:
+            scores[new_data["practice_id"]] = {
+                field: new_data.get(field) for field in SCORE_FIELDS
+            }
+    return scores
+
+
+class CheckpointWorker:
+    def __init__(self, read, write, interval: Optional[float] = None, scopes=None) -> None:
+        # ``read``/``write`` run fn(conn, *args) on a reader connection and on
+        # the writer (call_with_connection and run_write in the app);
+        # ``scopes`` returns one context manager per database to visit.
+        self._read = read
+        self._write = write
+        self._scopes = scopes
+        self.interval = get_checkpoint_interval() if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> List[int]:
+        if self._scopes is None:
+            return self._run_scope()
+        due: List[int] = []
+        for scope in self._scopes():
+            with scope:
+                due.extend(self._run_scope())
+        return due
+
+    def _run_scope(self) -> List[int]:
+        due = self._read(assessments_due)
+        for assessment_id in due:
+            self._write(create_checkpoint, assessment_id)
+        return due
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                # Checkpoints are an optimisation; try again next round.
+                continue
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="checkpoints", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
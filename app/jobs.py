@@ -0,0 +1,217 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Local background jobs. A report job renders its assessments on a process
+pool (APP_REPORT_WORKERS processes, started on first use) so that rendering
+never competes with request threads. Reports already on disk for the
+current data revision are reused without touching the pool. Job state is a
+small JSON file under reports/jobs/, replaced atomically on every change, so
+any server worker can answer a status poll or serve the result.
+"""
+
+import copy
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import get_report_dir, get_report_workers
+from app.reports import REPORT_TTL_SECONDS, build_report
+
+JOB_TTL_SECONDS = REPORT_TTL_SECONDS
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_job_dir(report_dir: Optional[Path] = None) -> Path:
+    return (report_dir or get_report_dir()) / "jobs"
+
+
+def _save(job: Dict[str, Any], job_dir: Path) -> None:
+    job_dir.mkdir(parents=True, exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=job_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(job, handle)
+    os.replace(temp, job_dir / f"{job['id']}.json")
+
+
+def load_job(job_id: str, job_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    if not _JOB_ID_RE.match(job_id):
+        return None
+    path = (job_dir or get_job_dir()) / f"{job_id}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job state as returned by the API, without server paths."""
+    view = {key: value for key, value in job.items() if key != "artifacts"}
+    view["progress"] = round(job["done"] / job["total"], 4) if job["total"] else 1.0
+    view["artifacts"] = [
+        {key: value for key, value in artifact.items() if key != "file"}
+        for artifact in job["artifacts"]
+    ]
+    return view
+
+
+def result_path(job: Dict[str, Any], job_dir: Optional[Path] = None) -> Optional[Path]:
+    """The HTML report of a single-assessment job, or a zip of all reports."""
+    job_dir = job_dir or get_job_dir()
+    files = [job_dir.parent / artifact["file"] for artifact in job["artifacts"]]
+    if job["status"] != "done" or any(not path.exists() for path in files):
+        return None
+    if len(files) == 1:
+        return files[0]
+    archive = job_dir / f"{job['id']}.zip"
+    if not archive.exists():
+        fd, temp = tempfile.mkstemp(dir=job_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as handle:
+            with zipfile.ZipFile(handle, "w", zipfile.ZIP_DEFLATED) as bundle:
+                for path in files:
+                    bundle.write(path, path.name)
+        os.replace(temp, archive)
+    return archive
+
+
+def prune_jobs(job_dir: Optional[Path] = None, ttl_seconds: float = JOB_TTL_SECONDS) -> int:
+    job_dir = job_dir or get_job_dir()
+    if not job_dir.exists():
+        return 0
+    cutoff = time.time() - ttl_seconds
+    removed = 0
+    for path in job_dir.iterdir():
+        if path.stat().st_mtime <= cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+class JobManager:
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rendered": 0, "reused": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a threaded server could copy a held lock.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers or get_report_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def submit_reports(
+        self, db_path: str, plan: List[Dict[str, Any]], report_dir: Optional[Path] = None
+    ) -> Dict[str, Any]:
+        job_dir = get_job_dir(report_dir)
+        prune_jobs(job_dir)
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": "report",
+            "status": "running",
+            "total": len(plan),
+            "done": 0,
+            "assessment_ids": [item["assessment_id"] for item in plan],
+            "artifacts": [],
+            "error": None,
+            "created_at": _now(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._stats["submitted"] += 1
+            _save(job, job_dir)
+        for item in plan:
+            if item["cached"]:
+                try:
+                    # Reused reports stay out of pruning for as long as this job.
+                    os.utime(item["path"])
+                except FileNotFoundError:
+                    item = dict(item, cached=False)
+                else:
+                    self._record(job["id"], job_dir, item, None)
+                    continue
+            try:
+                future = self._executor().submit(
+                    build_report, db_path, item["assessment_id"], item["path"]
+                )
+            except Exception as exc:
+                self._record(job["id"], job_dir, item, exc)
+                continue
+            future.add_done_callback(partial(self._on_done, job["id"], job_dir, item))
+        with self._lock:
+            return copy.deepcopy(job)
+
+    def _on_done(self, job_id: str, job_dir: Path, item: Dict[str, Any], future: Future) -> None:
+        error = future.exception()
+        if error is None:
+            # The worker renders the revision current when it runs.
+            item = dict(item, path=future.result()["path"])
+        self._record(job_id, job_dir, item, error)
+
+    def _record(
+        self, job_id: str, job_dir: Path, item: Dict[str, Any], error: Optional[BaseException]
+    ) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job["done"] += 1
+            if error is None:
+                path = Path(item["path"])
+                job["artifacts"].append(
+                    {
+                        "assessment_id": item["assessment_id"],
+                        "file": path.name,
+                        "size": path.stat().st_size if path.exists() else None,
+                        "reused": item["cached"],
+                    }
+                )
+                self._stats["reused" if item["cached"] else "rendered"] += 1
+            else:
+                job["error"] = f"assessment {item['assessment_id']}: {error}"
+            if job["done"] == job["total"]:
+                job["status"] = "failed" if job["error"] else "done"
+                job["finished_at"] = _now()
+                self._stats["failed" if job["error"] else "completed"] += 1
+                self._jobs.pop(job_id)
+            _save(job, job_dir)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["running"] = len(self._jobs)
+            stats["pool_started"] = self._pool is not None
+        stats["workers"] = self.workers or get_report_workers()
+        return stats
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = JobManager()
+
+
+def get_job_manager() -> JobManager:
+    return _manager
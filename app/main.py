@@ -3,25 +3,59 @@ Author: eric vanoverbeke
 Date: 2026-01-18
 """
 
+from datetime import datetime
 from pathlib import Path
 import os
 import sqlite3
 import signal
+import sys
 import threading
 import time
-from typing import Optional
+
+_IMPORT_STARTED = time.perf_counter()
+
+from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from app.config import get_default_language, is_quit_allowed
-from app.db import connect
+from app.admission import AdmissionController, AdmissionMiddleware
+from app.budget import BudgetPolicy, QueryBudgetExceeded, QueryBudgetMiddleware, budget_stats
+from app.config import (
+    SUPPORTED_LANGS,
+    get_attachment_max_bytes,
+    get_db_path,
+    get_default_language,
+    get_report_dir,
+    get_server_master_pid,
+    is_admin_allowed,
+    is_quit_allowed,
+)
+from app.db import connect_readonly, migration_status
+from app.executors import (
+    analytics_lane,
+    call_with_reader,
+    lane_stats,
+    read_lane,
+    submit_write,
+    write_lane,
+)
+from app.history import CheckpointWorker
+from app.querylog import get_slow_query_log
 from app.seed import seed_db
-from app import services
+from app.startup import Startup, StartupGate, get_startup_profile
+from app.writer import close_write_queues, run_write, write_queue_stats
+from app import audit, blobs, cache, portfolio, retention, services, tenants
+
+# app.backup, app.jobs and app.reports (process pools, gzip, zip) are only
+# needed by their own routes and are imported there, off the startup path.
+get_startup_profile().record("import_app_main", _IMPORT_STARTED)
 
 WEB_INDEX_PATH = Path(__file__).resolve().parents[1] / "web" / "index.html"
 LEGAL_NOTICE_PATH = Path(__file__).resolve().parents[1] / "docs" / "legal-notice.md"
+MAX_BULK_LINKS = 10000
 
 
 class AssessmentCreate(BaseModel):
@@ -30,6 +64,17 @@ class AssessmentCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class AssessmentClone(BaseModel):
+    name: Optional[str] = None
+    assessment_date: Optional[str] = None
+    notes: Optional[str] = None
+    domain_ids: Optional[List[int]] = None
+
+
+class ReportJobCreate(BaseModel):
+    assessment_ids: List[int]
+
+
 class AssetCreate(BaseModel):
     name: str
     asset_type: Optional[str] = None
@@ -56,19 +101,63 @@ class AssetLink(BaseModel):
     practice_id: int
 
 
-def index():
-    if WEB_INDEX_PATH.exists():
-        return FileResponse(WEB_INDEX_PATH)
-    return HTMLResponse(
-        "<h1>CTI-CMM</h1><p>UI not ready yet.</p>", status_code=200
-    )
+class AssetLinkBatch(BaseModel):
+    links: List[AssetLink]
+
+
+class AssetScore(BaseModel):
+    asset_id: int
+    practice_id: int
+    score: Optional[int] = None
+
+
+class AssetScoreBatch(BaseModel):
+    scores: List[AssetScore]
+
+
+class StaticFileCache:
+    """Keeps a static file in memory, reloaded when its mtime changes."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._entry: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[tuple]:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        entry = self._entry
+        if entry is None or entry[0] != mtime:
+            with self._lock:
+                content = self.path.read_bytes()
+                entry = (mtime, content, f'"{mtime:x}-{len(content):x}"')
+                self._entry = entry
+        return entry
+
+
+_index_cache = StaticFileCache(WEB_INDEX_PATH)
+
+
+async def index(request: Request):
+    entry = _index_cache.get()
+    if entry is None:
+        return HTMLResponse(
+            "<h1>CTI-CMM</h1><p>UI not ready yet.</p>", status_code=200
+        )
+    _, content, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content, media_type="text/html; charset=utf-8", headers=headers)
 
 
 def healthz():
     return {"status": "ok"}
 
 
-def legal_notice():
+async def legal_notice():
     if LEGAL_NOTICE_PATH.exists():
         return FileResponse(LEGAL_NOTICE_PATH, media_type="text/markdown")
     return HTMLResponse(
@@ -82,9 +171,15 @@ def config_payload():
 
 
 def request_shutdown() -> None:
+    master_pid = get_server_master_pid()
+
     def _shutdown() -> None:
         time.sleep(0.5)
-        os.kill(os.getpid(), signal.SIGINT)
+        if master_pid:
+            # Under app.server the supervisor stops every worker gracefully.
+            os.kill(master_pid, signal.SIGTERM)
+        else:
+            os.kill(os.getpid(), signal.SIGINT)
 
     thread = threading.Thread(target=_shutdown, daemon=True)
     thread.start()
@@ -97,172 +192,678 @@ def _validate_score(value: Optional[int], field_name: str) -> None:
         raise HTTPException(status_code=400, detail=f"{field_name} must be 0-3 or null")
 
 
+def _parse_date(value: str, field_name: str) -> str:
+    try:
+        return datetime.fromisoformat(value.strip().replace("T", " ")).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{field_name} must be an ISO date")
+
+
+def _parse_as_of(value: str) -> str:
+    text = value.strip().replace("T", " ")
+    try:
+        if len(text) == 10:
+            return datetime.fromisoformat(text).strftime("%Y-%m-%d 23:59:59")
+        return datetime.fromisoformat(text).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="as_of must be an ISO date or datetime")
+
+
+def _ensure_assessment(conn, assessment_id: int) -> None:
+    if not services.assessment_exists(conn, assessment_id):
+        raise HTTPException(status_code=404, detail="assessment not found")
+
+
+def _assessment_view(conn, fn, assessment_id: int):
+    _ensure_assessment(conn, assessment_id)
+    return fn(conn, assessment_id)
+
+
+def _assessment_view_as_of(conn, assessment_id: int, as_of: str, lang: str):
+    _ensure_assessment(conn, assessment_id)
+    return services.get_domains_as_of(conn, assessment_id, as_of, lang)
+
+
+def _asset_score_items(payload: AssetScoreBatch) -> List[tuple]:
+    if not payload.scores or len(payload.scores) > MAX_BULK_LINKS:
+        raise HTTPException(
+            status_code=400, detail=f"scores must hold 1-{MAX_BULK_LINKS} entries"
+        )
+    items = []
+    for entry in payload.scores:
+        if entry.asset_id <= 0 or entry.practice_id <= 0:
+            raise HTTPException(status_code=400, detail="invalid asset or practice")
+        _validate_score(entry.score, "score")
+        items.append((entry.asset_id, entry.practice_id, entry.score))
+    return items
+
+
+def _asset_score_rollup(conn, assessment_id: int, lang: str):
+    _ensure_assessment(conn, assessment_id)
+    return services.get_asset_score_rollup(conn, assessment_id, lang)
+
+
+def _request_language(request: Request, lang: Optional[str]) -> str:
+    if lang is not None:
+        lang = lang.strip().lower()
+        if lang not in SUPPORTED_LANGS:
+            raise HTTPException(status_code=400, detail=f"unsupported language: {lang}")
+        return lang
+    for part in request.headers.get("accept-language", "").split(","):
+        tag = part.split(";")[0].strip().lower()[:2]
+        if tag in SUPPORTED_LANGS:
+            return tag
+    return get_default_language()
+
+
+def _domains_unless_match(
+    conn, assessment_id: Optional[int], lang: str, if_none_match: Optional[str]
+):
+    # The validator only reads table revisions, so a 304 costs no tree work.
+    etag = services.domains_etag(conn, assessment_id, lang)
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return etag, None
+    return etag, services.get_domains(conn, assessment_id, lang)
+
+
+def _link_pairs(payload: AssetLinkBatch) -> List[tuple]:
+    if not payload.links or len(payload.links) > MAX_BULK_LINKS:
+        raise HTTPException(
+            status_code=400, detail=f"links must hold 1-{MAX_BULK_LINKS} pairs"
+        )
+    pairs = []
+    for link in payload.links:
+        if link.asset_id <= 0 or link.practice_id <= 0:
+            raise HTTPException(status_code=400, detail="invalid ids")
+        pairs.append((link.asset_id, link.practice_id))
+    return list(dict.fromkeys(pairs))
+
+
+def _require_admin(request: Request) -> None:
+    client_host = request.client.host if request.client else None
+    if not is_admin_allowed(client_host):
+        raise HTTPException(status_code=403, detail="admin access not allowed")
+
+
+def _init_database() -> None:
+    try:
+        seed_db()
+    except FileNotFoundError:
+        pass
+
+
+def _warm_framework() -> None:
+    conn = connect_readonly()
+    try:
+        for lang in sorted(SUPPORTED_LANGS):
+            services.get_domains(conn, None, lang)
+        services.get_domain_summaries(conn, None)
+        services.list_assessments(conn)
+        services.get_assessment_trends(conn)
+    finally:
+        conn.close()
+
+
+def _warm_portfolio() -> None:
+    conn = connect_readonly()
+    try:
+        portfolio.get_portfolio(conn)
+    finally:
+        conn.close()
+
+
 def create_app() -> FastAPI:
     app = FastAPI()
+    startup = Startup(
+        _init_database,
+        [
+            ("static", _index_cache.get),
+            ("framework", _warm_framework),
+            ("portfolio", _warm_portfolio),
+        ],
+    )
+    app.state.startup = startup
+    admission = AdmissionController()
+    app.state.admission = admission
+    budgets = BudgetPolicy()
+    app.add_middleware(QueryBudgetMiddleware, policy=budgets)
+    app.add_middleware(tenants.TenantMiddleware)
+    # Shed overload before tenant setup or any lane work is spent on it.
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+    # Added last, so it runs first: nothing reaches a DB route before init.
+    app.add_middleware(StartupGate, startup=startup)
+    checkpoints = CheckpointWorker(
+        call_with_reader, run_write, scopes=tenants.tenant_scopes
+    )
+
+    @app.exception_handler(QueryBudgetExceeded)
+    async def _query_budget_exceeded(request: Request, exc: QueryBudgetExceeded):
+        return JSONResponse(
+            {"detail": "query budget exceeded", "route": exc.route, "budget_ms": exc.budget_ms},
+            status_code=503,
+        )
 
     @app.on_event("startup")
     def _startup() -> None:
-        try:
-            seed_db()
-        except FileNotFoundError:
-            pass
+        startup.start()
+        checkpoints.start()
+
+    @app.on_event("shutdown")
+    def _shutdown() -> None:
+        checkpoints.stop()
+        jobs = sys.modules.get("app.jobs")
+        if jobs is not None:
+            jobs.get_job_manager().shutdown()
+        close_write_queues()
 
     app.get("/")(index)
     app.get("/legal-notice")(legal_notice)
-    app.get("/api/healthz")(healthz)
-    app.get("/api/config")(config_payload)
+
+    @app.get("/api/healthz")
+    async def get_healthz():
+        return healthz()
+
+    @app.get("/api/readyz")
+    async def get_readyz():
+        status = startup.status()
+        return JSONResponse(status, status_code=200 if status["status"] == "ready" else 503)
+
+    @app.get("/api/config")
+    async def get_config():
+        return config_payload()
 
     @app.post("/api/quit")
-    def post_quit(request: Request):
+    async def post_quit(request: Request):
         client_host = request.client.host if request.client else None
         if not is_quit_allowed(client_host):
             raise HTTPException(status_code=403, detail="shutdown not allowed")
         request_shutdown()
         return {"status": "shutting_down"}
 
-    @app.get("/api/domains")
-    def get_domains(assessment_id: Optional[int] = Query(None, gt=0)):
-        conn = connect()
+    @app.get("/api/admin/slow-queries")
+    async def get_slow_queries(request: Request):
+        _require_admin(request)
+        query_log = get_slow_query_log()
+        return {
+            "threshold_ms": query_log.threshold_ms,
+            "entries": query_log.entries(),
+        }
+
+    @app.get("/api/admin/write-queue")
+    async def get_write_queue_stats(request: Request):
+        _require_admin(request)
+        return write_queue_stats()
+
+    @app.get("/api/admin/executors")
+    async def get_executor_stats(request: Request):
+        _require_admin(request)
+        jobs = sys.modules.get("app.jobs")
+        return {
+            "lanes": lane_stats(),
+            "write_queues": write_queue_stats(),
+            "reports": jobs.get_job_manager().stats() if jobs is not None else None,
+            "admission": admission.stats(),
+            "query_budgets": budget_stats(budgets),
+        }
+
+    @app.get("/api/admin/admission")
+    async def get_admission_stats(request: Request):
+        _require_admin(request)
+        return admission.stats()
+
+    @app.post("/api/admin/audit/archive")
+    async def post_audit_archive(
+        request: Request,
+        older_than_days: Optional[int] = Query(None, ge=1),
+        chunk_size: Optional[int] = Query(None, ge=1, le=10000),
+    ):
+        _require_admin(request)
+        return await write_lane().run(
+            retention.run_retention, older_than_days, chunk_size
+        )
+
+    @app.get("/api/admin/backups")
+    async def get_backups(request: Request):
+        from app import backup
+
+        _require_admin(request)
+        return await analytics_lane().run(backup.list_backups)
+
+    @app.post("/api/admin/backups")
+    async def post_backup(request: Request, compress: bool = Query(False)):
+        from app import backup
+
+        _require_admin(request)
+        return await analytics_lane().run(backup.create_backup, None, None, compress)
+
+    @app.post("/api/admin/backups/{name}/restore")
+    async def post_backup_restore(request: Request, name: str):
+        from app import backup
+
+        _require_admin(request)
         try:
-            return services.get_domains(conn, assessment_id)
-        finally:
-            conn.close()
+            return await write_lane().run(backup.restore_backup, name)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="backup not found")
+        except RuntimeError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+
+    @app.get("/api/admin/tenants")
+    async def get_tenants(request: Request):
+        _require_admin(request)
+        return {**tenants.tenant_stats(), "write_queues": write_queue_stats()}
+
+    @app.post("/api/admin/tenants/{tenant}")
+    async def post_tenant(request: Request, tenant: str):
+        _require_admin(request)
+        try:
+            created = await write_lane().run(tenants.provision_tenant, tenant)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        return {"tenant": tenant.strip().lower(), "created": created}
+
+    @app.post("/api/admin/blobs/gc")
+    async def post_blobs_gc(request: Request):
+        _require_admin(request)
+        return await write_lane().call(blobs.collect_garbage)
+
+    @app.get("/api/admin/cache")
+    async def get_cache_stats(request: Request):
+        _require_admin(request)
+        return cache.cache_stats()
+
+    @app.get("/api/admin/migrations")
+    async def get_migrations(request: Request):
+        _require_admin(request)
+        return await read_lane().call(migration_status)
+
+    @app.get("/api/admin/audit/storage")
+    async def get_audit_storage(request: Request):
+        _require_admin(request)
+        return await analytics_lane().call(audit.measure_audit_storage)
+
+    @app.post("/api/admin/audit/compact")
+    async def post_audit_compact(
+        request: Request, chunk_size: int = Query(500, ge=1, le=10000)
+    ):
+        _require_admin(request)
+        return await write_lane().call(audit.convert_audit_log, chunk_size)
+
+    @app.get("/api/admin/audit/archives")
+    async def get_audit_archives(request: Request):
+        _require_admin(request)
+        return retention.list_archives()
+
+    @app.get("/api/admin/audit/archives/{month}")
+    async def get_audit_archive(
+        request: Request,
+        month: str,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = Query(0, ge=0),
+    ):
+        _require_admin(request)
+        try:
+            return await analytics_lane().run(
+                retention.get_archived_changes, month, limit, offset
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="archive not found")
+
+    @app.get("/api/domains")
+    async def get_domains(
+        request: Request,
+        assessment_id: Optional[int] = Query(None, gt=0),
+        as_of: Optional[str] = Query(None),
+        lang: Optional[str] = Query(None),
+    ):
+        lang = _request_language(request, lang)
+        if as_of is None:
+            etag, domains = await analytics_lane().call(
+                _domains_unless_match, assessment_id, lang, request.headers.get("if-none-match")
+            )
+            headers = {"ETag": etag, "Vary": "Accept-Language"}
+            if domains is None:
+                return Response(status_code=304, headers=headers)
+            return JSONResponse(domains, headers=headers)
+        if assessment_id is None:
+            raise HTTPException(status_code=400, detail="as_of requires assessment_id")
+        return await analytics_lane().call(
+            _assessment_view_as_of, assessment_id, _parse_as_of(as_of), lang
+        )
+
+    @app.get("/api/hierarchy/domains")
+    async def get_hierarchy_domains(assessment_id: Optional[int] = Query(None, gt=0)):
+        return await read_lane().call(services.get_domain_summaries, assessment_id)
+
+    @app.get("/api/hierarchy/domains/{domain_id}/objectives")
+    async def get_hierarchy_objectives(
+        domain_id: int, assessment_id: Optional[int] = Query(None, gt=0)
+    ):
+        objectives = await read_lane().call(
+            services.get_domain_objectives, domain_id, assessment_id
+        )
+        if objectives is None:
+            raise HTTPException(status_code=404, detail="domain not found")
+        return objectives
+
+    @app.get("/api/hierarchy/objectives/{objective_id}/practices")
+    async def get_hierarchy_practices(
+        objective_id: int,
+        assessment_id: Optional[int] = Query(None, gt=0),
+        after: int = Query(0, ge=0),
+        limit: int = Query(50, ge=1, le=500),
+    ):
+        page = await read_lane().call(
+            services.get_objective_practices, objective_id, assessment_id, after, limit
+        )
+        if page is None:
+            raise HTTPException(status_code=404, detail="objective not found")
+        return page
 
     @app.get("/api/assessments")
-    def get_assessments():
-        conn = connect()
-        try:
-            return services.list_assessments(conn)
-        finally:
-            conn.close()
+    async def get_assessments():
+        return await read_lane().call(services.list_assessments)
 
     @app.post("/api/assessments")
-    def post_assessment(payload: AssessmentCreate):
+    async def post_assessment(payload: AssessmentCreate):
         name = payload.name.strip()
         if not name:
             raise HTTPException(status_code=400, detail="name is required")
-        conn = connect()
+        assessment_id = await submit_write(
+            services.create_assessment, name, payload.assessment_date, payload.notes
+        )
+        return {"id": assessment_id}
+
+    @app.post("/api/assessments/{assessment_id}/clone")
+    async def post_assessment_clone(
+        assessment_id: int, payload: Optional[AssessmentClone] = None
+    ):
+        payload = payload or AssessmentClone()
+        name = payload.name.strip() if payload.name is not None else None
+        if name == "":
+            raise HTTPException(status_code=400, detail="name is required")
+        result = await submit_write(
+            services.clone_assessment,
+            assessment_id,
+            name,
+            payload.assessment_date,
+            payload.notes,
+            payload.domain_ids,
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="assessment not found")
+        return result
+
+    @app.post("/api/reports/jobs", status_code=202)
+    async def post_report_job(payload: ReportJobCreate):
+        from app import jobs, reports
+
+        assessment_ids = list(dict.fromkeys(payload.assessment_ids))
+        if not assessment_ids or len(assessment_ids) > 500:
+            raise HTTPException(status_code=400, detail="assessment_ids must hold 1-500 ids")
         try:
-            assessment_id = services.create_assessment(
-                conn, name, payload.assessment_date, payload.notes
+            plan = await read_lane().call(
+                reports.plan_reports, assessment_ids, get_report_dir()
             )
-        finally:
-            conn.close()
-        return {"id": assessment_id}
+        except LookupError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+        job = await run_in_threadpool(
+            jobs.get_job_manager().submit_reports, str(get_db_path()), plan, get_report_dir()
+        )
+        return jobs.job_view(job)
+
+    @app.get("/api/jobs/{job_id}")
+    async def get_job(job_id: str):
+        from app import jobs
+
+        job = await run_in_threadpool(jobs.load_job, job_id, jobs.get_job_dir())
+        if job is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return jobs.job_view(job)
+
+    @app.get("/api/jobs/{job_id}/result")
+    async def get_job_result(job_id: str):
+        from app import jobs
+
+        job = await run_in_threadpool(jobs.load_job, job_id, jobs.get_job_dir())
+        if job is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"job is {job['status']}")
+        path = await run_in_threadpool(jobs.result_path, job, jobs.get_job_dir())
+        if path is None:
+            raise HTTPException(status_code=410, detail="report expired, submit a new job")
+        media_type = "text/html" if path.suffix == ".html" else "application/zip"
+        return FileResponse(path, media_type=media_type, filename=path.name)
 
     @app.get("/api/dashboard")
-    def get_dashboard(assessment_id: int = Query(..., gt=0)):
-        conn = connect()
-        try:
-            if not services.assessment_exists(conn, assessment_id):
-                raise HTTPException(status_code=404, detail="assessment not found")
-            return services.get_dashboard(conn, assessment_id)
-        finally:
-            conn.close()
+    async def get_dashboard(assessment_id: int = Query(..., gt=0)):
+        return await read_lane().call(
+            _assessment_view, services.get_dashboard, assessment_id
+        )
 
     @app.get("/api/backlog")
-    def get_backlog(assessment_id: int = Query(..., gt=0)):
-        conn = connect()
-        try:
-            if not services.assessment_exists(conn, assessment_id):
-                raise HTTPException(status_code=404, detail="assessment not found")
-            return services.get_backlog(conn, assessment_id)
-        finally:
-            conn.close()
+    async def get_backlog(assessment_id: int = Query(..., gt=0)):
+        return await read_lane().call(
+            _assessment_view, services.get_backlog, assessment_id
+        )
 
     @app.get("/api/assessment-trends")
-    def get_assessment_trends():
-        conn = connect()
-        try:
-            return services.get_assessment_trends(conn)
-        finally:
-            conn.close()
+    async def get_assessment_trends():
+        return await analytics_lane().call(services.get_assessment_trends)
+
+    @app.get("/api/portfolio")
+    async def get_portfolio():
+        return await analytics_lane().call(portfolio.get_portfolio)
 
     @app.get("/api/evolution")
-    def get_evolution(days: int = Query(30, ge=1, le=365)):
-        conn = connect()
-        try:
-            return services.get_evolution(conn, days)
-        finally:
-            conn.close()
+    async def get_evolution(
+        days: int = Query(30, ge=1, le=36500),
+        granularity: str = Query("day", pattern="^(hour|day|week|month)$"),
+        start: Optional[str] = Query(None),
+        end: Optional[str] = Query(None),
+    ):
+        start_value = _parse_date(start, "start") if start else None
+        end_value = _parse_date(end, "end") if end else None
+        return await analytics_lane().call(
+            services.get_evolution, days, granularity, start_value, end_value
+        )
 
     @app.get("/api/recent-changes")
-    def get_recent_changes(limit: int = Query(15, ge=1, le=100)):
-        conn = connect()
-        try:
-            return services.get_recent_changes(conn, limit)
-        finally:
-            conn.close()
+    async def get_recent_changes(limit: int = Query(15, ge=1, le=100)):
+        return await read_lane().call(services.get_recent_changes, limit)
 
     @app.get("/api/assets")
-    def get_assets():
-        conn = connect()
-        try:
-            return services.list_assets(conn)
-        finally:
-            conn.close()
+    async def get_assets():
+        return await read_lane().call(services.list_assets)
 
     @app.get("/api/asset-coverage")
-    def get_asset_coverage():
-        conn = connect()
-        try:
-            return services.get_asset_coverage(conn)
-        finally:
-            conn.close()
+    async def get_asset_coverage():
+        return await analytics_lane().call(services.get_asset_coverage)
 
     @app.post("/api/assets")
-    def post_assets(payload: AssetCreate):
+    async def post_assets(payload: AssetCreate):
         name = payload.name.strip()
         if not name:
             raise HTTPException(status_code=400, detail="name is required")
-        conn = connect()
-        try:
-            asset_id = services.create_asset(
-                conn, name, payload.asset_type, payload.criticality, payload.tags
-            )
-        finally:
-            conn.close()
+        asset_id = await submit_write(
+            services.create_asset, name, payload.asset_type, payload.criticality, payload.tags
+        )
         return {"id": asset_id}
 
     @app.post("/api/asset-links")
-    def post_asset_link(payload: AssetLink):
+    async def post_asset_link(payload: AssetLink):
         if payload.asset_id <= 0 or payload.practice_id <= 0:
             raise HTTPException(status_code=400, detail="invalid ids")
-        conn = connect()
         try:
-            try:
-                created = services.link_asset_practice(
-                    conn, payload.asset_id, payload.practice_id
-                )
-            except sqlite3.IntegrityError:
-                raise HTTPException(
-                    status_code=400, detail="invalid asset or practice"
-                )
-        finally:
-            conn.close()
+            created = await submit_write(
+                services.link_asset_practice, payload.asset_id, payload.practice_id
+            )
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="invalid asset or practice")
         return {"created": created}
 
+    @app.post("/api/asset-links/bulk")
+    async def post_asset_links_bulk(payload: AssetLinkBatch):
+        pairs = _link_pairs(payload)
+        try:
+            return await submit_write(services.link_asset_practices, pairs)
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="invalid asset or practice")
+
+    @app.post("/api/asset-links/bulk-delete")
+    async def post_asset_links_bulk_delete(payload: AssetLinkBatch):
+        return await submit_write(services.unlink_asset_practices, _link_pairs(payload))
+
+    @app.get("/api/asset-coverage/matrix")
+    async def get_asset_coverage_matrix():
+        matrix = await analytics_lane().call(services.get_coverage_matrix)
+        # Hex strings: a bitset wider than 53 bits does not survive a JS number.
+        return {
+            "practice_ids": matrix["practice_ids"],
+            "practice_codes": matrix["practice_codes"],
+            "assets": [
+                {
+                    "id": asset["id"],
+                    "name": asset["name"],
+                    "criticality": asset["criticality"],
+                    "bits": format(asset["bits"], "x"),
+                }
+                for asset in matrix["assets"]
+            ],
+        }
+
+    @app.get("/api/asset-coverage/gaps")
+    async def get_asset_coverage_gaps(min_criticality: int = Query(4, ge=0)):
+        return await analytics_lane().call(services.get_uncovered_practices, min_criticality)
+
+    @app.get("/api/practices/{practice_id}/missing-assets")
+    async def get_practice_missing_assets(practice_id: int):
+        assets = await analytics_lane().call(services.get_assets_missing_practice, practice_id)
+        if assets is None:
+            raise HTTPException(status_code=404, detail="practice not found")
+        return assets
+
     @app.post("/api/scores")
-    def post_score(payload: ScoreUpsert):
+    async def post_score(payload: ScoreUpsert):
         if payload.assessment_id <= 0 or payload.practice_id <= 0:
             raise HTTPException(status_code=400, detail="invalid ids")
         _validate_score(payload.score, "score")
         _validate_score(payload.target_score, "target_score")
-        conn = connect()
+        await read_lane().call(_ensure_assessment, payload.assessment_id)
+        payload_dict = (
+            payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
+        )
         try:
-            if not services.assessment_exists(conn, payload.assessment_id):
-                raise HTTPException(status_code=404, detail="assessment not found")
-            payload_dict = (
-                payload.model_dump() if hasattr(payload, "model_dump") else payload.dict()
-            )
-            try:
-                services.upsert_practice_score(conn, payload_dict)
-            except sqlite3.IntegrityError:
-                raise HTTPException(status_code=400, detail="invalid practice id")
-        finally:
-            conn.close()
+            await submit_write(services.upsert_practice_score, payload_dict)
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="invalid practice id")
         return {"status": "ok"}
 
+    @app.put("/api/assessments/{assessment_id}/asset-scores")
+    async def put_asset_scores(assessment_id: int, payload: AssetScoreBatch):
+        items = _asset_score_items(payload)
+        await read_lane().call(_ensure_assessment, assessment_id)
+        try:
+            return await submit_write(services.upsert_asset_scores, assessment_id, items)
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=400, detail="invalid asset or practice")
+
+    @app.get("/api/assessments/{assessment_id}/practices/{practice_id}/asset-scores")
+    async def get_asset_scores(assessment_id: int, practice_id: int):
+        return await read_lane().call(services.get_asset_scores, assessment_id, practice_id)
+
+    @app.get("/api/assessments/{assessment_id}/asset-rollup")
+    async def get_asset_rollup(
+        request: Request, assessment_id: int, lang: Optional[str] = Query(None)
+    ):
+        return await analytics_lane().call(
+            _asset_score_rollup, assessment_id, _request_language(request, lang)
+        )
+
+    @app.get("/api/assessments/{assessment_id}/practices/{practice_id}/attachments")
+    async def get_attachments(assessment_id: int, practice_id: int):
+        return await read_lane().call(services.list_attachments, assessment_id, practice_id)
+
+    @app.post("/api/assessments/{assessment_id}/practices/{practice_id}/attachments")
+    async def post_attachment(
+        request: Request,
+        assessment_id: int,
+        practice_id: int,
+        filename: str = Query(..., min_length=1, max_length=255),
+    ):
+        name = Path(filename.replace("\\", "/")).name.strip()
+        if not name:
+            raise HTTPException(status_code=400, detail="filename is required")
+        score_id = await read_lane().call(
+            services.get_practice_score_id, assessment_id, practice_id
+        )
+        if score_id is None:
+            raise HTTPException(status_code=404, detail="score not found")
+        max_bytes = get_attachment_max_bytes()
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise HTTPException(status_code=413, detail="attachment too large")
+
+        # Streamed: the body is hashed and written chunk by chunk, never held
+        # in memory as a whole.
+        writer = await run_in_threadpool(blobs.BlobWriter, max_bytes)
+        try:
+            async for chunk in request.stream():
+                if chunk:
+                    await run_in_threadpool(writer.write, chunk)
+            stored = await run_in_threadpool(writer.commit)
+        except blobs.BlobTooLarge:
+            await run_in_threadpool(writer.abort)
+            raise HTTPException(status_code=413, detail="attachment too large")
+        except BaseException:
+            await run_in_threadpool(writer.abort)
+            raise
+        content_type = request.headers.get("content-type") or "application/octet-stream"
+        attachment = await submit_write(
+            services.add_attachment,
+            assessment_id,
+            practice_id,
+            stored["sha256"],
+            name,
+            content_type,
+            stored["size"],
+        )
+        if attachment is None:
+            raise HTTPException(status_code=404, detail="score not found")
+        return {**attachment, "deduplicated": stored["deduplicated"]}
+
+    @app.get("/api/attachments/{attachment_id}")
+    async def get_attachment_file(attachment_id: int):
+        attachment = await read_lane().call(services.get_attachment, attachment_id)
+        if attachment is None:
+            raise HTTPException(status_code=404, detail="attachment not found")
+        path = blobs.blob_path(attachment["sha256"])
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="attachment content missing")
+        # FileResponse answers Range requests and streams straight from disk.
+        return FileResponse(
+            path,
+            media_type=attachment["content_type"],
+            filename=attachment["filename"],
+            headers={
+                "ETag": f'"{attachment["sha256"]}"',
+                "Cache-Control": "private, max-age=31536000, immutable",
+            },
+        )
+
+    @app.delete("/api/attachments/{attachment_id}")
+    async def delete_attachment(attachment_id: int):
+        if not await submit_write(services.delete_attachment, attachment_id):
+            raise HTTPException(status_code=404, detail="attachment not found")
+        return {"status": "deleted"}
+
     return app
 
 
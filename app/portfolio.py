@@ -0,0 +1,255 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Portfolio analytics across every assessment: per-domain and per-practice
+distributions (mean, standard deviation, percentiles, level histogram) and
+a maturity histogram per assessment month.
+
+Scores are loaded once per data revision into compact array columns. Since
+a score is one of four levels, every statistic is derived from per-group
+level histograms; NumPy computes them with bincount/cumsum when installed,
+otherwise a pure-Python path produces the same numbers.
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.cache import cached
+from app.revisions import get_revisions
+
+LEVELS = 4
+PERCENTILES = (25, 50, 75, 90)
+PORTFOLIO_TABLES = ("domain", "objective", "practice", "assessment", "practice_score")
+
+_numpy_state: Dict[str, Any] = {}
+
+
+def load_numpy():
+    """NumPy, or None; imported on first use to keep it off the startup path."""
+    if "module" not in _numpy_state:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional dependency
+            numpy = None
+        _numpy_state["module"] = numpy
+    return _numpy_state["module"]
+
+
+class ScoreColumns:
+    def __init__(self) -> None:
+        self.assessment = array("q")
+        self.practice = array("q")
+        self.domain = array("q")
+        self.period = array("q")
+        self.score = array("b")
+        self.domains: Dict[int, Dict[str, Any]] = {}
+        self.practices: Dict[int, Dict[str, Any]] = {}
+        self.periods: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+
+def load_columns(conn) -> ScoreColumns:
+    columns = ScoreColumns()
+    for row in conn.execute("SELECT id, code, name FROM domain ORDER BY id;"):
+        columns.domains[row["id"]] = {"code": row["code"], "name": row["name"]}
+    for row in conn.execute(
+        """
+        SELECT p.id, p.code, p.name, o.domain_id
+        FROM practice p
+        JOIN objective o ON o.id = p.objective_id
+        ORDER BY p.id;
+        """
+    ):
+        columns.practices[row["id"]] = {
+            "code": row["code"],
+            "name": row["name"],
+            "domain_id": row["domain_id"],
+        }
+    period_index: Dict[str, int] = {}
+    rows = conn.execute(
+        """
+        SELECT
+            ps.assessment_id AS assessment_id,
+            ps.practice_id AS practice_id,
+            o.domain_id AS domain_id,
+            substr(a.assessment_date, 1, 7) AS period,
+            ps.score AS score
+        FROM practice_score ps
+        JOIN assessment a ON a.id = ps.assessment_id
+        JOIN practice p ON p.id = ps.practice_id
+        JOIN objective o ON o.id = p.objective_id
+        WHERE ps.score IS NOT NULL
+        ORDER BY period;
+        """
+    )
+    for row in rows:
+        period = row["period"] or ""
+        index = period_index.get(period)
+        if index is None:
+            index = period_index[period] = len(columns.periods)
+            columns.periods.append(period)
+        columns.assessment.append(row["assessment_id"])
+        columns.practice.append(row["practice_id"])
+        columns.domain.append(row["domain_id"])
+        columns.period.append(index)
+        columns.score.append(row["score"])
+    return columns
+
+
+def _dense(keys: Sequence[int]) -> Tuple[List[int], List[int]]:
+    """Map ids to 0..n-1; returns (sorted unique ids, dense index per row)."""
+    unique = sorted(set(keys))
+    position = {key: index for index, key in enumerate(unique)}
+    return unique, [position[key] for key in keys]
+
+
+def _summaries_numpy(keys: array, scores: array) -> Tuple[List[int], List[Dict[str, Any]]]:
+    if not len(keys):
+        return [], []
+    np = load_numpy()
+    unique, index = np.unique(np.frombuffer(keys, dtype=np.int64), return_inverse=True)
+    size = len(unique)
+    levels = np.frombuffer(scores, dtype=np.int8).astype(np.int64)
+    hist = np.bincount(index * LEVELS + levels, minlength=size * LEVELS).reshape(size, LEVELS)
+    counts = hist.sum(axis=1)
+    values = np.arange(LEVELS)
+    safe = np.maximum(counts, 1)
+    means = (hist * values).sum(axis=1) / safe
+    variances = (hist * values * values).sum(axis=1) / safe - means * means
+    stds = np.sqrt(np.maximum(variances, 0.0))
+    cum = hist.cumsum(axis=1)
+
+    quantiles = {}
+    for q in PERCENTILES:
+        position = (q / 100.0) * np.maximum(counts - 1, 0)
+        lower = np.floor(position)
+        upper = np.ceil(position)
+        low_value = (cum <= lower[:, None]).sum(axis=1)
+        high_value = (cum <= upper[:, None]).sum(axis=1)
+        quantiles[q] = low_value + (high_value - low_value) * (position - lower)
+
+    summaries = []
+    for group in range(size):
+        count = int(counts[group])
+        summaries.append(
+            _summary(
+                count,
+                float(means[group]),
+                float(stds[group]),
+                {q: float(quantiles[q][group]) for q in PERCENTILES},
+                [int(value) for value in hist[group]],
+            )
+        )
+    return [int(key) for key in unique], summaries
+
+
+def _summaries_python(groups: Sequence[int], scores: Sequence[int], size: int) -> List[Dict[str, Any]]:
+    hists = [[0] * LEVELS for _ in range(size)]
+    for group, score in zip(groups, scores):
+        hists[group][score] += 1
+
+    summaries = []
+    for hist in hists:
+        count = sum(hist)
+        if not count:
+            summaries.append(_summary(0, 0.0, 0.0, {}, hist))
+            continue
+        mean = sum(level * n for level, n in enumerate(hist)) / count
+        variance = sum(level * level * n for level, n in enumerate(hist)) / count - mean * mean
+        cum = []
+        running = 0
+        for n in hist:
+            running += n
+            cum.append(running)
+        quantiles = {}
+        for q in PERCENTILES:
+            position = (q / 100.0) * (count - 1)
+            lower = int(position)
+            upper = lower if position == lower else lower + 1
+            low_value = sum(1 for c in cum if c <= lower)
+            high_value = sum(1 for c in cum if c <= upper)
+            quantiles[q] = low_value + (high_value - low_value) * (position - lower)
+        summaries.append(_summary(count, mean, max(variance, 0.0) ** 0.5, quantiles, hist))
+    return summaries
+
+
+def _summary(
+    count: int, mean: float, std: float, quantiles: Dict[int, float], histogram: List[int]
+) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "count": count,
+        "mean": round(mean, 4) if count else None,
+        "std": round(std, 4) if count else None,
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = round(quantiles[q], 4) if count else None
+    summary["histogram"] = histogram
+    return summary
+
+
+def _group_stats(keys: array, scores: array, use_numpy: bool) -> Tuple[List[int], List[Dict[str, Any]]]:
+    if use_numpy:
+        return _summaries_numpy(keys, scores)
+    unique, dense = _dense(keys)
+    return unique, _summaries_python(dense, scores, len(unique))
+
+
+def compute_portfolio(columns: ScoreColumns, use_numpy: Optional[bool] = None) -> Dict[str, Any]:
+    available = load_numpy() is not None
+    vectorized = available if use_numpy is None else (use_numpy and available)
+
+    domain_ids, domain_stats = _group_stats(columns.domain, columns.score, vectorized)
+    practice_ids, practice_stats = _group_stats(columns.practice, columns.score, vectorized)
+    period_ids, period_stats = _group_stats(columns.period, columns.score, vectorized)
+
+    assessments_per_period: Dict[int, set] = {}
+    for period, assessment_id in zip(columns.period, columns.assessment):
+        assessments_per_period.setdefault(period, set()).add(assessment_id)
+
+    domains = []
+    for domain_id, stats in zip(domain_ids, domain_stats):
+        label = columns.domains.get(domain_id, {})
+        domains.append({"domain_id": domain_id, "code": label.get("code"), "name": label.get("name"), **stats})
+
+    practices = []
+    for practice_id, stats in zip(practice_ids, practice_stats):
+        label = columns.practices.get(practice_id, {})
+        practices.append(
+            {
+                "practice_id": practice_id,
+                "code": label.get("code"),
+                "name": label.get("name"),
+                "domain_id": label.get("domain_id"),
+                **stats,
+            }
+        )
+
+    timeline = []
+    for period, stats in zip(period_ids, period_stats):
+        timeline.append(
+            {
+                "period": columns.periods[period],
+                "assessments": len(assessments_per_period.get(period, ())),
+                **stats,
+            }
+        )
+
+    return {
+        "engine": "numpy" if vectorized else "python",
+        "scores": len(columns),
+        "assessments": len(set(columns.assessment)),
+        "domains": domains,
+        "practices": practices,
+        "timeline": timeline,
+    }
+
+
+@cached(PORTFOLIO_TABLES)
+def get_portfolio(conn, use_numpy: Optional[bool] = None) -> Dict[str, Any]:
+    revisions = get_revisions(conn, PORTFOLIO_TABLES)
+    result = compute_portfolio(load_columns(conn), use_numpy)
+    result["revision"] = ".".join(str(value) for value in revisions)
+    return result
@@ -0,0 +1,269 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from app.config import get_log_dir, get_slow_query_threshold_ms
+
+SLOW_QUERY_LOG_NAME = "slow-queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 5
+SLOW_QUERY_BUFFER_SIZE = 200
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+
+
+def params_shape(params: Any) -> Any:
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    tables = []
+    for detail in plan:
+        if "AUTOMATIC" in detail:
+            tables.append(detail.split()[1])
+            continue
+        # Only SEARCH rows are bounded; SCAN ... USING (COVERING) INDEX still
+        # walks the whole index.
+        match = _SCAN_RE.match(detail)
+        if match is None or "CONSTANT ROW" in detail:
+            continue
+        tables.append(match.group(1))
+    return tables
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Any = ()) -> List[str]:
+    try:
+        rows = sqlite3.Connection.execute(
+            conn, f"EXPLAIN QUERY PLAN {sql}", params or ()
+        ).fetchall()
+    except sqlite3.Error:
+        return []
+    return [row[3] for row in rows]
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        threshold_ms: Optional[float] = None,
+        log_path: Optional[Path] = None,
+        buffer_size: int = SLOW_QUERY_BUFFER_SIZE,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.log_path = log_path
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+
+    def _file_logger(self) -> Optional[logging.Logger]:
+        if self.log_path is None:
+            return None
+        if self._logger is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            logger = logging.getLogger(f"app.querylog.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(
+                self.log_path,
+                maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def record(
+        self, conn: sqlite3.Connection, sql: str, params: Any, elapsed_ms: float
+    ) -> Optional[Dict[str, Any]]:
+        if self.threshold_ms is None or elapsed_ms < self.threshold_ms:
+            return None
+        return self._log(conn, sql, params, elapsed_ms)
+
+    def record_budget_violation(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        params: Any,
+        elapsed_ms: float,
+        route: str,
+        budget_ms: float,
+    ) -> Dict[str, Any]:
+        """Log a query interrupted by its route budget, whatever the threshold."""
+        return self._log(
+            conn, sql, params, elapsed_ms, route=route, budget_ms=budget_ms, budget_exceeded=True
+        )
+
+    def _log(
+        self, conn: sqlite3.Connection, sql: str, params: Any, elapsed_ms: float, **extra: Any
+    ) -> Dict[str, Any]:
+        plan = explain(conn, sql, params)
+        scans = full_scans(plan)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sql": " ".join(sql.split()),
+            "params_shape": params_shape(params),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "plan": plan,
+            "full_scan": bool(scans),
+            "scanned_tables": scans,
+        }
+        entry.update(extra)
+        with self._lock:
+            self._entries.append(entry)
+            logger = self._file_logger()
+        if logger is not None:
+            logger.info(json.dumps(entry, ensure_ascii=True, sort_keys=True))
+        return entry
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_slow_query_log: Optional[SlowQueryLog] = None
+_slow_query_log_lock = threading.Lock()
+
+
+def get_slow_query_log() -> SlowQueryLog:
+    global _slow_query_log
+    # Every profiled statement lands here: the lock is only for the first call.
+    query_log = _slow_query_log
+    if query_log is not None:
+        return query_log
+    with _slow_query_log_lock:
+        if _slow_query_log is None:
+            _slow_query_log = SlowQueryLog(
+                get_slow_query_threshold_ms(), get_log_dir() / SLOW_QUERY_LOG_NAME
+            )
+        return _slow_query_log
+
+
+def set_slow_query_log(query_log: Optional[SlowQueryLog]) -> None:
+    global _slow_query_log
+    with _slow_query_log_lock:
+        _slow_query_log = query_log
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Times a statement from execute until its rows are exhausted or it is closed.
+
+    SQLite steps a SELECT lazily as rows are fetched, so timing execute()
+    alone would log a slow query returning many rows as near-instant.
+    """
+
+    _query_log: Optional[SlowQueryLog] = None
+    _sql = ""
+    _params: Any = ()
+    _elapsed = 0.0
+
+    def _profile(self, query_log: SlowQueryLog, sql: str, params: Any, started: float) -> None:
+        self._query_log = query_log
+        self._sql = sql
+        self._params = params
+        self._elapsed = time.perf_counter() - started
+        if self.description is None:
+            # No result rows (DML, DDL): the statement is already done.
+            self._finish()
+
+    def _finish(self) -> None:
+        query_log = self._query_log
+        if query_log is None:
+            return
+        self._query_log = None
+        elapsed_ms = self._elapsed * 1000
+        if query_log.threshold_ms is not None and elapsed_ms >= query_log.threshold_ms:
+            query_log.record(self.connection, self._sql, self._params, elapsed_ms)
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - started
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - started
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - started
+        self._finish()
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        # A cursor dropped after fetchone() on a one-row query ends here.
+        self._finish()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # Last statement run, so an interrupted query can be named in the logs.
+    last_query: Optional[tuple] = None
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        self.last_query = (sql, parameters)
+        query_log = get_slow_query_log()
+        if query_log.threshold_ms is None:
+            return super().execute(sql, parameters)
+        cursor = self.cursor(ProfiledCursor)
+        started = time.perf_counter()
+        cursor.execute(sql, parameters)
+        cursor._profile(query_log, sql, parameters, started)
+        return cursor
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> sqlite3.Cursor:
+        self.last_query = (sql, ())
+        query_log = get_slow_query_log()
+        started = time.perf_counter()
+        cursor = super().executemany(sql, seq_of_parameters)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if query_log.threshold_ms is not None and elapsed_ms >= query_log.threshold_ms:
+            # The plan is the same for every parameter set: explain the first.
+            params = None
+            if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters:
+                params = seq_of_parameters[0]
+            query_log.record(self, sql, params, elapsed_ms)
+        return cursor
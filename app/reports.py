@@ -0,0 +1,255 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Printable maturity reports: one self-contained HTML file per assessment
+(summary, full practice table, backlog, trends, inline SVG charts). A report
+is stored under APP_DATA_DIR/reports/ with the revisions of every table it
+reads in its file name, so an unchanged assessment is served from disk and
+never rendered twice. The key and the content come from one read snapshot.
+
+Usage: python -m app.reports ASSESSMENT_ID [ASSESSMENT_ID ...]
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from app import services
+from app.config import get_report_dir
+from app.db import connect_readonly, init_db
+from app.revisions import get_revisions
+
+REPORT_TABLES = (
+    "domain",
+    "objective",
+    "practice",
+    "framework_text",
+    "assessment",
+    "practice_score",
+)
+# Reports of older revisions are kept as long as a finished job may serve them.
+REPORT_TTL_SECONDS = 24 * 3600
+
+_STYLE = """
+body { font-family: Helvetica, Arial, sans-serif; color: #1f2a2a; margin: 32px; }
+h1 { margin-bottom: 4px; }
+h2 { margin-top: 32px; border-bottom: 2px solid #2f6b6a; padding-bottom: 4px; }
+table { border-collapse: collapse; width: 100%; font-size: 12px; }
+th, td { border: 1px solid #d6d1c6; padding: 4px 6px; text-align: left; vertical-align: top; }
+th { background: #f3efe6; }
+.meta { color: #5b6666; }
+@media print { h2 { page-break-before: always; } }
+"""
+
+
+def _e(value: Any) -> str:
+    return "" if value is None else html.escape(str(value))
+
+
+def report_key(conn) -> str:
+    revisions = get_revisions(conn, REPORT_TABLES)
+    return hashlib.sha256(json.dumps(revisions).encode("ascii")).hexdigest()[:16]
+
+
+def report_path(assessment_id: int, key: str, report_dir: Optional[Path] = None) -> Path:
+    return (report_dir or get_report_dir()) / f"assessment-{assessment_id}-{key}.html"
+
+
+def plan_reports(
+    conn, assessment_ids: Sequence[int], report_dir: Optional[Path] = None
+) -> List[Dict[str, Any]]:
+    """Artifact path of each report at the current revision, and whether it exists."""
+    key = report_key(conn)
+    plan = []
+    for assessment_id in assessment_ids:
+        if not services.assessment_exists(conn, assessment_id):
+            raise LookupError(f"assessment {assessment_id} not found")
+        path = report_path(assessment_id, key, report_dir)
+        plan.append({"assessment_id": assessment_id, "path": str(path), "cached": path.exists()})
+    return plan
+
+
+def _bar_chart(series: List[Dict[str, Any]], max_value: float = 3.0) -> str:
+    if not series:
+        return "<p class='meta'>-</p>"
+    width, bar_height, label_width = 640, 18, 200
+    height = len(series) * (bar_height + 6) + 10
+    parts = [f'<svg viewBox="0 0 {width} {height}" width="{width}" height="{height}">']
+    for index, item in enumerate(series):
+        y = 5 + index * (bar_height + 6)
+        value = item["value"] or 0.0
+        length = (width - label_width - 50) * min(value / max_value, 1.0)
+        parts.append(
+            f'<text x="0" y="{y + 13}" font-size="11">{_e(item["label"])}</text>'
+            f'<rect x="{label_width}" y="{y}" width="{length:.1f}" height="{bar_height}"'
+            ' fill="#2f6b6a" />'
+            f'<text x="{label_width + length + 6:.1f}" y="{y + 13}" font-size="11">'
+            f"{value:.2f}</text>"
+        )
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def _table(headers: Sequence[str], rows: List[Sequence[Any]]) -> str:
+    head = "".join(f"<th>{_e(header)}</th>" for header in headers)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{_e(cell)}</td>" for cell in row) + "</tr>" for row in rows
+    )
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+
+def render_report(conn, assessment_id: int) -> str:
+    assessment = conn.execute(
+        "SELECT id, name, assessment_date, notes FROM assessment WHERE id = ?;",
+        (assessment_id,),
+    ).fetchone()
+    if assessment is None:
+        raise LookupError(f"assessment {assessment_id} not found")
+    dashboard = services.get_dashboard(conn, assessment_id)
+    domains = services.get_domains(conn, assessment_id)
+    backlog = services.get_backlog(conn, assessment_id)
+    trends = services.get_assessment_trends.uncached(conn)
+    generated = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+    practice_rows = [
+        (
+            practice["code"],
+            practice["name"],
+            practice["score"],
+            practice["target_score"],
+            practice["poc"],
+            practice["notes"],
+        )
+        for domain in domains
+        for objective in domain["objectives"]
+        for practice in objective["practices"]
+    ]
+    sections = [
+        f"<h1>{_e(assessment['name'])}</h1>",
+        f"<p class='meta'>{_e(assessment['assessment_date'])} - generated {generated}</p>",
+        f"<p>{_e(assessment['notes'])}</p>" if assessment["notes"] else "",
+        "<h2>Summary</h2>",
+        _bar_chart(
+            [
+                {
+                    "label": f"{row['domain_code']} {row['domain_name']}",
+                    "value": row["average_score"],
+                }
+                for row in dashboard
+            ]
+        ),
+        _table(
+            ("Domain", "Scored", "Total", "Completion %", "Average"),
+            [
+                (
+                    row["domain_code"],
+                    row["scored_practices"],
+                    row["total_practices"],
+                    row["completion_pct"],
+                    round(row["average_score"], 2) if row["average_score"] is not None else None,
+                )
+                for row in dashboard
+            ],
+        ),
+        "<h2>Practices</h2>",
+        _table(("Code", "Practice", "Score", "Target", "Owner", "Notes"), practice_rows),
+        "<h2>Backlog</h2>",
+        _table(
+            ("Priority", "Code", "Practice", "Score", "Target", "Target date"),
+            [
+                (
+                    row["computed_priority"],
+                    row["practice_code"],
+                    row["practice_name"],
+                    row["score"],
+                    row["target_score"],
+                    row["target_date"],
+                )
+                for row in backlog
+            ],
+        ),
+        "<h2>Trends</h2>",
+        _bar_chart(
+            [
+                {
+                    "label": f"{row['assessment_date']} {row['assessment_name']}",
+                    "value": row["average_score"],
+                }
+                for row in trends
+            ]
+        ),
+    ]
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{_e(assessment['name'])}</title><style>{_STYLE}</style></head>"
+        f"<body>{''.join(sections)}</body></html>"
+    )
+
+
+def build_report(db_path: str, assessment_id: int, target: str) -> Dict[str, Any]:
+    """Render one report; runs in a report worker process.
+
+    ``target`` is the path planned by plan_reports. The key is read again in
+    the snapshot the report is rendered from, so when the data moved on in
+    between, the report goes to the path of the revision it actually holds.
+    """
+    report_dir = Path(target).parent
+    conn = connect_readonly(db_path)
+    try:
+        conn.execute("BEGIN;")
+        target_path = report_path(assessment_id, report_key(conn), report_dir)
+        document = None if target_path.exists() else render_report(conn, assessment_id)
+    finally:
+        conn.close()
+    if document is not None:
+        report_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=report_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(document)
+        os.replace(temp, target_path)
+        prune_reports(assessment_id, target_path)
+    return {
+        "assessment_id": assessment_id,
+        "path": str(target_path),
+        "size": target_path.stat().st_size,
+    }
+
+
+def prune_reports(
+    assessment_id: int, current: Path, ttl_seconds: float = REPORT_TTL_SECONDS
+) -> int:
+    """Drop reports of older revisions once no job can still serve them."""
+    cutoff = min(current.stat().st_mtime, time.time() - ttl_seconds)
+    removed = 0
+    for stale in current.parent.glob(f"assessment-{assessment_id}-*.html"):
+        if stale != current and stale.stat().st_mtime < cutoff:
+            stale.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render assessment reports to HTML.")
+    parser.add_argument("assessment_ids", nargs="+", type=int)
+    args = parser.parse_args()
+
+    db_path = init_db()
+    conn = connect_readonly(db_path)
+    try:
+        plan = plan_reports(conn, args.assessment_ids)
+    finally:
+        conn.close()
+    results = [build_report(str(db_path), item["assessment_id"], item["path"]) for item in plan]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
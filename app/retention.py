@@ -0,0 +1,288 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Audit log retention: rows older than the configured age are moved into one
+SQLite file per month under APP_DATA_DIR/archive, a chunk at a time so
+writers only ever wait for one small batch. Each chunk is committed to the
+archive before it is deleted from the main database.
+
+Usage: python -m app.retention [--days N] [--chunk-size N] [--enable-incremental-vacuum]
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.audit import audit_row_view
+from app.config import (
+    get_archive_dir,
+    get_audit_archive_chunk,
+    get_audit_retention_days,
+)
+from app.db import connect, init_db
+from app.history import checkpoint_all
+
+ARCHIVE_PREFIX = "audit-"
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {schema}.audit_log (
+    id INTEGER PRIMARY KEY,
+    entity_type TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    old_data TEXT,
+    new_data TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {schema}.idx_audit_log_created_at ON audit_log (created_at);
+CREATE INDEX IF NOT EXISTS {schema}.idx_audit_log_entity ON audit_log (entity_type, entity_id);
+"""
+
+
+def archive_path(month: str, archive_dir: Optional[Path] = None) -> Path:
+    if not _MONTH_RE.match(month):
+        raise ValueError("month must be YYYY-MM")
+    return (archive_dir or get_archive_dir()) / f"{ARCHIVE_PREFIX}{month}.db"
+
+
+def _database_size(conn) -> Dict[str, int]:
+    page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count;").fetchone()[0]
+    freelist = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    return {
+        "bytes": page_size * page_count,
+        "free_bytes": page_size * freelist,
+    }
+
+
+def _attach_archive(conn, month: str, archive_dir: Optional[Path]) -> None:
+    path = archive_path(month, archive_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn.execute("ATTACH DATABASE ? AS archive;", (str(path),))
+    for statement in ARCHIVE_SCHEMA.format(schema="archive").split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def _open_archive(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _detach_archive(conn) -> None:
+    conn.execute("DETACH DATABASE archive;")
+
+
+def archive_audit_log(
+    conn,
+    older_than_days: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    days = get_audit_retention_days() if older_than_days is None else older_than_days
+    chunk = get_audit_archive_chunk() if chunk_size is None else chunk_size
+    cutoff = conn.execute("SELECT datetime('now', ?);", (f"-{days} days",)).fetchone()[0]
+    size_before = _database_size(conn)
+
+    months: Dict[str, int] = {}
+    chunks = 0
+    attached: Optional[str] = None
+    try:
+        while True:
+            rows = conn.execute(
+                """
+                SELECT id, strftime('%Y-%m', created_at) AS month
+                FROM audit_log
+                WHERE created_at < ?
+                ORDER BY created_at, id
+                LIMIT ?;
+                """,
+                (cutoff, chunk),
+            ).fetchall()
+            if not rows:
+                break
+            month = rows[0]["month"]
+            ids = [row["id"] for row in rows if row["month"] == month]
+            if attached != month:
+                if attached is not None:
+                    _detach_archive(conn)
+                _attach_archive(conn, month, archive_dir)
+                attached = month
+            placeholders = ", ".join("?" for _ in ids)
+            # SQLite does not commit across ATTACHed databases atomically in
+            # WAL mode: the copy is committed on its own first, then only ids
+            # the archive holds are deleted. INSERT OR IGNORE makes a rerun
+            # after a crash between the two idempotent.
+            conn.execute("BEGIN;")
+            try:
+                conn.execute(
+                    f"""
+                    INSERT OR IGNORE INTO archive.audit_log (
+                        id, entity_type, entity_id, action, old_data, new_data, created_at
+                    )
+                    SELECT id, entity_type, entity_id, action, old_data, new_data, created_at
+                    FROM main.audit_log
+                    WHERE id IN ({placeholders});
+                    """,
+                    ids,
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                conn.execute(
+                    f"""
+                    DELETE FROM main.audit_log
+                    WHERE id IN (
+                        SELECT id FROM archive.audit_log WHERE id IN ({placeholders})
+                    );
+                    """,
+                    ids,
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            months[month] = months.get(month, 0) + len(ids)
+            chunks += 1
+    finally:
+        if attached is not None:
+            _detach_archive(conn)
+
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum;").fetchone()[0]
+    if auto_vacuum == 2:
+        conn.execute("PRAGMA incremental_vacuum;").fetchall()
+        conn.commit()
+    size_after = _database_size(conn)
+
+    return {
+        "cutoff": cutoff,
+        "archived_rows": sum(months.values()),
+        "chunks": chunks,
+        "months": months,
+        "incremental_vacuum": auto_vacuum == 2,
+        "bytes_before": size_before["bytes"],
+        "bytes_after": size_after["bytes"],
+        "bytes_reclaimed": size_before["bytes"] - size_after["bytes"],
+        "free_bytes_after": size_after["free_bytes"],
+    }
+
+
+def enable_incremental_vacuum(conn) -> bool:
+    if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2:
+        return False
+    # Switching an existing database needs one full VACUUM.
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    conn.execute("VACUUM;")
+    return True
+
+
+def list_archives(archive_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    directory = archive_dir or get_archive_dir()
+    if not directory.exists():
+        return []
+    archives = []
+    for path in sorted(directory.glob(f"{ARCHIVE_PREFIX}*.db")):
+        month = path.stem[len(ARCHIVE_PREFIX):]
+        if not _MONTH_RE.match(month):
+            continue
+        archives.append({"month": month, "path": str(path), "bytes": path.stat().st_size})
+    return archives
+
+
+def get_archived_changes(
+    month: str,
+    limit: int = 100,
+    offset: int = 0,
+    archive_dir: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    path = archive_path(month, archive_dir)
+    if not path.exists():
+        raise FileNotFoundError(str(path))
+    conn = _open_archive(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT id, entity_type, entity_id, action, old_data, new_data, created_at
+            FROM audit_log
+            ORDER BY created_at DESC, id DESC
+            LIMIT ? OFFSET ?;
+            """,
+            (limit, offset),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [audit_row_view(dict(row)) for row in rows]
+
+
+def get_archived_score_changes(
+    score_ids: List[int],
+    after_id: int,
+    until: str,
+    archive_dir: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Archived practice_score audit rows after ``after_id`` up to ``until``, for replay."""
+    wanted = set(score_ids)
+    changes: List[Dict[str, Any]] = []
+    for archive in list_archives(archive_dir):
+        if not wanted or archive["month"] > until[:7]:
+            continue
+        conn = _open_archive(Path(archive["path"]))
+        try:
+            rows = conn.execute(
+                """
+                SELECT id, entity_id, new_data
+                FROM audit_log
+                WHERE id > ? AND entity_type = 'practice_score' AND created_at <= ?
+                ORDER BY id;
+                """,
+                (after_id, until),
+            ).fetchall()
+        finally:
+            conn.close()
+        changes.extend(dict(row) for row in rows if row["entity_id"] in wanted)
+    return changes
+
+
+def run_retention(
+    older_than_days: Optional[int] = None, chunk_size: Optional[int] = None
+) -> Dict[str, Any]:
+    conn = connect()
+    try:
+        # Archived rows leave the main file, so pin every assessment's current
+        # scores first; time travel before that replays the archives.
+        checkpoint_all(conn)
+        conn.isolation_level = None
+        return archive_audit_log(conn, older_than_days, chunk_size)
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old audit_log rows.")
+    parser.add_argument("--days", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--enable-incremental-vacuum", action="store_true")
+    args = parser.parse_args()
+
+    init_db()
+    if args.enable_incremental_vacuum:
+        conn = connect()
+        try:
+            conn.isolation_level = None
+            enable_incremental_vacuum(conn)
+        finally:
+            conn.close()
+    print(json.dumps(run_retention(args.days, args.chunk_size), indent=2))
+
+
+if __name__ == "__main__":
+    main()
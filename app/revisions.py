@@ -0,0 +1,91 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Per-table data revisions. Triggers bump table_revision on every insert,
+update or delete, so caches can key results on the revisions of the tables
+they read and stay correct across connections and processes.
+"""
+
+import itertools
+import os
+import threading
+import weakref
+from typing import Any, Dict, Iterable, Tuple
+
+TRACKED_TABLES = (
+    "domain",
+    "objective",
+    "practice",
+    "assessment",
+    "practice_score",
+    "asset",
+    "asset_practice",
+    "audit_log",
+)
+
+
+def revision_triggers_sql(table: str) -> str:
+    statements = [
+        f"INSERT OR IGNORE INTO table_revision (table_name, revision) VALUES ('{table}', 0);"
+    ]
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        statements.append(
+            f"""
+CREATE TRIGGER IF NOT EXISTS trg_{table}_revision_{event.lower()}
+AFTER {event} ON {table}
+BEGIN
+    UPDATE table_revision SET revision = revision + 1 WHERE table_name = '{table}';
+END;
+"""
+        )
+    return "\n".join(statements)
+
+
+REVISION_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS table_revision (
+    table_name TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+""" + "\n".join(revision_triggers_sql(table) for table in TRACKED_TABLES)
+
+
+def get_revisions(conn, tables: Iterable[str]) -> Tuple[int, ...]:
+    names = tuple(tables)
+    placeholders = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT table_name, revision FROM table_revision WHERE table_name IN ({placeholders});",
+        names,
+    ).fetchall()
+    found: Dict[str, int] = {row[0]: row[1] for row in rows}
+    return tuple(found.get(name, 0) for name in names)
+
+
+# In-memory databases live and die with their connection. id(conn) is reused
+# once a connection is collected, so each one gets a token that never is.
+_memory_tokens: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+_memory_counter = itertools.count(1)
+_memory_lock = threading.Lock()
+
+
+def _memory_token(conn) -> int:
+    # Plain sqlite3.Connection objects cannot be weakly referenced: the
+    # TypeError makes callers such as the result cache skip caching.
+    with _memory_lock:
+        token = _memory_tokens.get(conn)
+        if token is None:
+            token = next(_memory_counter)
+            _memory_tokens[conn] = token
+        return token
+
+
+def get_database_key(conn) -> str:
+    """Identifies the database content; a restore bumps PRAGMA user_version."""
+    for row in conn.execute("PRAGMA database_list;").fetchall():
+        if row[1] == "main" and row[2]:
+            generation = conn.execute("PRAGMA user_version;").fetchone()[0]
+            try:
+                return f"{row[2]}#{os.stat(row[2]).st_ino}#{generation}"
+            except OSError:
+                return f"{row[2]}#{generation}"
+    return f"memory:{_memory_token(conn)}"
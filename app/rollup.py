@@ -0,0 +1,136 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Activity rollups: audit_log counts pre-aggregated per hour, day, week and
+month. A trigger keeps activity_rollup current on every audit insert, so an
+evolution chart over any range reads a handful of index entries instead of
+grouping raw audit rows.
+
+Usage: python -m app.rollup --rebuild
+"""
+
+import argparse
+import json
+from typing import Dict
+
+# SQLite expression turning a timestamp into its bucket label, per granularity.
+BUCKET_EXPRESSIONS: Dict[str, str] = {
+    "hour": "strftime('%Y-%m-%d %H:00', {value})",
+    "day": "date({value})",
+    "week": "date({value}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m-01', {value})",
+}
+GRANULARITIES = tuple(BUCKET_EXPRESSIONS)
+
+ROLLUP_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS activity_rollup (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    action TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket, entity_type, action)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_audit_log_rollup
+AFTER INSERT ON audit_log
+BEGIN
+    INSERT INTO activity_rollup (granularity, bucket, entity_type, action, count)
+    VALUES
+        {values}
+    ON CONFLICT (granularity, bucket, entity_type, action)
+    DO UPDATE SET count = count + 1;
+END;
+""".format(
+    values=",\n        ".join(
+        f"('{name}', {expression.format(value='NEW.created_at')}, NEW.entity_type, NEW.action, 1)"
+        for name, expression in BUCKET_EXPRESSIONS.items()
+    )
+)
+
+_ROLLUP_COUNT_SQL = """
+INSERT INTO activity_rollup (granularity, bucket, entity_type, action, count)
+SELECT '{name}', {expression}, entity_type, action, COUNT(*)
+FROM audit_log
+WHERE {where}
+GROUP BY 2, entity_type, action
+ON CONFLICT (granularity, bucket, entity_type, action)
+DO UPDATE SET count = count + excluded.count;
+"""
+
+ROLLUP_BACKFILL_SQL = "\n".join(
+    _ROLLUP_COUNT_SQL.format(
+        name=name, expression=expression.format(value="created_at"), where="true"
+    )
+    for name, expression in BUCKET_EXPRESSIONS.items()
+)
+
+# Counts one audit_log id range (after, upto]; used by the chunked backfill.
+ROLLUP_RANGE_SQL = tuple(
+    _ROLLUP_COUNT_SQL.format(
+        name=name, expression=expression.format(value="created_at"), where="id > ? AND id <= ?"
+    )
+    for name, expression in BUCKET_EXPRESSIONS.items()
+)
+
+# Migration 6 only creates the table and trigger; rows audited before it are
+# counted afterwards by a chunked data migration, up to this recorded id.
+ROLLUP_BACKFILL_MARKER_SQL = """
+CREATE TABLE IF NOT EXISTS rollup_backfill (upto_id INTEGER NOT NULL);
+INSERT INTO rollup_backfill (upto_id) SELECT COALESCE(MAX(id), 0) FROM audit_log;
+"""
+
+
+def add_rollup_range(conn, after_id: int, upto_id: int) -> None:
+    for statement in ROLLUP_RANGE_SQL:
+        conn.execute(statement, (after_id, upto_id))
+
+
+def bucket_expression(granularity: str, value: str) -> str:
+    if granularity not in BUCKET_EXPRESSIONS:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return BUCKET_EXPRESSIONS[granularity].format(value=value)
+
+
+def rebuild_activity_rollup(conn) -> int:
+    """Recount from the rows still in audit_log (archived months are dropped)."""
+    conn.execute("DELETE FROM activity_rollup;")
+    # Everything is recounted here: a pending chunked backfill has nothing left.
+    conn.execute("DROP TABLE IF EXISTS rollup_backfill;")
+    for statement in ROLLUP_BACKFILL_SQL.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+    # Rollup readers are cached on the audit_log revision; counts changed.
+    conn.execute(
+        "UPDATE table_revision SET revision = revision + 1 WHERE table_name = 'audit_log';"
+    )
+    conn.commit()
+    row = conn.execute("SELECT COUNT(*) AS count FROM activity_rollup;").fetchone()
+    return int(row["count"])
+
+
+def main() -> None:
+    from app.db import connect, init_db
+
+    parser = argparse.ArgumentParser(description="Maintain the activity_rollup table.")
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    init_db()
+    conn = connect()
+    try:
+        if args.rebuild:
+            report = {"buckets": rebuild_activity_rollup(conn)}
+        else:
+            rows = conn.execute(
+                "SELECT granularity, COUNT(*) AS buckets FROM activity_rollup GROUP BY granularity;"
+            ).fetchall()
+            report = {row["granularity"]: row["buckets"] for row in rows}
+    finally:
+        conn.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
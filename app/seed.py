@@ -3,12 +3,14 @@ Author: eric vanoverbeke
 Date: 2026-01-18
 """
 
+import argparse
 import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from app.config import is_test_data_enabled
-from app.db import apply_migrations, connect
+from app.config import SUPPORTED_LANGS, is_test_data_enabled
+from app.db import apply_migrations, connect, migration_lock
+from app.history import checkpoint_all
 
 SEED_PATH = Path(__file__).resolve().parents[1] / "seed" / "domains.json"
 TEST_SEED_PATH = Path(__file__).resolve().parents[1] / "seed" / "test_data.json"
@@ -19,6 +21,76 @@ def load_seed_data(path: Path = SEED_PATH) -> Dict[str, Any]:
         return json.load(handle)
 
 
+def translation_seed_paths(path: Path = SEED_PATH) -> List[Path]:
+    """Translations shipped next to a seed file: domains.json -> domains.<lang>.json."""
+    return sorted(path.parent.glob(f"{path.stem}.*.json"))
+
+
+def import_translations(conn, payload: Dict[str, Any], lang: Optional[str] = None) -> int:
+    """Store the framework texts of ``payload`` for ``lang`` (or its "lang" key).
+
+    Entities are matched on their codes within the existing tree; unknown
+    codes are skipped. Returns the number of texts written.
+    """
+    lang = (lang or payload.get("lang") or "").strip().lower()
+    if lang not in SUPPORTED_LANGS:
+        raise ValueError(f"unsupported language: {lang or '(none)'}")
+
+    domain_ids = {row["code"]: row["id"] for row in conn.execute("SELECT id, code FROM domain;")}
+    objective_ids = {
+        (row["domain_id"], row["code"]): row["id"]
+        for row in conn.execute("SELECT id, domain_id, code FROM objective;")
+    }
+    practice_ids = {
+        (row["objective_id"], row["code"]): row["id"]
+        for row in conn.execute("SELECT id, objective_id, code FROM practice;")
+    }
+
+    texts = []
+    for domain in payload.get("domains", []):
+        domain_id = domain_ids.get(domain.get("code"))
+        if domain_id is None:
+            continue
+        texts.append(("domain", domain_id, domain))
+        for objective in domain.get("objectives", []):
+            objective_id = objective_ids.get((domain_id, objective.get("code")))
+            if objective_id is None:
+                continue
+            texts.append(("objective", objective_id, objective))
+            for practice in objective.get("practices", []):
+                practice_id = practice_ids.get((objective_id, practice.get("code")))
+                if practice_id is not None:
+                    texts.append(("practice", practice_id, practice))
+
+    rows = [
+        (entity_type, entity_id, lang, item.get("name"), item.get("description"))
+        for entity_type, entity_id, item in texts
+        if item.get("name")
+    ]
+    conn.executemany(
+        """
+        INSERT INTO framework_text (entity_type, entity_id, lang, name, description)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (lang, entity_type, entity_id) DO UPDATE SET
+            name = excluded.name,
+            description = excluded.description;
+        """,
+        rows,
+    )
+    conn.commit()
+    return len(rows)
+
+
+def seed_translations(conn, path: Path) -> int:
+    """Record the base seed texts under their language, then every translation file."""
+    written = 0
+    for source in [path] + translation_seed_paths(path):
+        payload = load_seed_data(source)
+        if payload.get("lang"):
+            written += import_translations(conn, payload)
+    return written
+
+
 def seed_reference_data(conn, payload: Dict[str, Any]) -> bool:
     row = conn.execute("SELECT COUNT(*) AS count FROM domain;").fetchone()
     if row["count"] > 0:
@@ -149,18 +221,52 @@ def seed_test_records(conn, payload: Dict[str, Any]) -> bool:
     return True
 
 
+def _is_empty(conn, table: str) -> bool:
+    return conn.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table});").fetchone()[0] == 1
+
+
 def seed_db() -> bool:
-    conn = connect()
-    try:
-        apply_migrations(conn)
-        seeded = False
-        if is_test_data_enabled():
-            payload = load_seed_data(TEST_SEED_PATH)
-            seeded |= seed_reference_data(conn, payload)
-            seeded |= seed_test_records(conn, payload)
-        else:
-            payload = load_seed_data(SEED_PATH)
-            seeded |= seed_reference_data(conn, payload)
-        return seeded
-    finally:
-        conn.close()
+    # Several server workers may start at once; one seeds, the others wait.
+    with migration_lock():
+        conn = connect()
+        try:
+            apply_migrations(conn)
+            seeded = False
+            # Seed files are only read when something is missing, which keeps
+            # an already initialised database off the JSON parsing path.
+            if is_test_data_enabled():
+                if _is_empty(conn, "domain") or _is_empty(conn, "assessment"):
+                    payload = load_seed_data(TEST_SEED_PATH)
+                    seeded |= seed_reference_data(conn, payload)
+                    if seed_test_records(conn, payload):
+                        # Seeded scores bypass the audit log; pin them for time travel.
+                        checkpoint_all(conn)
+                        seeded = True
+            elif _is_empty(conn, "domain"):
+                payload = load_seed_data(SEED_PATH)
+                seeded |= seed_reference_data(conn, payload)
+            if _is_empty(conn, "framework_text"):
+                seed_path = TEST_SEED_PATH if is_test_data_enabled() else SEED_PATH
+                seeded |= seed_translations(conn, seed_path) > 0
+            return seeded
+        finally:
+            conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import framework translations.")
+    parser.add_argument("path", type=Path, help="seed file with the same domains tree")
+    parser.add_argument("--lang", help="language of the file (default: its \"lang\" key)")
+    args = parser.parse_args()
+    with migration_lock():
+        conn = connect()
+        try:
+            apply_migrations(conn)
+            count = import_translations(conn, load_seed_data(args.path), args.lang)
+        finally:
+            conn.close()
+    print(f"{count} framework texts imported")
+
+
+if __name__ == "__main__":
+    main()
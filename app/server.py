@@ -0,0 +1,147 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Production entry point. The supervisor migrates and seeds the database under
+the migration lock, imports the app and warms its caches, binds the socket,
+then forks APP_WORKERS uvicorn workers that share it (copy-on-write, so the
+warm caches are shared too). uvloop/httptools are used when installed.
+SIGTERM, SIGINT or /api/quit in any worker stops the whole group gracefully.
+Without os.fork (Windows) a single in-process server is started.
+
+Usage: python -m app.server [--host HOST] [--port PORT] [--workers N]
+"""
+
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import sys
+from typing import Dict, Optional
+
+import uvicorn
+
+from app import portfolio
+from app.config import APP_SERVER_MASTER_PID_ENV, get_workers
+from app.db import connect_readonly
+from app.main import app as asgi_app
+from app.seed import seed_db
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _uvicorn_config(app, host: str, port: int) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        log_level="info",
+    )
+
+
+def preload():
+    """Work done once in the supervisor, before any worker exists."""
+    try:
+        seed_db()
+    except FileNotFoundError:
+        pass
+    conn = connect_readonly()
+    try:
+        portfolio.get_portfolio(conn)
+    finally:
+        conn.close()
+    return asgi_app
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, host: str, port: int) -> None:
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(_uvicorn_config(app, host, port))
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, app, sock: socket.socket, host: str, port: int, workers: int) -> None:
+        self.app = app
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(self.app, self.sock, self.host, self.port)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = slot
+
+    def _stop(self, signum: int, frame) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                # uvicorn treats SIGTERM as "finish in-flight requests, then exit".
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        os.environ[APP_SERVER_MASTER_PID_ENV] = str(os.getpid())
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self.stopping and os.waitstatus_to_exitcode(status) != 0:
+                # A crashed worker is replaced from the preloaded supervisor.
+                self._spawn(slot)
+        self.sock.close()
+        return 0
+
+
+def serve(host: str, port: int, workers: Optional[int] = None) -> int:
+    workers = workers or get_workers()
+    app = preload()
+    if workers == 1 or not hasattr(os, "fork"):
+        uvicorn.Server(_uvicorn_config(app, host, port)).run()
+        return 0
+    return Supervisor(app, _bind(host, port), host, port, workers).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the CTI-CMM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    sys.exit(serve(args.host, args.port, args.workers))
+
+
+if __name__ == "__main__":
+    main()
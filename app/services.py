@@ -3,15 +3,17 @@ Author: eric vanoverbeke
 Date: 2026-01-18
 """
 
-import json
-from datetime import date
+import copy
+import hashlib
+from datetime import date, datetime, timezone
 from typing import Any, Dict, List, Optional
 
-
-def _serialize_audit(payload: Optional[Dict[str, Any]]) -> Optional[str]:
-    if payload is None:
-        return None
-    return json.dumps(payload, ensure_ascii=True, sort_keys=True)
+from app.audit import decode_audit_pair, diff_audit_pair, encode_audit_pair, serialize_full
+from app.cache import cached
+from app.config import get_default_language
+from app.history import create_checkpoint, reconstruct_scores
+from app.revisions import get_database_key, get_revisions
+from app.rollup import bucket_expression
 
 
 def _audit_log(
@@ -22,18 +24,13 @@ def _audit_log(
     old_data: Optional[Dict[str, Any]],
     new_data: Optional[Dict[str, Any]],
 ) -> None:
+    old_raw, new_raw = encode_audit_pair(old_data, new_data)
     conn.execute(
         """
         INSERT INTO audit_log (entity_type, entity_id, action, old_data, new_data)
         VALUES (?, ?, ?, ?, ?);
         """,
-        (
-            entity_type,
-            entity_id,
-            action,
-            _serialize_audit(old_data),
-            _serialize_audit(new_data),
-        ),
+        (entity_type, entity_id, action, old_raw, new_raw),
     )
 
 
@@ -62,41 +59,54 @@ def _fetch_practice_score(conn, assessment_id: int, practice_id: int) -> Optiona
     return dict(row) if row else None
 
 
-def get_domains(conn, assessment_id: Optional[int] = None) -> List[Dict[str, Any]]:
+FRAMEWORK_TABLES = ("domain", "objective", "practice", "framework_text")
+SCORE_FIELDS = (
+    "score",
+    "evidence",
+    "poc",
+    "target_score",
+    "impact",
+    "effort",
+    "priority",
+    "target_date",
+    "notes",
+    "updated_at",
+)
+
+
+@cached(FRAMEWORK_TABLES)
+def get_framework_tree(conn, lang: str) -> List[Dict[str, Any]]:
+    """Domain > objective > practice skeleton with texts in ``lang``.
+
+    Missing translations fall back to the text stored on the entity itself.
+    """
     rows = conn.execute(
         """
         SELECT
             d.id AS domain_id,
             d.code AS domain_code,
-            d.name AS domain_name,
-            d.description AS domain_description,
+            COALESCE(dt.name, d.name) AS domain_name,
+            COALESCE(dt.description, d.description) AS domain_description,
             o.id AS objective_id,
             o.code AS objective_code,
-            o.name AS objective_name,
-            o.description AS objective_description,
+            COALESCE(ot.name, o.name) AS objective_name,
+            COALESCE(ot.description, o.description) AS objective_description,
             p.id AS practice_id,
             p.code AS practice_code,
-            p.name AS practice_name,
-            p.description AS practice_description,
-            ps.score AS score,
-            ps.evidence AS evidence,
-            ps.poc AS poc,
-            ps.target_score AS target_score,
-            ps.impact AS impact,
-            ps.effort AS effort,
-            ps.priority AS priority,
-            ps.target_date AS target_date,
-            ps.notes AS notes,
-            ps.updated_at AS updated_at
+            COALESCE(pt.name, p.name) AS practice_name,
+            COALESCE(pt.description, p.description) AS practice_description
         FROM domain d
+        LEFT JOIN framework_text dt
+            ON dt.lang = ?1 AND dt.entity_type = 'domain' AND dt.entity_id = d.id
         LEFT JOIN objective o ON o.domain_id = d.id
+        LEFT JOIN framework_text ot
+            ON ot.lang = ?1 AND ot.entity_type = 'objective' AND ot.entity_id = o.id
         LEFT JOIN practice p ON p.objective_id = o.id
-        LEFT JOIN practice_score ps
-            ON ps.practice_id = p.id
-           AND ps.assessment_id = ?
+        LEFT JOIN framework_text pt
+            ON pt.lang = ?1 AND pt.entity_type = 'practice' AND pt.entity_id = p.id
         ORDER BY d.id, o.id, p.id;
         """,
-        (assessment_id,),
+        (lang,),
     ).fetchall()
 
     domains: List[Dict[str, Any]] = []
@@ -143,22 +153,195 @@ def get_domains(conn, assessment_id: Optional[int] = None) -> List[Dict[str, Any
                 "code": row["practice_code"],
                 "name": row["practice_name"],
                 "description": row["practice_description"],
-                "score": row["score"],
-                "evidence": row["evidence"],
-                "poc": row["poc"],
-                "target_score": row["target_score"],
-                "impact": row["impact"],
-                "effort": row["effort"],
-                "priority": row["priority"],
-                "target_date": row["target_date"],
-                "notes": row["notes"],
-                "updated_at": row["updated_at"],
             }
         )
 
     return domains
 
 
+@cached(FRAMEWORK_TABLES + ("practice_score",))
+def get_domains(
+    conn, assessment_id: Optional[int] = None, lang: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # The joins live in the per-language skeleton; only the scores of the
+    # assessment are read here, from a single table.
+    skeleton = get_framework_tree(conn, lang or get_default_language())
+    scores: Dict[int, Any] = {}
+    if assessment_id is not None:
+        scores = {
+            row["practice_id"]: row
+            for row in conn.execute(
+                f"""
+                SELECT practice_id, {", ".join(SCORE_FIELDS)}
+                FROM practice_score
+                WHERE assessment_id = ?;
+                """,
+                (assessment_id,),
+            ).fetchall()
+        }
+
+    domains: List[Dict[str, Any]] = []
+    for domain in skeleton:
+        objectives = []
+        for objective in domain["objectives"]:
+            practices = []
+            for practice in objective["practices"]:
+                row = scores.get(practice["id"])
+                entry = dict(practice)
+                for field in SCORE_FIELDS:
+                    entry[field] = row[field] if row is not None else None
+                practices.append(entry)
+            objectives.append({**objective, "practices": practices})
+        domains.append({**domain, "objectives": objectives})
+    return domains
+
+
+def domains_etag(conn, assessment_id: Optional[int], lang: str) -> str:
+    """Validator for get_domains: changes with the data, language and assessment."""
+    revisions = get_revisions(conn, FRAMEWORK_TABLES + ("practice_score",))
+    raw = f"{get_database_key(conn)}|{lang}|{assessment_id}|{revisions}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def get_domains_as_of(
+    conn, assessment_id: int, as_of: str, lang: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # The cached tree is shared: overlay the past scores on a private copy.
+    domains = copy.deepcopy(get_domains(conn, None, lang))
+    scores = reconstruct_scores(conn, assessment_id, as_of)
+    for domain in domains:
+        for objective in domain["objectives"]:
+            for practice in objective["practices"]:
+                row = scores.get(practice["id"])
+                if row is None:
+                    continue
+                for field in SCORE_FIELDS:
+                    practice[field] = row.get(field)
+    return domains
+
+
+@cached(("domain", "objective", "practice", "practice_score"))
+def get_domain_summaries(conn, assessment_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        """
+        SELECT
+            d.id,
+            d.code,
+            d.name,
+            (SELECT COUNT(*) FROM objective o WHERE o.domain_id = d.id) AS objective_count,
+            (
+                SELECT COUNT(*)
+                FROM objective o
+                JOIN practice p ON p.objective_id = o.id
+                WHERE o.domain_id = d.id
+            ) AS practice_count,
+            (
+                SELECT COUNT(ps.score)
+                FROM objective o
+                JOIN practice p ON p.objective_id = o.id
+                JOIN practice_score ps
+                    ON ps.assessment_id = ?
+                   AND ps.practice_id = p.id
+                WHERE o.domain_id = d.id
+            ) AS scored_count
+        FROM domain d
+        ORDER BY d.id;
+        """,
+        (assessment_id,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+@cached(("domain", "objective", "practice", "practice_score"))
+def get_domain_objectives(
+    conn, domain_id: int, assessment_id: Optional[int] = None
+) -> Optional[List[Dict[str, Any]]]:
+    if conn.execute("SELECT 1 FROM domain WHERE id = ?;", (domain_id,)).fetchone() is None:
+        return None
+    rows = conn.execute(
+        """
+        SELECT
+            o.id,
+            o.code,
+            o.name,
+            o.description,
+            (SELECT COUNT(*) FROM practice p WHERE p.objective_id = o.id) AS practice_count,
+            (
+                SELECT COUNT(ps.score)
+                FROM practice p
+                JOIN practice_score ps
+                    ON ps.assessment_id = ?
+                   AND ps.practice_id = p.id
+                WHERE p.objective_id = o.id
+            ) AS scored_count
+        FROM objective o
+        WHERE o.domain_id = ?
+        ORDER BY o.id;
+        """,
+        (assessment_id, domain_id),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_objective_practices(
+    conn,
+    objective_id: int,
+    assessment_id: Optional[int] = None,
+    after: int = 0,
+    limit: int = 50,
+) -> Optional[Dict[str, Any]]:
+    """One page of an objective's practices, ordered by id.
+
+    Pages are keyed on the last practice id seen (``after``) rather than an
+    offset, so every page is a range seek on idx_practice_objective.
+    """
+    total_row = conn.execute(
+        """
+        SELECT
+            (SELECT COUNT(*) FROM objective WHERE id = ?) AS found,
+            (SELECT COUNT(*) FROM practice WHERE objective_id = ?) AS total;
+        """,
+        (objective_id, objective_id),
+    ).fetchone()
+    if not total_row["found"]:
+        return None
+    rows = conn.execute(
+        """
+        SELECT
+            p.id,
+            p.code,
+            p.name,
+            p.description,
+            ps.score,
+            ps.evidence,
+            ps.poc,
+            ps.target_score,
+            ps.impact,
+            ps.effort,
+            ps.priority,
+            ps.target_date,
+            ps.notes,
+            ps.updated_at
+        FROM practice p
+        LEFT JOIN practice_score ps
+            ON ps.assessment_id = ?
+           AND ps.practice_id = p.id
+        WHERE p.objective_id = ? AND p.id > ?
+        ORDER BY p.id
+        LIMIT ?;
+        """,
+        (assessment_id, objective_id, after, limit + 1),
+    ).fetchall()
+    items = [dict(row) for row in rows[:limit]]
+    return {
+        "objective_id": objective_id,
+        "total": total_row["total"],
+        "items": items,
+        "next_after": items[-1]["id"] if len(rows) > limit else None,
+    }
+
+
+@cached(("assessment",))
 def list_assessments(conn) -> List[Dict[str, Any]]:
     rows = conn.execute(
         """
@@ -197,6 +380,100 @@ def create_assessment(
     return assessment_id
 
 
+def clone_assessment(
+    conn,
+    source_id: int,
+    name: Optional[str] = None,
+    assessment_date: Optional[str] = None,
+    notes: Optional[str] = None,
+    domain_ids: Optional[List[int]] = None,
+) -> Optional[Dict[str, Any]]:
+    source = conn.execute(
+        "SELECT id, name, notes FROM assessment WHERE id = ?;", (source_id,)
+    ).fetchone()
+    if source is None:
+        return None
+    name = name or f"{source['name']} (copy)"
+    if not assessment_date:
+        assessment_date = date.today().isoformat()
+    if notes is None:
+        notes = source["notes"]
+    cursor = conn.execute(
+        "INSERT INTO assessment (name, assessment_date, notes) VALUES (?, ?, ?);",
+        (name, assessment_date, notes),
+    )
+    assessment_id = int(cursor.lastrowid)
+
+    domain_filter = ""
+    params: List[Any] = [assessment_id, source_id]
+    if domain_ids:
+        placeholders = ", ".join("?" for _ in domain_ids)
+        domain_filter = f"""
+          AND ps.practice_id IN (
+              SELECT p.id
+              FROM practice p
+              JOIN objective o ON o.id = p.objective_id
+              WHERE o.domain_id IN ({placeholders})
+          )"""
+        params.extend(domain_ids)
+    copied = conn.execute(
+        f"""
+        INSERT INTO practice_score (
+            assessment_id,
+            practice_id,
+            score,
+            evidence,
+            poc,
+            target_score,
+            impact,
+            effort,
+            priority,
+            target_date,
+            notes,
+            updated_at
+        )
+        SELECT
+            ?,
+            ps.practice_id,
+            ps.score,
+            ps.evidence,
+            ps.poc,
+            ps.target_score,
+            ps.impact,
+            ps.effort,
+            ps.priority,
+            ps.target_date,
+            ps.notes,
+            datetime('now')
+        FROM practice_score ps
+        WHERE ps.assessment_id = ?{domain_filter};
+        """,
+        params,
+    ).rowcount
+
+    # One summary entry instead of one per copied score; the checkpoint
+    # below gives time travel its starting point for the new assessment.
+    _audit_log(
+        conn,
+        "assessment",
+        assessment_id,
+        "clone",
+        None,
+        {
+            "id": assessment_id,
+            "name": name,
+            "assessment_date": assessment_date,
+            "notes": notes,
+            "source_id": source_id,
+            "domain_ids": domain_ids or None,
+            "scores_copied": copied,
+        },
+    )
+    create_checkpoint(conn, assessment_id)
+    conn.commit()
+    return {"id": assessment_id, "source_id": source_id, "scores_copied": copied}
+
+
 def assessment_exists(conn, assessment_id: int) -> bool:
     row = conn.execute(
         "SELECT 1 FROM assessment WHERE id = ?;", (assessment_id,)
@@ -261,6 +538,87 @@ def upsert_practice_score(conn, payload: Dict[str, Any]) -> int:
     return int(cursor.lastrowid or (new_row["id"] if new_row else 0))
 
 
+def get_practice_score_id(conn, assessment_id: int, practice_id: int) -> Optional[int]:
+    row = conn.execute(
+        "SELECT id FROM practice_score WHERE assessment_id = ? AND practice_id = ?;",
+        (assessment_id, practice_id),
+    ).fetchone()
+    return int(row["id"]) if row else None
+
+
+def add_attachment(
+    conn,
+    assessment_id: int,
+    practice_id: int,
+    sha256: str,
+    filename: str,
+    content_type: Optional[str],
+    size: int,
+) -> Optional[Dict[str, Any]]:
+    score_id = get_practice_score_id(conn, assessment_id, practice_id)
+    if score_id is None:
+        return None
+    cursor = conn.execute(
+        """
+        INSERT INTO attachment (practice_score_id, sha256, filename, content_type, size)
+        VALUES (?, ?, ?, ?, ?);
+        """,
+        (score_id, sha256, filename, content_type, size),
+    )
+    attachment = get_attachment(conn, int(cursor.lastrowid))
+    _audit_log(conn, "attachment", attachment["id"], "create", None, attachment)
+    conn.commit()
+    return attachment
+
+
+def get_attachment(conn, attachment_id: int) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        """
+        SELECT
+            at.id,
+            at.practice_score_id,
+            ps.assessment_id,
+            ps.practice_id,
+            at.sha256,
+            at.filename,
+            at.content_type,
+            at.size,
+            at.created_at
+        FROM attachment at
+        JOIN practice_score ps ON ps.id = at.practice_score_id
+        WHERE at.id = ?;
+        """,
+        (attachment_id,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def list_attachments(conn, assessment_id: int, practice_id: int) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        """
+        SELECT at.id, at.sha256, at.filename, at.content_type, at.size, at.created_at
+        FROM attachment at
+        JOIN practice_score ps ON ps.id = at.practice_score_id
+        WHERE ps.assessment_id = ? AND ps.practice_id = ?
+        ORDER BY at.id;
+        """,
+        (assessment_id, practice_id),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def delete_attachment(conn, attachment_id: int) -> bool:
+    attachment = get_attachment(conn, attachment_id)
+    if attachment is None:
+        return False
+    # The blob itself stays until app.blobs.collect_garbage finds it unused.
+    conn.execute("DELETE FROM attachment WHERE id = ?;", (attachment_id,))
+    _audit_log(conn, "attachment", attachment_id, "delete", attachment, None)
+    conn.commit()
+    return True
+
+
+@cached(("asset",))
 def list_assets(conn) -> List[Dict[str, Any]]:
     rows = conn.execute(
         """
@@ -272,6 +630,7 @@ def list_assets(conn) -> List[Dict[str, Any]]:
     return [dict(row) for row in rows]
 
 
+@cached(("asset", "asset_practice"))
 def get_asset_coverage(conn) -> List[Dict[str, Any]]:
     rows = conn.execute(
         """
@@ -335,6 +694,245 @@ def link_asset_practice(conn, asset_id: int, practice_id: int) -> bool:
     return cursor.rowcount > 0
 
 
+def _audit_many(conn, entity_type: str, action: str, entries: List[Any]) -> None:
+    rows = []
+    for entity_id, old_data, new_data in entries:
+        old_raw, new_raw = encode_audit_pair(old_data, new_data)
+        rows.append((entity_type, entity_id, action, old_raw, new_raw))
+    conn.executemany(
+        """
+        INSERT INTO audit_log (entity_type, entity_id, action, old_data, new_data)
+        VALUES (?, ?, ?, ?, ?);
+        """,
+        rows,
+    )
+
+
+def link_asset_practices(conn, pairs: List[Any]) -> Dict[str, int]:
+    """Link many (asset_id, practice_id) pairs in one transaction."""
+    entries = []
+    for asset_id, practice_id in pairs:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO asset_practice (asset_id, practice_id) VALUES (?, ?);",
+            (asset_id, practice_id),
+        )
+        if cursor.rowcount > 0:
+            entries.append(
+                (
+                    int(cursor.lastrowid),
+                    None,
+                    {"asset_id": asset_id, "practice_id": practice_id},
+                )
+            )
+    _audit_many(conn, "asset_practice", "create", entries)
+    conn.commit()
+    return {"linked": len(entries), "ignored": len(pairs) - len(entries)}
+
+
+def unlink_asset_practices(conn, pairs: List[Any]) -> Dict[str, int]:
+    """Remove many (asset_id, practice_id) links in one transaction."""
+    entries = []
+    for asset_id, practice_id in pairs:
+        row = conn.execute(
+            "DELETE FROM asset_practice WHERE asset_id = ? AND practice_id = ? RETURNING id;",
+            (asset_id, practice_id),
+        ).fetchone()
+        if row is not None:
+            entries.append(
+                (row[0], {"asset_id": asset_id, "practice_id": practice_id}, None)
+            )
+    _audit_many(conn, "asset_practice", "delete", entries)
+    conn.commit()
+    return {"unlinked": len(entries), "missing": len(pairs) - len(entries)}
+
+
+@cached(("asset", "practice", "asset_practice"))
+def get_coverage_matrix(conn) -> Dict[str, Any]:
+    """Asset x practice links as one integer bitset per asset.
+
+    Bit i of an asset's ``bits`` is set when it is linked to ``practice_ids[i]``;
+    built from three scans, whatever the number of assets and practices.
+    """
+    practices = conn.execute("SELECT id, code FROM practice ORDER BY id;").fetchall()
+    position = {row["id"]: index for index, row in enumerate(practices)}
+    assets = {
+        row["id"]: dict(row, bits=0)
+        for row in conn.execute("SELECT id, name, criticality FROM asset ORDER BY id;")
+    }
+    for asset_id, practice_id in conn.execute("SELECT asset_id, practice_id FROM asset_practice;"):
+        asset = assets.get(asset_id)
+        if asset is not None and practice_id in position:
+            asset["bits"] |= 1 << position[practice_id]
+    return {
+        "practice_ids": [row["id"] for row in practices],
+        "practice_codes": [row["code"] for row in practices],
+        "assets": list(assets.values()),
+    }
+
+
+def get_uncovered_practices(conn, min_criticality: int = 4) -> List[Dict[str, Any]]:
+    """Practices linked to no asset of criticality >= ``min_criticality``."""
+    matrix = get_coverage_matrix(conn)
+    covered = 0
+    for asset in matrix["assets"]:
+        if (asset["criticality"] or 0) >= min_criticality:
+            covered |= asset["bits"]
+    return [
+        {"id": practice_id, "code": code}
+        for index, (practice_id, code) in enumerate(
+            zip(matrix["practice_ids"], matrix["practice_codes"])
+        )
+        if not covered >> index & 1
+    ]
+
+
+def get_assets_missing_practice(conn, practice_id: int) -> Optional[List[Dict[str, Any]]]:
+    matrix = get_coverage_matrix(conn)
+    try:
+        mask = 1 << matrix["practice_ids"].index(practice_id)
+    except ValueError:
+        return None
+    return [
+        {"id": asset["id"], "name": asset["name"], "criticality": asset["criticality"]}
+        for asset in matrix["assets"]
+        if not asset["bits"] & mask
+    ]
+
+
+def upsert_asset_scores(conn, assessment_id: int, items: List[Any]) -> Dict[str, int]:
+    """Set many (asset_id, practice_id, score) in one transaction; None clears."""
+    created, updated, cleared = [], [], []
+    unchanged = 0
+    for asset_id, practice_id, score in items:
+        key = {"assessment_id": assessment_id, "asset_id": asset_id, "practice_id": practice_id}
+        if score is None:
+            row = conn.execute(
+                """
+                DELETE FROM asset_practice_score
+                WHERE assessment_id = ? AND practice_id = ? AND asset_id = ?
+                RETURNING score;
+                """,
+                (assessment_id, practice_id, asset_id),
+            ).fetchone()
+            if row is None:
+                unchanged += 1
+            else:
+                cleared.append((asset_id, {**key, "score": row[0]}, None))
+            continue
+        row = conn.execute(
+            """
+            SELECT score FROM asset_practice_score
+            WHERE assessment_id = ? AND practice_id = ? AND asset_id = ?;
+            """,
+            (assessment_id, practice_id, asset_id),
+        ).fetchone()
+        if row is not None and row[0] == score:
+            unchanged += 1
+            continue
+        conn.execute(
+            """
+            INSERT INTO asset_practice_score (assessment_id, practice_id, asset_id, score)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (assessment_id, practice_id, asset_id) DO UPDATE SET
+                score = excluded.score,
+                updated_at = datetime('now');
+            """,
+            (assessment_id, practice_id, asset_id, score),
+        )
+        if row is None:
+            created.append((asset_id, None, {**key, "score": score}))
+        else:
+            updated.append((asset_id, {**key, "score": row[0]}, {**key, "score": score}))
+    _audit_many(conn, "asset_practice_score", "create", created)
+    _audit_many(conn, "asset_practice_score", "update", updated)
+    _audit_many(conn, "asset_practice_score", "delete", cleared)
+    conn.commit()
+    return {
+        "written": len(created) + len(updated),
+        "cleared": len(cleared),
+        "unchanged": unchanged,
+    }
+
+
+def get_asset_scores(conn, assessment_id: int, practice_id: int) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        """
+        SELECT s.asset_id, a.name AS asset_name, a.criticality, s.score, s.updated_at
+        FROM asset_practice_score s
+        JOIN asset a ON a.id = s.asset_id
+        WHERE s.assessment_id = ? AND s.practice_id = ?
+        ORDER BY s.asset_id;
+        """,
+        (assessment_id, practice_id),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def _rollup_node(node: Dict[str, Any], parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    weighted = sum(part["weighted_sum"] for part in parts)
+    weight = sum(part["weight"] for part in parts)
+    scored = [part for part in parts if part["scored"]]
+    return {
+        **node,
+        "weighted_sum": weighted,
+        "weight": weight,
+        "scored": sum(part["scored"] for part in parts),
+        "asset_score": round(weighted / weight, 2) if weight else None,
+        "min_score": min((part["min_score"] for part in scored), default=None),
+        "max_score": max((part["max_score"] for part in scored), default=None),
+    }
+
+
+@cached(FRAMEWORK_TABLES + ("asset_practice_score", "asset"))
+def get_asset_score_rollup(
+    conn, assessment_id: int, lang: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Criticality-weighted asset scores rolled up practice > objective > domain.
+
+    Each asset counts with its criticality as weight (at least 1). One
+    grouped query over the assessment's key range does the heavy lifting;
+    the hierarchy comes from the cached framework skeleton.
+    """
+    rows = conn.execute(
+        """
+        SELECT
+            s.practice_id,
+            SUM(s.score * MAX(COALESCE(a.criticality, 1), 1)) AS weighted,
+            SUM(MAX(COALESCE(a.criticality, 1), 1)) AS weight,
+            COUNT(*) AS scored,
+            MIN(s.score) AS min_score,
+            MAX(s.score) AS max_score
+        FROM asset_practice_score s
+        JOIN asset a ON a.id = s.asset_id
+        WHERE s.assessment_id = ?
+        GROUP BY s.practice_id;
+        """,
+        (assessment_id,),
+    ).fetchall()
+    by_practice = {row["practice_id"]: row for row in rows}
+    empty = {"weighted": 0, "weight": 0, "scored": 0, "min_score": None, "max_score": None}
+
+    domains = []
+    for domain in get_framework_tree(conn, lang or get_default_language()):
+        objectives = []
+        for objective in domain["objectives"]:
+            practices = []
+            for practice in objective["practices"]:
+                row = by_practice.get(practice["id"]) or empty
+                part = {
+                    "weighted_sum": row["weighted"],
+                    "weight": row["weight"],
+                    "scored": row["scored"],
+                    "min_score": row["min_score"],
+                    "max_score": row["max_score"],
+                }
+                practices.append(_rollup_node(practice, [part]))
+            objectives.append(_rollup_node({**objective, "practices": practices}, practices))
+        domains.append(_rollup_node({**domain, "objectives": objectives}, objectives))
+
+    return domains
+
+
 def get_dashboard(conn, assessment_id: int) -> List[Dict[str, Any]]:
     rows = conn.execute(
         """
@@ -412,6 +1010,7 @@ def get_backlog(conn, assessment_id: int) -> List[Dict[str, Any]]:
     return [dict(row) for row in rows]
 
 
+@cached(("practice", "assessment", "practice_score"))
 def get_assessment_trends(conn) -> List[Dict[str, Any]]:
     total_row = conn.execute("SELECT COUNT(*) AS count FROM practice;").fetchone()
     total_practices = int(total_row["count"] or 0)
@@ -450,20 +1049,42 @@ def get_assessment_trends(conn) -> List[Dict[str, Any]]:
     return results
 
 
-def get_evolution(conn, days: int = 30) -> List[Dict[str, Any]]:
-    window = f"-{days} days"
+def _utc_today() -> str:
+    # Windows given in days are relative to SQLite's date('now'), in UTC.
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+@cached(("audit_log",), vary=_utc_today)
+def get_evolution(
+    conn,
+    days: int = 30,
+    granularity: str = "day",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    if start is None:
+        lower = bucket_expression(granularity, "date('now', ?)")
+        params: List[Any] = [granularity, f"-{days} days"]
+    else:
+        lower = bucket_expression(granularity, "?")
+        params = [granularity, start]
+    conditions = [f"bucket >= {lower}"]
+    if end is not None:
+        conditions.append(f"bucket <= {bucket_expression(granularity, '?')}")
+        params.append(end)
     rows = conn.execute(
-        """
+        f"""
         SELECT
-            date(created_at) AS day,
+            bucket,
             entity_type,
-            COUNT(*) AS count
-        FROM audit_log
-        WHERE date(created_at) >= date('now', ?)
-        GROUP BY day, entity_type
-        ORDER BY day DESC;
+            SUM(count) AS count
+        FROM activity_rollup
+        WHERE granularity = ?
+          AND {" AND ".join(conditions)}
+        GROUP BY bucket, entity_type
+        ORDER BY bucket DESC;
         """,
-        (window,),
+        params,
     ).fetchall()
 
     mapping = {
@@ -474,7 +1095,7 @@ def get_evolution(conn, days: int = 30) -> List[Dict[str, Any]]:
     }
     buckets: Dict[str, Dict[str, Any]] = {}
     for row in rows:
-        day = row["day"]
+        day = row["bucket"]
         entry = buckets.get(day)
         if entry is None:
             entry = {
@@ -506,9 +1127,53 @@ def get_recent_changes(conn, limit: int = 15) -> List[Dict[str, Any]]:
             new_data,
             created_at
         FROM audit_log
-        ORDER BY datetime(created_at) DESC, id DESC
+        ORDER BY created_at DESC, id DESC
         LIMIT ?;
         """,
         (limit,),
     ).fetchall()
-    return [dict(row) for row in rows]
+
+    changes = []
+    refs: Dict[str, set] = {"assessment": set(), "practice": set(), "asset": set()}
+    for row in rows:
+        old_data, new_data = decode_audit_pair(row["old_data"], row["new_data"])
+        payload = {**(old_data or {}), **(new_data or {})}
+        change = dict(row)
+        change["old_data"] = serialize_full(old_data)
+        change["new_data"] = serialize_full(new_data)
+        change["changes"] = diff_audit_pair(old_data, new_data)
+        change["assessment_id"] = payload.get("assessment_id")
+        change["practice_id"] = payload.get("practice_id")
+        change["asset_id"] = payload.get("asset_id")
+        if row["entity_type"] in ("assessment", "asset"):
+            change[f"{row['entity_type']}_id"] = row["entity_id"]
+        for kind, ids in refs.items():
+            if change[f"{kind}_id"] is not None:
+                ids.add(change[f"{kind}_id"])
+        changes.append(change)
+
+    # One primary-key lookup per referenced table for the whole page.
+    labels: Dict[str, Dict[int, Any]] = {}
+    for kind, columns in (
+        ("assessment", "id, name"),
+        ("practice", "id, code, name"),
+        ("asset", "id, name"),
+    ):
+        ids = sorted(refs[kind])
+        labels[kind] = {}
+        if ids:
+            placeholders = ", ".join("?" for _ in ids)
+            for label in conn.execute(
+                f"SELECT {columns} FROM {kind} WHERE id IN ({placeholders});", ids
+            ):
+                labels[kind][label["id"]] = label
+
+    for change in changes:
+        assessment = labels["assessment"].get(change["assessment_id"])
+        practice = labels["practice"].get(change["practice_id"])
+        asset = labels["asset"].get(change["asset_id"])
+        change["assessment_name"] = assessment["name"] if assessment else None
+        change["practice_code"] = practice["code"] if practice else None
+        change["practice_name"] = practice["name"] if practice else None
+        change["asset_name"] = asset["name"] if asset else None
+    return changes
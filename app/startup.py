@@ -0,0 +1,191 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Startup sequencing. The server accepts connections as soon as the app is
+imported: migrations and seeding run in a background thread while the UI
+shell is already served, and /api requests that need the database wait for
+them (StartupGate). Caches are then warmed in the same thread.
+/api/healthz answers "alive", /api/readyz answers "warm".
+
+With APP_STARTUP_PROFILE=1 the phase timings are printed to stderr once the
+app is warm. Usage: python -m app.startup (profiles a cold start in-process).
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.config import PROBE_PATHS, is_startup_profile_enabled
+
+# Routes that never touch the database and answer while startup is running.
+UNGATED_PATHS = PROBE_PATHS
+
+
+class StartupProfile:
+    def __init__(self) -> None:
+        self._phases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self, name: str, started: float, ended: Optional[float] = None, error: Optional[str] = None
+    ) -> None:
+        """Record a phase from perf_counter() timestamps."""
+        entry = {"name": name, "started": started, "ended": ended or time.perf_counter()}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._phases.append(entry)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self.record(name, started, error=error)
+
+    def phases(self) -> List[Dict[str, Any]]:
+        """Phases with their duration and start offset from the first one, in ms."""
+        with self._lock:
+            entries = list(self._phases)
+        if not entries:
+            return []
+        origin = min(entry["started"] for entry in entries)
+        phases = []
+        for entry in entries:
+            phase = {
+                "name": entry["name"],
+                "start_ms": round((entry["started"] - origin) * 1000, 1),
+                "ms": round((entry["ended"] - entry["started"]) * 1000, 1),
+            }
+            if "error" in entry:
+                phase["error"] = entry["error"]
+            phases.append(phase)
+        return phases
+
+
+_profile = StartupProfile()
+
+
+def get_startup_profile() -> StartupProfile:
+    return _profile
+
+
+class Startup:
+    """Runs ``init`` then each ``(name, warmer)`` once, in a background thread."""
+
+    def __init__(
+        self,
+        init: Callable[[], Any],
+        warmers: Sequence[Tuple[str, Callable[[], Any]]] = (),
+        profile: Optional[StartupProfile] = None,
+    ) -> None:
+        self.init = init
+        self.warmers = list(warmers)
+        self.profile = profile or _profile
+        self.db_ready: Future = Future()
+        self.warm = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="startup", daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        try:
+            with self.profile.phase("init_db"):
+                self.init()
+        except Exception as exc:
+            self.db_ready.set_exception(exc)
+            return
+        self.db_ready.set_result(True)
+        for name, warmer in self.warmers:
+            try:
+                with self.profile.phase(f"warm_{name}"):
+                    warmer()
+            except Exception:
+                # A cold cache is not an outage; the failure is in the profile.
+                pass
+        self.warm.set()
+        if is_startup_profile_enabled():
+            print(json.dumps({"startup_profile": self.status()}), file=sys.stderr, flush=True)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        self.db_ready.result(timeout)
+        return self.warm.wait(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        db_ok = self.db_ready.done() and self.db_ready.exception() is None
+        if self.db_ready.done() and not db_ok:
+            state = "failed"
+        elif self.warm.is_set():
+            state = "ready"
+        elif db_ok:
+            state = "warming"
+        else:
+            state = "starting"
+        status = {
+            "status": state,
+            "db_ready": db_ok,
+            "warm": self.warm.is_set(),
+            "phases": self.profile.phases(),
+        }
+        if state == "failed":
+            status["error"] = str(self.db_ready.exception())
+        return status
+
+
+def _is_gated(path: str) -> bool:
+    index = path.find("/api/")
+    # Tenant-prefixed paths (/t/<tenant>/api/...) are gated like plain ones.
+    return index >= 0 and path[index:] not in UNGATED_PATHS
+
+
+class StartupGate:
+    """Holds /api requests until the database is migrated and seeded."""
+
+    def __init__(self, app, startup: Startup) -> None:
+        self.app = app
+        self.startup = startup
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and _is_gated(scope["path"]):
+            ready = self.startup.db_ready
+            if not ready.done():
+                try:
+                    await asyncio.wrap_future(ready)
+                except Exception:
+                    pass
+            if ready.exception() is not None:
+                await JSONResponse({"detail": "startup failed"}, status_code=503)(
+                    scope, receive, send
+                )
+                return
+        await self.app(scope, receive, send)
+
+
+def main() -> None:
+    from app.main import app
+
+    startup = app.state.startup
+    startup.start()
+    startup.wait(timeout=300)
+    print(json.dumps(startup.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Multi-tenant routing. With APP_MULTI_TENANT=1 each request names its tenant
+through a header (APP_TENANT_HEADER, default X-Tenant) or a /t/<tenant>
+path prefix, and every DB access in that request goes to
+APP_DATA_DIR/tenants/<tenant>/app.db. Tenants are provisioned by an operator
+(POST /api/admin/tenants/<tenant> or python -m app.tenants KEY); a request
+for an unknown key gets 404 instead of creating a database. Each database is
+migrated once per process when first used; the set of ready tenants is an
+LRU bounded by APP_DB_HANDLES, like the write queues.
+
+Usage: python -m app.tenants KEY [KEY ...]
+"""
+
+import argparse
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.responses import JSONResponse
+
+from app.config import (
+    PROBE_PATHS,
+    current_tenant,
+    get_db_handle_limit,
+    get_db_path,
+    get_tenant_header,
+    is_multi_tenant_enabled,
+)
+from app.executors import write_lane
+from app.seed import seed_db
+
+TENANT_PREFIX = "/t/"
+_TENANT_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+_PREFIX_RE = re.compile(r"^/t/([^/]+)(/.*)?$")
+# Routes that do not touch tenant data and stay reachable without a tenant.
+UNSCOPED_PATHS = PROBE_PATHS + ("/api/admin/",)
+
+# Tenants already migrated in this process, least recently used first.
+_ready: "OrderedDict[str, None]" = OrderedDict()
+_ready_lock = threading.Lock()
+_init_locks: Dict[str, threading.Lock] = {}
+
+
+def validate_tenant(tenant: str) -> str:
+    key = tenant.strip().lower()
+    if not _TENANT_RE.match(key):
+        raise ValueError("invalid tenant key")
+    return key
+
+
+@contextmanager
+def use_tenant(tenant: Optional[str]) -> Iterator[None]:
+    token = current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def is_ready(tenant: str) -> bool:
+    with _ready_lock:
+        if tenant not in _ready:
+            return False
+        _ready.move_to_end(tenant)
+        return True
+
+
+def is_provisioned(tenant: str) -> bool:
+    with use_tenant(tenant):
+        return get_db_path().exists()
+
+
+def ensure_tenant(tenant: str, create: bool = False) -> bool:
+    """Migrate and seed the tenant database once; True if this call did it.
+
+    Raises LookupError for a tenant that was never provisioned, unless
+    ``create`` is set.
+    """
+    if is_ready(tenant):
+        return False
+    with _ready_lock:
+        lock = _init_locks.setdefault(tenant, threading.Lock())
+    try:
+        with lock:
+            if is_ready(tenant):
+                return False
+            if not create and not is_provisioned(tenant):
+                raise LookupError(f"unknown tenant: {tenant}")
+            with use_tenant(tenant):
+                try:
+                    seed_db()
+                except FileNotFoundError:
+                    pass
+            with _ready_lock:
+                _ready[tenant] = None
+                # Evicted tenants are simply migrated-checked again on next use.
+                while len(_ready) > get_db_handle_limit():
+                    _ready.popitem(last=False)
+    finally:
+        with _ready_lock:
+            _init_locks.pop(tenant, None)
+    return True
+
+
+def provision_tenant(tenant: str) -> bool:
+    """Create the tenant database; False when it already existed."""
+    tenant = validate_tenant(tenant)
+    existed = is_provisioned(tenant)
+    ensure_tenant(tenant, create=True)
+    return not existed
+
+
+def ready_tenants() -> List[str]:
+    with _ready_lock:
+        return sorted(_ready)
+
+
+def tenant_scopes() -> List[Any]:
+    """One context per database, for background jobs that visit every tenant."""
+    scopes = [use_tenant(None)]
+    if is_multi_tenant_enabled():
+        scopes.extend(use_tenant(tenant) for tenant in ready_tenants())
+    return scopes
+
+
+def tenant_stats() -> Dict[str, Any]:
+    return {
+        "enabled": is_multi_tenant_enabled(),
+        "header": get_tenant_header(),
+        "ready": len(_ready),
+        "handle_limit": get_db_handle_limit(),
+    }
+
+
+def _header(scope: Dict[str, Any], name: str) -> Optional[str]:
+    raw_name = name.encode("latin-1")
+    for key, value in scope.get("headers", ()):
+        if key.lower() == raw_name:
+            return value.decode("latin-1")
+    return None
+
+
+def _requires_tenant(path: str) -> bool:
+    if not path.startswith("/api/"):
+        return False
+    return not any(
+        path == unscoped or (unscoped.endswith("/") and path.startswith(unscoped))
+        for unscoped in UNSCOPED_PATHS
+    )
+
+
+class TenantMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not is_multi_tenant_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        tenant = None
+        path = scope["path"]
+        match = _PREFIX_RE.match(path)
+        if match:
+            tenant = match.group(1)
+            # Routing strips root_path, so /t/acme/api/x resolves as /api/x.
+            scope = dict(scope, root_path=scope.get("root_path", "") + TENANT_PREFIX + tenant)
+            path = match.group(2) or "/"
+        else:
+            tenant = _header(scope, get_tenant_header())
+
+        if tenant is None:
+            if _requires_tenant(path):
+                await JSONResponse({"detail": "tenant required"}, status_code=400)(
+                    scope, receive, send
+                )
+                return
+            await self.app(scope, receive, send)
+            return
+        try:
+            tenant = validate_tenant(tenant)
+        except ValueError as exc:
+            await JSONResponse({"detail": str(exc)}, status_code=400)(scope, receive, send)
+            return
+
+        token = current_tenant.set(tenant)
+        try:
+            if not is_ready(tenant):
+                try:
+                    await write_lane().run(ensure_tenant, tenant)
+                except LookupError:
+                    await JSONResponse({"detail": "unknown tenant"}, status_code=404)(
+                        scope, receive, send
+                    )
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Provision tenant databases.")
+    parser.add_argument("tenants", nargs="+")
+    args = parser.parse_args()
+    report = {tenant: {"created": provision_tenant(tenant)} for tenant in args.tenants}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Single-writer queue: request threads enqueue mutations, one writer thread
+applies them in group commits (one transaction per batch, one savepoint per
+operation) and resolves each caller's future once the batch is committed.
+"""
+
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.config import (
+    WRITE_DURABILITY_MODES,
+    get_busy_retries,
+    get_db_handle_limit,
+    get_write_batch_ms,
+    get_write_batch_size,
+    get_write_durability,
+    get_write_timeout_ms,
+    is_write_queue_enabled,
+)
+from app.db import _normalize_db_path, connect, migration_lock
+
+_STOP = object()
+
+
+class _Retired(RuntimeError):
+    """Raised by submit() on a queue that was evicted or closed for good."""
+
+
+class _BatchConnection:
+    """Connection handed to services inside a batch; commits are deferred.
+
+    The transaction is shared with the other operations of the batch, so
+    commit() is a no-op and rollback() only undoes this operation's savepoint.
+    """
+
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    def execute(self, sql: str, parameters: Any = ()):
+        return self._conn.execute(sql, parameters)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        self._conn.execute("ROLLBACK TO write_op;")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+class _WriteOp:
+    __slots__ = ("fn", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        db_path: Union[Path, str, None] = None,
+        batch_ms: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        durability: Optional[str] = None,
+    ) -> None:
+        self.db_path = _normalize_db_path(db_path)
+        self.batch_ms = get_write_batch_ms() if batch_ms is None else batch_ms
+        self.batch_size = get_write_batch_size() if batch_size is None else batch_size
+        self.durability = durability or get_write_durability()
+        if self.durability not in WRITE_DURABILITY_MODES:
+            raise ValueError(f"unknown durability mode: {self.durability}")
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._retired = False
+        self._lock = threading.Lock()
+        self._started_at = time.perf_counter()
+        self._stats = {
+            "submitted": 0,
+            "committed": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_batch": 0,
+            "commit_seconds": 0.0,
+            "wait_seconds": 0.0,
+            "busy_retries": 0,
+        }
+
+    def start(self) -> "WriteQueue":
+        with self._lock:
+            self._start_locked()
+        return self
+
+    def _start_locked(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        op = _WriteOp(fn, args, kwargs)
+        # Enqueue under the lock so an op can never land behind the stop marker.
+        with self._lock:
+            if self._retired:
+                raise _Retired(str(self.db_path))
+            self._start_locked()
+            self._stats["submitted"] += 1
+            self._queue.put(op)
+        return op.future
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return self.submit(fn, *args, **kwargs).result(timeout=get_write_timeout_ms() / 1000)
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """Stop the writer thread; False when it is still running after ``timeout``."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def retire(self, timeout: Optional[float] = 5.0) -> bool:
+        """Drain and close for good; later submits are routed to a new queue."""
+        with self._lock:
+            self._retired = True
+        return self.close(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        elapsed = max(time.perf_counter() - self._started_at, 1e-9)
+        batches = stats["batches"]
+        done = stats["committed"] + stats["failed"]
+        stats.update(
+            {
+                "db_path": str(self.db_path),
+                "durability": self.durability,
+                "batch_ms": self.batch_ms,
+                "batch_size": self.batch_size,
+                "queue_depth": self._queue.qsize(),
+                "avg_batch": round(done / batches, 2) if batches else 0.0,
+                "avg_commit_ms": round(stats["commit_seconds"] * 1000 / batches, 3)
+                if batches
+                else 0.0,
+                "avg_wait_ms": round(stats["wait_seconds"] * 1000 / done, 3) if done else 0.0,
+                "ops_per_second": round(stats["committed"] / elapsed, 2),
+            }
+        )
+        return stats
+
+    def _collect(self, first: Any) -> Tuple[List[_WriteOp], bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        batch: List[_WriteOp] = []
+        try:
+            conn = connect(self.db_path)
+            try:
+                conn.isolation_level = None
+                conn.execute(f"PRAGMA synchronous = {WRITE_DURABILITY_MODES[self.durability]};")
+                stopping = False
+                while not stopping:
+                    item = self._queue.get()
+                    if item is _STOP:
+                        break
+                    batch, stopping = self._collect(item)
+                    self._apply(conn, batch)
+                    batch = []
+            finally:
+                conn.close()
+        except BaseException as exc:
+            self._abort(batch, exc)
+
+    def _abort(self, batch: List[_WriteOp], error: BaseException) -> None:
+        """The writer thread died: fail every waiting op so no caller hangs.
+
+        _thread is reset under the lock, so the next submit starts a new thread.
+        """
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+            pending = list(batch)
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    pending.append(item)
+            self._stats["failed"] += len(pending)
+        for op in pending:
+            if not op.future.done():
+                op.future.set_exception(error)
+
+    def _begin(self, conn) -> None:
+        # busy_timeout already waits inside SQLite; when another process holds
+        # the write lock longer than that, back off with jitter and retry.
+        retries = get_busy_retries()
+        delay = 0.05
+        for attempt in range(retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE;")
+                return
+            except sqlite3.OperationalError as exc:
+                message = str(exc)
+                if attempt == retries or ("locked" not in message and "busy" not in message):
+                    raise
+            with self._lock:
+                self._stats["busy_retries"] += 1
+            time.sleep(delay * (1 + random.random()))
+            delay = min(delay * 2, 2.0)
+
+    def _apply(self, conn, batch: List[_WriteOp]) -> None:
+        proxy = _BatchConnection(conn)
+        outcomes: List[Tuple[_WriteOp, Any, Optional[BaseException]]] = []
+        started = time.perf_counter()
+        try:
+            self._begin(conn)
+            for op in batch:
+                conn.execute("SAVEPOINT write_op;")
+                try:
+                    result = op.fn(proxy, *op.args, **op.kwargs)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write_op;")
+                    conn.execute("RELEASE write_op;")
+                    outcomes.append((op, None, exc))
+                else:
+                    conn.execute("RELEASE write_op;")
+                    outcomes.append((op, result, None))
+            conn.execute("COMMIT;")
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            outcomes = [(op, None, exc) for op in batch]
+        finished = time.perf_counter()
+
+        committed = failed = 0
+        wait_seconds = 0.0
+        for op, result, error in outcomes:
+            wait_seconds += started - op.enqueued_at
+            # A caller that gave up may have cancelled its future meanwhile.
+            if error is None:
+                committed += 1
+                if not op.future.done():
+                    op.future.set_result(result)
+            else:
+                failed += 1
+                if not op.future.done():
+                    op.future.set_exception(error)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["committed"] += committed
+            self._stats["failed"] += failed
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+            self._stats["commit_seconds"] += finished - started
+            self._stats["wait_seconds"] += wait_seconds
+
+
+# Bounded so that thousands of tenant databases never hold thousands of open
+# writer connections: the least recently used queue is drained and closed.
+_write_queues: "OrderedDict[Path, WriteQueue]" = OrderedDict()
+_write_queues_lock = threading.Lock()
+
+
+def get_write_queue(db_path: Union[Path, str, None] = None) -> WriteQueue:
+    path = _normalize_db_path(db_path)
+    evicted: List[WriteQueue] = []
+    with _write_queues_lock:
+        write_queue = _write_queues.get(path)
+        if write_queue is None:
+            write_queue = WriteQueue(path)
+            _write_queues[path] = write_queue
+            while len(_write_queues) > get_db_handle_limit():
+                evicted.append(_write_queues.popitem(last=False)[1])
+        else:
+            _write_queues.move_to_end(path)
+    for old_queue in evicted:
+        threading.Thread(target=old_queue.retire, name="db-writer-evict", daemon=True).start()
+    return write_queue
+
+
+def submit_to_writer(
+    fn: Callable[..., Any], *args: Any, db_path: Union[Path, str, None] = None
+) -> Future:
+    while True:
+        try:
+            return get_write_queue(db_path).submit(fn, *args)
+        except _Retired:
+            # Evicted between lookup and submit; the next lookup reopens it.
+            continue
+
+
+def close_write_queues() -> None:
+    with _write_queues_lock:
+        queues = list(_write_queues.values())
+        _write_queues.clear()
+    for write_queue in queues:
+        write_queue.retire()
+
+
+def restore_database(db_path: Union[Path, str, None], staged: Path) -> None:
+    """Copy ``staged`` over the live database in place, with its writer drained.
+
+    The copy goes through the SQLite backup API into the live file, so the
+    inode, -wal and -shm stay put: connections held by other server workers
+    (and per-call readers) see the restored content on their next
+    transaction and keep writing to the right file. The restore generation
+    in PRAGMA user_version is bumped so no worker keeps serving cached
+    results of the old content. The registry lock is held for the copy so no
+    new writer of this process slips a write in between.
+    """
+    path = _normalize_db_path(db_path)
+    with migration_lock(path), _write_queues_lock:
+        write_queue = _write_queues.pop(path, None)
+        if write_queue is not None and not write_queue.retire():
+            raise RuntimeError(f"writer for {path} did not stop; restore aborted")
+        target = connect(path)
+        source = sqlite3.connect(staged)
+        try:
+            generation = max(
+                source.execute("PRAGMA user_version;").fetchone()[0],
+                target.execute("PRAGMA user_version;").fetchone()[0],
+            )
+            page_size = target.execute("PRAGMA page_size;").fetchone()[0]
+            if source.execute("PRAGMA page_size;").fetchone()[0] != page_size:
+                # A WAL database cannot change page size through a backup.
+                source.execute(f"PRAGMA page_size = {int(page_size)};")
+                source.execute("VACUUM;")
+            source.backup(target)
+            target.execute(f"PRAGMA user_version = {int(generation) + 1};")
+            target.commit()
+        finally:
+            source.close()
+            target.close()
+
+
+def write_queue_stats() -> List[Dict[str, Any]]:
+    with _write_queues_lock:
+        queues = list(_write_queues.values())
+    return [write_queue.stats() for write_queue in queues]
+
+
+def run_write(
+    fn: Callable[..., Any], *args: Any, db_path: Union[Path, str, None] = None
+) -> Any:
+    if is_write_queue_enabled():
+        future = submit_to_writer(fn, *args, db_path=db_path)
+        return future.result(timeout=get_write_timeout_ms() / 1000)
+    conn = connect(db_path)
+    try:
+        return fn(conn, *args)
+    finally:
+        conn.close()
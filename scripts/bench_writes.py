@@ -0,0 +1,101 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Compare score write throughput: one commit per request vs the group-commit
+write queue. Usage: python scripts/bench_writes.py [--ops 2000] [--threads 8]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import querylog, services  # noqa: E402
+from app.db import connect, init_db  # noqa: E402
+from app.writer import WriteQueue  # noqa: E402
+
+
+def _prepare(db_path: Path, practices: int) -> None:
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        domain_id = conn.execute("INSERT INTO domain (code, name) VALUES ('D', 'D');").lastrowid
+        objective_id = conn.execute(
+            "INSERT INTO objective (domain_id, code, name) VALUES (?, 'O', 'O');", (domain_id,)
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO practice (objective_id, code, name) VALUES (?, ?, 'P');",
+            [(objective_id, f"P{n}") for n in range(practices)],
+        )
+        conn.execute("INSERT INTO assessment (name, assessment_date) VALUES ('A', '2026-01-01');")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _payload(index: int, practices: int) -> dict:
+    return {"assessment_id": 1, "practice_id": (index % practices) + 1, "score": index % 4}
+
+
+def _run(label: str, ops: int, threads: int, write) -> None:
+    per_thread = ops // threads
+
+    def _worker(offset: int) -> None:
+        for index in range(per_thread):
+            write(offset * per_thread + index)
+
+    workers = [threading.Thread(target=_worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {per_thread * threads:>6} ops  {elapsed:7.3f}s  {per_thread * threads / elapsed:9.1f} ops/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--practices", type=int, default=200)
+    args = parser.parse_args()
+    querylog.set_slow_query_log(querylog.SlowQueryLog(threshold_ms=None))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        direct_path = Path(tmpdir) / "direct.db"
+        _prepare(direct_path, args.practices)
+
+        def _direct(index: int) -> None:
+            conn = connect(direct_path)
+            try:
+                services.upsert_practice_score(conn, _payload(index, args.practices))
+            finally:
+                conn.close()
+
+        _run("commit per request", args.ops, args.threads, _direct)
+
+        for durability in ("full", "normal", "off"):
+            queued_path = Path(tmpdir) / f"queued-{durability}.db"
+            _prepare(queued_path, args.practices)
+            write_queue = WriteQueue(queued_path, durability=durability)
+            _run(
+                f"write queue ({durability})",
+                args.ops,
+                args.threads,
+                lambda index: write_queue.call(
+                    services.upsert_practice_score, _payload(index, args.practices)
+                ),
+            )
+            stats = write_queue.stats()
+            write_queue.close()
+            print(f"{'':<28} avg batch {stats['avg_batch']}  avg commit {stats['avg_commit_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,4 +20,4 @@ if [[ -x "${ROOT_DIR}/.venv/bin/python" ]]; then
   PYTHON_BIN="${ROOT_DIR}/.venv/bin/python"
 fi
 
-"${PYTHON_BIN}" -m uvicorn app.main:app --host 127.0.0.1 --port 9999
+"${PYTHON_BIN}" -m app.server --host 127.0.0.1 --port 9999
@@ -0,0 +1,71 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import unittest
+
+from app import rollup, services
+from app.db import apply_migrations
+
+
+class TestActivityRollup(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        apply_migrations(self.conn)
+        rows = [
+            ("practice_score", "update", "2023-12-31 23:30:00"),
+            ("practice_score", "update", "2024-01-01 09:15:00"),
+            ("practice_score", "create", "2024-01-01 09:45:00"),
+            ("asset", "create", "2024-01-03 12:00:00"),
+            ("assessment", "create", "2024-02-10 08:00:00"),
+        ]
+        self.conn.executemany(
+            "INSERT INTO audit_log (entity_type, entity_id, action, created_at)"
+            " VALUES (?, 1, ?, ?);",
+            rows,
+        )
+        self.conn.commit()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def _evolution(self, granularity: str):
+        return services.get_evolution(
+            self.conn, granularity=granularity, start="2023-01-01", end="2024-12-31"
+        )
+
+    def test_trigger_feeds_every_granularity(self) -> None:
+        months = self._evolution("month")
+        self.assertEqual(
+            [(row["date"], row["total"]) for row in months],
+            [("2024-02-01", 1), ("2024-01-01", 3), ("2023-12-01", 1)],
+        )
+        weeks = self._evolution("week")
+        # 2023-12-31 is a Sunday: it belongs to the week starting Monday 2023-12-25.
+        self.assertEqual(
+            [(row["date"], row["total"]) for row in weeks],
+            [("2024-02-05", 1), ("2024-01-01", 3), ("2023-12-25", 1)],
+        )
+        hours = self._evolution("hour")
+        self.assertEqual(hours[2]["date"], "2024-01-01 09:00")
+        self.assertEqual(hours[2]["scores"], 2)
+
+        days = services.get_evolution(
+            self.conn, granularity="day", start="2024-01-01", end="2024-01-03"
+        )
+        self.assertEqual([row["date"] for row in days], ["2024-01-03", "2024-01-01"])
+        self.assertEqual(days[0]["assets"], 1)
+
+    def test_rebuild_matches_incremental_counts(self) -> None:
+        before = [tuple(row) for row in self.conn.execute(
+            "SELECT * FROM activity_rollup ORDER BY 1, 2, 3, 4;"
+        )]
+        rollup.rebuild_activity_rollup(self.conn)
+        after = [tuple(row) for row in self.conn.execute(
+            "SELECT * FROM activity_rollup ORDER BY 1, 2, 3, 4;"
+        )]
+        self.assertEqual(before, after)
+        self.assertEqual(len(after), 4 * 5)
@@ -0,0 +1,95 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import asyncio
+import unittest
+
+from app.admission import AdmissionController, AdmissionMiddleware, classify
+
+
+async def _call(app, method: str, path: str):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+    await app(scope, receive, send)
+    return messages[0]
+
+
+class TestAdmission(unittest.TestCase):
+    def test_classify_routes(self) -> None:
+        self.assertEqual(classify("POST", "/api/assets"), "write")
+        self.assertEqual(classify("DELETE", "/t/acme/api/assets/3"), "write")
+        self.assertEqual(classify("GET", "/t/acme/api/portfolio"), "analytics")
+        self.assertEqual(classify("GET", "/api/practices/4/missing-assets"), "analytics")
+        self.assertEqual(classify("GET", "/api/assets"), "read")
+        self.assertIsNone(classify("GET", "/api/healthz"))
+        self.assertIsNone(classify("GET", "/api/admin/admission"))
+        self.assertIsNone(classify("GET", "/"))
+
+    def test_queues_then_sheds_with_retry_after(self) -> None:
+        controller = AdmissionController(
+            limits={"read": 1, "analytics": 1, "write": 1}, queue_limit=1, wait_ms=1000
+        )
+        release = asyncio.Event()
+
+        async def inner(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = AdmissionMiddleware(inner, controller)
+
+        async def scenario():
+            first = asyncio.ensure_future(_call(middleware, "GET", "/api/assets"))
+            second = asyncio.ensure_future(_call(middleware, "GET", "/api/assets"))
+            await asyncio.sleep(0.01)
+            shed = await _call(middleware, "GET", "/api/assessments")
+            # Other classes keep their own slots.
+            write = asyncio.ensure_future(_call(middleware, "POST", "/api/assets"))
+            await asyncio.sleep(0.01)
+            release.set()
+            return shed, await first, await second, await write
+
+        shed, first, second, write = asyncio.run(scenario())
+        self.assertEqual(shed["status"], 503)
+        self.assertIn((b"retry-after", b"1"), shed["headers"])
+        self.assertEqual([first["status"], second["status"], write["status"]], [200, 200, 200])
+        stats = controller.stats()["classes"]
+        self.assertEqual(
+            {key: stats["read"][key] for key in ("admitted", "queued", "shed", "active")},
+            {"admitted": 2, "queued": 1, "shed": 1, "active": 0},
+        )
+        self.assertEqual(stats["write"]["admitted"], 1)
+
+    def test_wait_timeout_sheds(self) -> None:
+        controller = AdmissionController(limits={"analytics": 1}, queue_limit=4, wait_ms=20)
+
+        async def inner(scope, receive, send):
+            await asyncio.sleep(0.2)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = AdmissionMiddleware(inner, controller)
+
+        async def scenario():
+            slow = asyncio.ensure_future(_call(middleware, "GET", "/api/portfolio"))
+            await asyncio.sleep(0.01)
+            late = await _call(middleware, "GET", "/api/evolution")
+            return late, await slow
+
+        late, slow = asyncio.run(scenario())
+        self.assertEqual((late["status"], slow["status"]), (503, 200))
+        stats = controller.stats()["classes"]["analytics"]
+        self.assertEqual((stats["timed_out"], stats["waiting"], stats["active"]), (1, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import unittest
+
+from app import history, services
+from app.db import apply_migrations
+
+
+class TestAssessmentClone(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        apply_migrations(self.conn)
+        self.practices = {}
+        for domain_code in ("D1", "D2"):
+            domain_id = self.conn.execute(
+                "INSERT INTO domain (code, name) VALUES (?, 'Domain');", (domain_code,)
+            ).lastrowid
+            objective_id = self.conn.execute(
+                "INSERT INTO objective (domain_id, code, name) VALUES (?, 'O', 'Objective');",
+                (domain_id,),
+            ).lastrowid
+            for index in range(3):
+                self.practices[(domain_id, index)] = self.conn.execute(
+                    "INSERT INTO practice (objective_id, code, name) VALUES (?, ?, 'P');",
+                    (objective_id, f"{domain_code}-P{index}"),
+                ).lastrowid
+        self.source_id = services.create_assessment(self.conn, "Q1", "2026-01-01", "base")
+        for (domain_id, index), practice_id in self.practices.items():
+            services.upsert_practice_score(
+                self.conn,
+                {
+                    "assessment_id": self.source_id,
+                    "practice_id": practice_id,
+                    "score": index,
+                    "poc": f"owner-{domain_id}",
+                    "target_score": 3,
+                },
+            )
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def _scores(self, assessment_id: int):
+        rows = self.conn.execute(
+            "SELECT practice_id, score, poc, target_score FROM practice_score"
+            " WHERE assessment_id = ? ORDER BY practice_id;",
+            (assessment_id,),
+        )
+        return [tuple(row) for row in rows]
+
+    def test_clone_copies_scores_with_one_audit_entry(self) -> None:
+        audit_before = self.conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0]
+        result = services.clone_assessment(self.conn, self.source_id, "Q2", "2026-04-01")
+        clone_id = result["id"]
+
+        self.assertEqual(result["scores_copied"], 6)
+        self.assertEqual(self._scores(clone_id), self._scores(self.source_id))
+        audit_after = self.conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0]
+        self.assertEqual(audit_after - audit_before, 1)
+        entry = services.get_recent_changes(self.conn, limit=1)[0]
+        self.assertEqual((entry["entity_type"], entry["action"]), ("assessment", "clone"))
+
+        reconstructed = history.reconstruct_scores(self.conn, clone_id, "9999-12-31")
+        self.assertEqual(len(reconstructed), 6)
+
+    def test_clone_filters_by_domain(self) -> None:
+        result = services.clone_assessment(self.conn, self.source_id, domain_ids=[1])
+        self.assertEqual(result["scores_copied"], 3)
+        clone = [row for row in services.list_assessments(self.conn) if row["id"] == result["id"]]
+        self.assertEqual(clone[0]["name"], "Q1 (copy)")
+        self.assertIsNone(services.clone_assessment(self.conn, 999))
+
+
+if __name__ == "__main__":
+    unittest.main()
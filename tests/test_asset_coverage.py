@@ -42,3 +42,48 @@ class TestAssetCoverage(unittest.TestCase):
             self.assertEqual(coverage[0]["linked_practices"], 1)
         finally:
             conn.close()
+
+    def test_bulk_links_and_bitset_matrix(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        try:
+            apply_migrations(conn)
+            conn.execute("INSERT INTO domain (id, code, name) VALUES (1, 'D1', 'Domain');")
+            conn.execute("INSERT INTO objective (id, domain_id, code, name) VALUES (1, 1, 'O1', 'O');")
+            conn.executemany(
+                "INSERT INTO practice (id, objective_id, code, name) VALUES (?, 1, ?, 'P');",
+                [(p, f"P{p}") for p in (1, 2, 3)],
+            )
+            conn.executemany(
+                "INSERT INTO asset (id, name, criticality) VALUES (?, ?, ?);",
+                [(1, "Core", 5), (2, "Laptop", 1), (3, "Mail", 4)],
+            )
+            conn.commit()
+
+            result = services.link_asset_practices(conn, [(1, 1), (3, 1), (2, 2), (2, 3), (1, 1)])
+            self.assertEqual(result, {"linked": 4, "ignored": 1})
+            audit_count = conn.execute(
+                "SELECT COUNT(*) FROM audit_log WHERE entity_type = 'asset_practice';"
+            ).fetchone()[0]
+            self.assertEqual(audit_count, 4)
+
+            matrix = services.get_coverage_matrix(conn)
+            bits = {asset["id"]: asset["bits"] for asset in matrix["assets"]}
+            self.assertEqual(bits, {1: 0b001, 2: 0b110, 3: 0b001})
+            self.assertEqual(
+                [p["code"] for p in services.get_uncovered_practices(conn)], ["P2", "P3"]
+            )
+            missing = services.get_assets_missing_practice(conn, 1)
+            self.assertEqual([asset["name"] for asset in missing], ["Laptop"])
+            self.assertIsNone(services.get_assets_missing_practice(conn, 99))
+
+            result = services.unlink_asset_practices(conn, [(3, 1), (3, 2)])
+            self.assertEqual(result, {"unlinked": 1, "missing": 1})
+            missing = services.get_assets_missing_practice(conn, 1)
+            self.assertEqual([asset["name"] for asset in missing], ["Laptop", "Mail"])
+
+            with self.assertRaises(sqlite3.IntegrityError):
+                services.link_asset_practices(conn, [(1, 2), (1, 999)])
+        finally:
+            conn.close()
@@ -0,0 +1,80 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import services
+from app.db import connect, init_db
+
+
+class TestAssetScores(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.conn = connect(init_db(Path(self._tmp.name) / "app.db"))
+        self.conn.execute("INSERT INTO domain (id, code, name) VALUES (1, 'SOC', 'SOC');")
+        self.conn.execute(
+            "INSERT INTO objective (id, domain_id, code, name) VALUES (1, 1, 'O1', 'O1'), "
+            "(2, 1, 'O2', 'O2');"
+        )
+        self.conn.execute(
+            "INSERT INTO practice (id, objective_id, code, name) VALUES (1, 1, 'P1', 'P1'), "
+            "(2, 1, 'P2', 'P2'), (3, 2, 'P3', 'P3');"
+        )
+        self.conn.execute(
+            "INSERT INTO asset (id, name, criticality) VALUES (1, 'SIEM', 5), (2, 'EDR', 1), "
+            "(3, 'Sandbox', NULL);"
+        )
+        self.conn.commit()
+        self.assessment_id = services.create_assessment(self.conn, "Q1", "2026-01-01", None)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def test_weighted_rollup_up_the_hierarchy(self) -> None:
+        result = services.upsert_asset_scores(
+            self.conn, self.assessment_id, [(1, 1, 3), (2, 1, 0), (3, 2, 1)]
+        )
+        self.assertEqual(result, {"written": 3, "cleared": 0, "unchanged": 0})
+
+        domain = services.get_asset_score_rollup(self.conn, self.assessment_id, "en")[0]
+        p1, p2 = domain["objectives"][0]["practices"]
+        self.assertEqual((p1["asset_score"], p1["weight"], p1["scored"]), (2.5, 6, 2))
+        self.assertEqual((p1["min_score"], p1["max_score"]), (0, 3))
+        self.assertEqual(p2["asset_score"], 1.0)
+        self.assertEqual(domain["objectives"][0]["asset_score"], 2.29)
+        self.assertIsNone(domain["objectives"][1]["asset_score"])
+        self.assertEqual((domain["asset_score"], domain["scored"]), (2.29, 3))
+
+        # Cached per revision: a change is visible on the next call.
+        result = services.upsert_asset_scores(
+            self.conn, self.assessment_id, [(1, 1, 3), (2, 1, 3), (3, 2, None)]
+        )
+        self.assertEqual(result, {"written": 1, "cleared": 1, "unchanged": 1})
+        domain = services.get_asset_score_rollup(self.conn, self.assessment_id, "en")[0]
+        self.assertEqual((domain["asset_score"], domain["scored"]), (3.0, 2))
+        self.assertEqual(
+            [row["asset_name"] for row in services.get_asset_scores(self.conn, 1, 1)],
+            ["SIEM", "EDR"],
+        )
+
+        actions = [
+            row[0]
+            for row in self.conn.execute(
+                "SELECT action FROM audit_log WHERE entity_type = 'asset_practice_score';"
+            )
+        ]
+        self.assertEqual(sorted(actions), ["create"] * 3 + ["delete", "update"])
+
+    def test_unknown_asset_is_rejected(self) -> None:
+        with self.assertRaises(sqlite3.IntegrityError):
+            services.upsert_asset_scores(self.conn, self.assessment_id, [(99, 1, 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import blobs, services, writer
+from app.db import apply_migrations
+
+
+class TestAttachments(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.blob_dir = Path(self._tmp.name) / "blobs"
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        apply_migrations(self.conn)
+        self.conn.executescript(
+            """
+            INSERT INTO domain (code, name) VALUES ('D', 'Domain');
+            INSERT INTO objective (domain_id, code, name) VALUES (1, 'O', 'Objective');
+            INSERT INTO practice (objective_id, code, name) VALUES (1, 'P', 'Practice');
+            """
+        )
+        for name in ("Q1", "Q2"):
+            assessment_id = services.create_assessment(self.conn, name, "2026-01-01", None)
+            services.upsert_practice_score(
+                self.conn, {"assessment_id": assessment_id, "practice_id": 1, "score": 1}
+            )
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def _store(self, data: bytes, max_bytes: int = 1 << 20):
+        writer = blobs.BlobWriter(max_bytes, self.blob_dir)
+        for start in range(0, len(data), 1000):
+            writer.write(data[start:start + 1000])
+        return writer.commit()
+
+    def test_identical_uploads_share_one_blob(self) -> None:
+        data = b"evidence" * 500
+        first = self._store(data)
+        second = self._store(data)
+        self.assertEqual(first["sha256"], hashlib.sha256(data).hexdigest())
+        self.assertFalse(first["deduplicated"])
+        self.assertTrue(second["deduplicated"])
+        self.assertEqual(blobs.blob_path(first["sha256"], self.blob_dir).read_bytes(), data)
+        self.assertEqual(len(list(self.blob_dir.glob("??/??/*"))), 1)
+        self.assertEqual(list((self.blob_dir / "incoming").iterdir()), [])
+
+        for assessment_id in (1, 2):
+            services.add_attachment(
+                self.conn, assessment_id, 1, first["sha256"], "report.pdf", None, len(data)
+            )
+        self.assertEqual(len(services.list_attachments(self.conn, 2, 1)), 1)
+        self.assertIsNone(
+            services.add_attachment(self.conn, 1, 99, first["sha256"], "x", None, 1)
+        )
+
+        # Still referenced by the second attachment: kept.
+        self.assertTrue(services.delete_attachment(self.conn, 1))
+        report = blobs.collect_garbage(self.conn, self.blob_dir, grace_seconds=0)
+        self.assertEqual(report["removed"], 0)
+        services.delete_attachment(self.conn, 2)
+        report = blobs.collect_garbage(self.conn, self.blob_dir, grace_seconds=3600)
+        self.assertEqual(report["removed"], 0)
+        report = blobs.collect_garbage(self.conn, self.blob_dir, grace_seconds=0)
+        self.assertEqual(report["removed"], 1)
+
+    def test_oversized_upload_is_rejected(self) -> None:
+        writer = blobs.BlobWriter(10, self.blob_dir)
+        with self.assertRaises(blobs.BlobTooLarge):
+            writer.write(b"x" * 11)
+        writer.abort()
+        self.assertEqual(list((self.blob_dir / "incoming").iterdir()), [])
+
+    def test_download_answers_range_requests(self) -> None:
+        from fastapi.testclient import TestClient
+
+        from app.config import get_db_path
+        from app.db import connect, init_db
+        from app.main import create_app
+
+        data_dir = Path(self._tmp.name) / "data"
+        env = {"APP_DATA_DIR": str(data_dir), "APP_CHECKPOINT_INTERVAL": "0"}
+        with mock.patch.dict(os.environ, env):
+            conn = connect(init_db(get_db_path()))
+            try:
+                conn.execute("INSERT INTO domain (code, name) VALUES ('D', 'Domain');")
+                conn.execute("INSERT INTO objective (domain_id, code, name) VALUES (1, 'O', 'O');")
+                conn.execute(
+                    "INSERT INTO practice (objective_id, code, name) VALUES (1, 'P', 'P');"
+                )
+                conn.commit()
+                stored = blobs.BlobWriter(1 << 20, data_dir / "blobs")
+                stored.write(b"0123456789")
+                sha256 = stored.commit()["sha256"]
+                assessment_id = services.create_assessment(conn, "Q1", "2026-01-01", None)
+                services.upsert_practice_score(
+                    conn, {"assessment_id": assessment_id, "practice_id": 1, "score": 1}
+                )
+                attachment = services.add_attachment(
+                    conn, assessment_id, 1, sha256, "evidence.txt", "text/plain", 10
+                )
+            finally:
+                conn.close()
+
+            with TestClient(create_app()) as client:
+                deadline = time.time() + 30
+                while client.get("/api/readyz").status_code != 200:
+                    self.assertLess(time.time(), deadline, "app did not become ready")
+                    time.sleep(0.05)
+                response = client.get(
+                    f"/api/attachments/{attachment['id']}", headers={"Range": "bytes=0-3"}
+                )
+            writer.close_write_queues()
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"], "bytes 0-3/10")
+        self.assertEqual(response.content, b"0123")
+
+
+if __name__ == "__main__":
+    unittest.main()
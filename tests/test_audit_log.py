@@ -29,3 +29,37 @@ class TestAuditLog(unittest.TestCase):
             self.assertGreaterEqual(len(recent), 1)
         finally:
             conn.close()
+
+    def test_recent_changes_resolve_labels_and_diff(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        try:
+            apply_migrations(conn)
+            conn.execute("INSERT INTO domain (id, code, name) VALUES (1, 'GOV', 'Governance');")
+            conn.execute(
+                "INSERT INTO objective (id, domain_id, code, name) VALUES (1, 1, 'GOV-O1', 'O');"
+            )
+            conn.execute(
+                "INSERT INTO practice (id, objective_id, code, name) VALUES (3, 1, 'GOV-P3', 'Plan');"
+            )
+            assessment_id = services.create_assessment(conn, "Q3", "2026-07-01", None)
+            for score in (1, 2):
+                services.upsert_practice_score(
+                    conn, {"assessment_id": assessment_id, "practice_id": 3, "score": score}
+                )
+            asset_id = services.create_asset(conn, "Mail gateway", None, None, None)
+            services.link_asset_practice(conn, asset_id, 3)
+
+            recent = services.get_recent_changes(conn, limit=10)
+            link, asset, update = recent[0], recent[1], recent[2]
+            self.assertEqual(
+                (update["practice_code"], update["assessment_name"]), ("GOV-P3", "Q3")
+            )
+            self.assertEqual(update["changes"], [{"field": "score", "old": 1, "new": 2}])
+            self.assertEqual(asset["asset_name"], "Mail gateway")
+            self.assertEqual(
+                (link["asset_name"], link["practice_name"]), ("Mail gateway", "Plan")
+            )
+            self.assertEqual(recent[-1]["assessment_name"], "Q3")
+        finally:
+            conn.close()
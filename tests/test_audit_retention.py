@@ -0,0 +1,95 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import retention
+from app.db import connect, init_db
+
+
+class TestAuditRetention(unittest.TestCase):
+    def test_old_rows_move_to_monthly_archives(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            archive_dir = Path(tmpdir) / "archive"
+            conn = connect(db_path)
+            conn.isolation_level = None
+            try:
+                self.assertEqual(conn.execute("PRAGMA auto_vacuum;").fetchone()[0], 2)
+                payload = '{"name": "%s"}' % ("x" * 200)
+                rows = [
+                    ("asset", n, "create", payload, "2024-01-15 10:00:00") for n in range(30)
+                ]
+                rows += [
+                    ("asset", n, "create", payload, "2024-02-03 08:00:00") for n in range(20)
+                ]
+                rows += [("asset", 99, "create", "{}", "2999-01-01 00:00:00")]
+                conn.execute("BEGIN;")
+                conn.executemany(
+                    "INSERT INTO audit_log (entity_type, entity_id, action, new_data, created_at)"
+                    " VALUES (?, ?, ?, ?, ?);",
+                    rows,
+                )
+                conn.execute("COMMIT;")
+
+                report = retention.archive_audit_log(
+                    conn, older_than_days=30, chunk_size=7, archive_dir=archive_dir
+                )
+                remaining = conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0]
+            finally:
+                conn.close()
+
+            self.assertEqual(report["archived_rows"], 50)
+            self.assertEqual(report["months"], {"2024-01": 30, "2024-02": 20})
+            self.assertGreater(report["chunks"], 7)
+            self.assertTrue(report["incremental_vacuum"])
+            self.assertEqual(remaining, 1)
+
+            archives = retention.list_archives(archive_dir)
+            self.assertEqual([entry["month"] for entry in archives], ["2024-01", "2024-02"])
+            archived = retention.get_archived_changes("2024-02", limit=5, archive_dir=archive_dir)
+            self.assertEqual(len(archived), 5)
+            self.assertEqual(archived[0]["created_at"], "2024-02-03 08:00:00")
+
+    def test_failed_delete_keeps_rows_and_rerun_is_idempotent(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            archive_dir = Path(tmpdir) / "archive"
+            conn = connect(db_path)
+            conn.isolation_level = None
+            try:
+                conn.executemany(
+                    "INSERT INTO audit_log (entity_type, entity_id, action, new_data, created_at)"
+                    " VALUES ('asset', ?, 'create', '{}', '2024-01-15 10:00:00');",
+                    [(n,) for n in range(5)],
+                )
+                # The delete from main fails after the archive copy committed,
+                # as a crash between the two transactions would leave it.
+                conn.execute(
+                    "CREATE TEMP TRIGGER block_delete BEFORE DELETE ON main.audit_log "
+                    "BEGIN SELECT RAISE(ABORT, 'crash'); END;"
+                )
+                with self.assertRaises(sqlite3.IntegrityError):
+                    retention.archive_audit_log(
+                        conn, older_than_days=30, chunk_size=10, archive_dir=archive_dir
+                    )
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0], 5)
+                copied = retention.get_archived_changes("2024-01", archive_dir=archive_dir)
+                self.assertEqual(len(copied), 5)
+                conn.execute("DROP TRIGGER temp.block_delete;")
+
+                report = retention.archive_audit_log(
+                    conn, older_than_days=30, chunk_size=10, archive_dir=archive_dir
+                )
+                remaining = conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0]
+            finally:
+                conn.close()
+
+            self.assertEqual((report["archived_rows"], remaining), (5, 0))
+            archived = retention.get_archived_changes("2024-01", archive_dir=archive_dir)
+            self.assertEqual(len(archived), 5)
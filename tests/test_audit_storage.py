@@ -0,0 +1,102 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import json
+import os
+import sqlite3
+import unittest
+from unittest import mock
+
+from app import audit, services
+from app.db import apply_migrations
+
+
+def _setup(conn) -> int:
+    apply_migrations(conn)
+    domain_id = conn.execute("INSERT INTO domain (code, name) VALUES ('D1', 'Domain');").lastrowid
+    objective_id = conn.execute(
+        "INSERT INTO objective (domain_id, code, name) VALUES (?, 'O1', 'Objective');",
+        (domain_id,),
+    ).lastrowid
+    practice_id = conn.execute(
+        "INSERT INTO practice (objective_id, code, name) VALUES (?, 'P1', 'Practice');",
+        (objective_id,),
+    ).lastrowid
+    conn.execute("INSERT INTO assessment (name, assessment_date) VALUES ('A', '2026-01-01');")
+    conn.commit()
+    return practice_id
+
+
+class TestAuditStorage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        self.practice_id = _setup(self.conn)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def _score(self, **fields) -> None:
+        payload = {"assessment_id": 1, "practice_id": self.practice_id}
+        payload.update(fields)
+        services.upsert_practice_score(self.conn, payload)
+
+    def test_update_stores_delta_and_readers_rebuild_it(self) -> None:
+        evidence = "Quarterly review minutes and signed charter. " * 20
+        self._score(score=1, evidence=evidence, notes="first pass")
+        self._score(score=2, evidence=evidence, notes="first pass")
+
+        raw = self.conn.execute(
+            "SELECT old_data, new_data FROM audit_log WHERE action = 'update';"
+        ).fetchone()
+        self.assertIsInstance(raw["new_data"], bytes)
+        delta = audit.decode_payload(raw["old_data"])
+        self.assertEqual(set(delta[audit.DELTA_KEY]) - {"updated_at"}, {"score"})
+
+        change = services.get_recent_changes(self.conn, limit=1)[0]
+        old_data = json.loads(change["old_data"])
+        new_data = json.loads(change["new_data"])
+        self.assertEqual(old_data["score"], 1)
+        self.assertEqual(new_data["score"], 2)
+        self.assertEqual(old_data["evidence"], evidence)
+        self.assertEqual(old_data["notes"], "first pass")
+
+    def test_convert_full_rows_shrinks_storage(self) -> None:
+        evidence = "Threat landscape report shared with SOC and IR teams. " * 10
+        old_payload = {"id": 1, "score": 1, "evidence": evidence, "notes": "n"}
+        for score in range(2, 12):
+            new_payload = dict(old_payload, score=score % 4)
+            old_raw, new_raw = audit.encode_audit_pair(old_payload, new_payload, "full")
+            self.conn.execute(
+                "INSERT INTO audit_log (entity_type, entity_id, action, old_data, new_data)"
+                " VALUES ('practice_score', 1, 'update', ?, ?);",
+                (old_raw, new_raw),
+            )
+            old_payload = new_payload
+        self.conn.commit()
+        before_views = services.get_recent_changes(self.conn, limit=100)
+
+        report = audit.convert_audit_log(self.conn, chunk_size=3)
+
+        self.assertEqual(report["converted_rows"], 10)
+        self.assertLess(report["after"]["bytes_per_row"], report["before"]["bytes_per_row"] / 2)
+        self.assertEqual(services.get_recent_changes(self.conn, limit=100), before_views)
+        self.assertEqual(audit.convert_audit_log(self.conn)["converted_rows"], 0)
+
+    def test_convert_follows_the_configured_storage_mode(self) -> None:
+        self._score(score=1, notes="first pass")
+        self._score(score=2, notes="first pass")
+        with mock.patch.dict(os.environ, {"APP_AUDIT_STORAGE": "full"}):
+            report = audit.convert_audit_log(self.conn)
+        self.assertEqual(report["mode"], "full")
+        self.assertGreater(report["converted_rows"], 0)
+        raw = self.conn.execute(
+            "SELECT old_data FROM audit_log WHERE action = 'update';"
+        ).fetchone()
+        self.assertNotIn(audit.DELTA_KEY, audit.decode_payload(raw["old_data"]))
+
+        report = audit.convert_audit_log(self.conn, mode="delta")
+        self.assertGreater(report["converted_rows"], 0)
@@ -0,0 +1,103 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import backup
+from app.db import connect, init_db
+from app.revisions import get_database_key
+from app.writer import WriteQueue, close_write_queues, get_write_queue
+
+
+class TestBackup(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db_path = init_db(self.root / "app.db")
+        self.backup_dir = self.root / "backups"
+        self._insert_assets(["Alpha", "Beta"])
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _insert_assets(self, names) -> None:
+        conn = connect(self.db_path)
+        try:
+            conn.executemany("INSERT INTO asset (name) VALUES (?);", [(n,) for n in names])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _asset_names(self):
+        conn = connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT name FROM asset ORDER BY id;")]
+        finally:
+            conn.close()
+
+    def test_backup_and_restore_round_trip(self) -> None:
+        for compress in (False, True):
+            with self.subTest(compress=compress):
+                report = backup.create_backup(
+                    self.db_path, self.backup_dir, compress=compress, pages=1, sleep_ms=0
+                )
+                self.assertGreater(report["steps"], 1)
+                self.assertTrue(backup.verify_backup(report["name"], self.backup_dir)["ok"])
+
+                self._insert_assets(["Gamma"])
+                backup.restore_backup(report["name"], self.db_path, self.backup_dir)
+                self.assertEqual(self._asset_names(), ["Alpha", "Beta"])
+
+        self.assertEqual(len(backup.list_backups(self.backup_dir)), 2)
+
+    def test_restore_keeps_open_connections_on_the_live_file(self) -> None:
+        report = backup.create_backup(self.db_path, self.backup_dir, sleep_ms=0)
+        # Stands in for another server worker holding the database open.
+        other = connect(self.db_path)
+        try:
+            other.execute("INSERT INTO asset (name) VALUES ('Gamma');")
+            other.commit()
+            key = get_database_key(other)
+            backup.restore_backup(report["name"], self.db_path, self.backup_dir)
+
+            names = [row[0] for row in other.execute("SELECT name FROM asset ORDER BY id;")]
+            self.assertEqual(names, ["Alpha", "Beta"])
+            self.assertNotEqual(get_database_key(other), key)
+            other.execute("INSERT INTO asset (name) VALUES ('Delta');")
+            other.commit()
+        finally:
+            other.close()
+        self.assertEqual(self._asset_names(), ["Alpha", "Beta", "Delta"])
+
+    def test_restore_aborts_when_the_writer_does_not_stop(self) -> None:
+        report = backup.create_backup(self.db_path, self.backup_dir, sleep_ms=0)
+        self._insert_assets(["Gamma"])
+        get_write_queue(self.db_path)
+        with mock.patch.object(WriteQueue, "retire", return_value=False):
+            with self.assertRaises(RuntimeError):
+                backup.restore_backup(report["name"], self.db_path, self.backup_dir)
+        self.assertEqual(self._asset_names(), ["Alpha", "Beta", "Gamma"])
+        close_write_queues()
+
+    def test_corrupted_backup_is_refused(self) -> None:
+        report = backup.create_backup(self.db_path, self.backup_dir, sleep_ms=0)
+        path = self.backup_dir / report["name"]
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        self._insert_assets(["Gamma"])
+
+        with self.assertRaises(ValueError):
+            backup.restore_backup(report["name"], self.db_path, self.backup_dir)
+        self.assertEqual(self._asset_names(), ["Alpha", "Beta", "Gamma"])
+        with self.assertRaises(ValueError):
+            backup.backup_path("../app.db", self.backup_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
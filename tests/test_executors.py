@@ -0,0 +1,37 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import asyncio
+import threading
+import unittest
+
+from app.executors import DbLane
+
+
+class TestExecutors(unittest.TestCase):
+    def test_saturated_lane_does_not_block_other_lane(self) -> None:
+        heavy = DbLane("heavy-test", 1)
+        quick = DbLane("quick-test", 1)
+        release = threading.Event()
+
+        async def scenario():
+            blocked = [asyncio.ensure_future(heavy.run(release.wait, 5)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            self.assertEqual(heavy.stats()["active"], 1)
+            self.assertEqual(heavy.stats()["queued"], 2)
+            result = await asyncio.wait_for(quick.run(lambda: "fast"), timeout=1)
+            release.set()
+            await asyncio.gather(*blocked)
+            return result
+
+        try:
+            self.assertEqual(asyncio.run(scenario()), "fast")
+            stats = heavy.stats()
+            self.assertEqual(stats["completed"], 3)
+            self.assertEqual(stats["queued"], 0)
+            self.assertGreaterEqual(stats["max_queued"], 2)
+        finally:
+            heavy.shutdown()
+            quick.shutdown()
@@ -0,0 +1,95 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import services
+from app.cache import cache_stats
+from app.db import connect, init_db
+from app.seed import (
+    SEED_PATH,
+    TEST_SEED_PATH,
+    import_translations,
+    load_seed_data,
+    seed_reference_data,
+    seed_translations,
+)
+
+
+def _names(domains):
+    return [
+        practice["name"]
+        for domain in domains
+        for objective in domain["objectives"]
+        for practice in objective["practices"]
+    ]
+
+
+class TestFrameworkI18n(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.conn = connect(init_db(Path(self._tmp.name) / "app.db"))
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def test_seed_files_give_both_languages(self) -> None:
+        seed_reference_data(self.conn, load_seed_data(SEED_PATH))
+        self.assertEqual(seed_translations(self.conn, SEED_PATH), 6)
+
+        french = services.get_domains(self.conn, None, "fr")
+        english = services.get_domains(self.conn, None, "en")
+        self.assertEqual(french[0]["name"], "Gouvernance CTI")
+        self.assertEqual(english[0]["name"], "CTI governance")
+        self.assertEqual(_names(english), ["Define a CTI charter"])
+
+    def test_language_skeleton_is_shared_and_falls_back(self) -> None:
+        seed_reference_data(self.conn, load_seed_data(TEST_SEED_PATH))
+        objective = {
+            "code": "GOV-OBJ-1",
+            "name": "Strategie",
+            "practices": [
+                {"code": "GOV-P1", "name": "Charte CTI"},
+                {"code": "NOPE", "name": "ignoree"},
+            ],
+        }
+        partial = {
+            "lang": "fr",
+            "domains": [{"code": "GOV", "name": "Gouvernance", "objectives": [objective]}],
+        }
+        self.assertEqual(import_translations(self.conn, partial), 3)
+        assessment_id = services.create_assessment(self.conn, "Q1", "2026-01-01", None)
+        services.upsert_practice_score(
+            self.conn, {"assessment_id": assessment_id, "practice_id": 1, "score": 2}
+        )
+
+        names = _names(services.get_domains(self.conn, assessment_id, "fr"))
+        self.assertEqual(names[:2], ["Charte CTI", "Stakeholder mapping"])
+        scored = services.get_domains(self.conn, assessment_id, "fr")[0]
+        self.assertEqual(scored["objectives"][0]["practices"][0]["score"], 2)
+
+        # Another assessment in the same language reuses the cached skeleton.
+        before = cache_stats()["functions"][services.get_framework_tree.cache_name]["hits"]
+        services.get_domains(self.conn, None, "fr")
+        after = cache_stats()["functions"][services.get_framework_tree.cache_name]["hits"]
+        self.assertEqual(after, before + 1)
+
+        etag_fr = services.domains_etag(self.conn, assessment_id, "fr")
+        self.assertNotEqual(etag_fr, services.domains_etag(self.conn, assessment_id, "en"))
+        services.upsert_practice_score(
+            self.conn, {"assessment_id": assessment_id, "practice_id": 1, "score": 3}
+        )
+        self.assertNotEqual(etag_fr, services.domains_etag(self.conn, assessment_id, "fr"))
+
+    def test_unknown_language_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            import_translations(self.conn, {"lang": "de", "domains": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
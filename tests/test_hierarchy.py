@@ -0,0 +1,78 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import unittest
+
+from app import cache, services
+from app.db import apply_migrations
+
+
+class TestHierarchy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        apply_migrations(self.conn)
+        cache.invalidate()
+        for d in range(2):
+            self.conn.execute(
+                "INSERT INTO domain (id, code, name) VALUES (?, ?, ?);",
+                (d + 1, f"D{d}", f"Domain {d}"),
+            )
+        self.conn.executemany(
+            "INSERT INTO objective (id, domain_id, code, name) VALUES (?, 1, ?, ?);",
+            [(1, "O1", "A"), (2, "O2", "B")],
+        )
+        self.conn.executemany(
+            "INSERT INTO practice (id, objective_id, code, name) VALUES (?, ?, ?, ?);",
+            [(p, 1 if p < 6 else 2, f"P{p}", f"Practice {p}") for p in range(1, 7)],
+        )
+        self.assessment_id = services.create_assessment(self.conn, "Q1", "2026-01-01", None)
+        services.upsert_practice_score(
+            self.conn, {"assessment_id": self.assessment_id, "practice_id": 2, "score": 3}
+        )
+        self.conn.commit()
+
+    def tearDown(self) -> None:
+        cache.invalidate()
+        self.conn.close()
+
+    def test_domain_summaries_count_each_level(self) -> None:
+        summaries = services.get_domain_summaries(self.conn, self.assessment_id)
+        self.assertEqual(
+            [
+                (d["code"], d["objective_count"], d["practice_count"], d["scored_count"])
+                for d in summaries
+            ],
+            [("D0", 2, 6, 1), ("D1", 0, 0, 0)],
+        )
+        self.assertNotIn("objectives", summaries[0])
+
+        objectives = services.get_domain_objectives(self.conn, 1, self.assessment_id)
+        self.assertEqual(
+            [(o["code"], o["practice_count"], o["scored_count"]) for o in objectives],
+            [("O1", 5, 1), ("O2", 1, 0)],
+        )
+        self.assertIsNone(services.get_domain_objectives(self.conn, 99))
+
+    def test_practices_are_paged_by_last_id(self) -> None:
+        first = services.get_objective_practices(self.conn, 1, self.assessment_id, 0, 2)
+        self.assertEqual(first["total"], 5)
+        self.assertEqual([p["id"] for p in first["items"]], [1, 2])
+        self.assertEqual(first["items"][1]["score"], 3)
+        self.assertIsNone(first["items"][0]["score"])
+
+        seen = [p["id"] for p in first["items"]]
+        after = first["next_after"]
+        while after is not None:
+            page = services.get_objective_practices(self.conn, 1, self.assessment_id, after, 2)
+            seen.extend(p["id"] for p in page["items"])
+            after = page["next_after"]
+        self.assertEqual(seen, [1, 2, 3, 4, 5])
+        self.assertIsNone(services.get_objective_practices(self.conn, 99))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app import history, retention, services
+from app.db import apply_migrations
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        apply_migrations(self.conn)
+        domain_id = self.conn.execute(
+            "INSERT INTO domain (code, name) VALUES ('D1', 'Domain');"
+        ).lastrowid
+        objective_id = self.conn.execute(
+            "INSERT INTO objective (domain_id, code, name) VALUES (?, 'O1', 'Objective');",
+            (domain_id,),
+        ).lastrowid
+        self.practice_id = self.conn.execute(
+            "INSERT INTO practice (objective_id, code, name) VALUES (?, 'P1', 'Practice');",
+            (objective_id,),
+        ).lastrowid
+        self.assessment_id = services.create_assessment(self.conn, "A", "2026-01-01", None)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def _score_at(self, score: int, created_at: str) -> None:
+        services.upsert_practice_score(
+            self.conn,
+            {"assessment_id": self.assessment_id, "practice_id": self.practice_id, "score": score},
+        )
+        self.conn.execute(
+            "UPDATE audit_log SET created_at = ? WHERE id = (SELECT MAX(id) FROM audit_log);",
+            (created_at,),
+        )
+        self.conn.commit()
+
+    def _score_as_of(self, as_of: str):
+        scores = history.reconstruct_scores(self.conn, self.assessment_id, as_of)
+        row = scores.get(self.practice_id)
+        return row["score"] if row else None
+
+    def test_reconstruct_from_checkpoint_and_replay(self) -> None:
+        self._score_at(1, "2026-01-10 10:00:00")
+        self.assertEqual(history.assessments_due(self.conn, min_changes=1), [self.assessment_id])
+        history.create_checkpoint(self.conn, self.assessment_id)
+        self.conn.execute("UPDATE score_checkpoint SET as_of = '2026-01-20 00:00:00';")
+        self.conn.commit()
+        self.assertEqual(history.assessments_due(self.conn, min_changes=1), [])
+
+        self._score_at(2, "2026-02-01 10:00:00")
+        self._score_at(3, "2026-03-01 10:00:00")
+
+        self.assertIsNone(self._score_as_of("2026-01-05 00:00:00"))
+        self.assertEqual(self._score_as_of("2026-01-15 00:00:00"), 1)
+        self.assertEqual(self._score_as_of("2026-01-25 00:00:00"), 1)
+        self.assertEqual(self._score_as_of("2026-02-15 00:00:00"), 2)
+        self.assertEqual(self._score_as_of("2026-03-15 00:00:00"), 3)
+
+        # Replaying after the checkpoint must not depend on rows before it.
+        self.conn.execute("DELETE FROM audit_log WHERE created_at < '2026-01-20';")
+        self.assertEqual(self._score_as_of("2026-02-15 00:00:00"), 2)
+
+        domains = services.get_domains_as_of(
+            self.conn, self.assessment_id, "2026-02-15 00:00:00"
+        )
+        practice = domains[0]["objectives"][0]["practices"][0]
+        self.assertEqual(practice["score"], 2)
+
+    def test_replay_reads_archived_history(self) -> None:
+        self._score_at(1, "2024-01-10 10:00:00")
+        self._score_at(2, "2024-02-10 10:00:00")
+        self._score_at(3, "2024-03-10 10:00:00")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive_dir = Path(tmpdir)
+            # As the retention job does: pin today's scores, then archive.
+            history.checkpoint_all(self.conn)
+            report = retention.archive_audit_log(
+                self.conn, older_than_days=30, archive_dir=archive_dir
+            )
+            self.assertEqual(report["archived_rows"], 3)
+
+            def score_as_of(as_of: str):
+                scores = history.reconstruct_scores(
+                    self.conn, self.assessment_id, as_of, archive_dir
+                )
+                row = scores.get(self.practice_id)
+                return row["score"] if row else None
+
+            self.assertIsNone(score_as_of("2024-01-05 00:00:00"))
+            self.assertEqual(score_as_of("2024-01-15 00:00:00"), 1)
+            self.assertEqual(score_as_of("2024-02-15 00:00:00"), 2)
+            self.assertEqual(score_as_of("2024-03-15 00:00:00"), 3)
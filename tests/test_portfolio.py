@@ -0,0 +1,76 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import statistics
+import unittest
+
+from app import portfolio, services
+from app.db import apply_migrations
+from app.querylog import ProfiledConnection
+from app.seed import TEST_SEED_PATH, load_seed_data, seed_reference_data, seed_test_records
+
+
+class TestPortfolio(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:", factory=ProfiledConnection)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON;")
+        apply_migrations(self.conn)
+        payload = load_seed_data(TEST_SEED_PATH)
+        seed_reference_data(self.conn, payload)
+        seed_test_records(self.conn, payload)
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_python_fallback_matches_reference_statistics(self) -> None:
+        result = portfolio.compute_portfolio(portfolio.load_columns(self.conn), use_numpy=False)
+        self.assertEqual(result["engine"], "python")
+        self.assertGreaterEqual(len(result["domains"]), 3)
+
+        for domain in result["domains"]:
+            scores = [
+                row["score"]
+                for row in self.conn.execute(
+                    """
+                    SELECT ps.score FROM practice_score ps
+                    JOIN practice p ON p.id = ps.practice_id
+                    JOIN objective o ON o.id = p.objective_id
+                    WHERE o.domain_id = ? AND ps.score IS NOT NULL;
+                    """,
+                    (domain["domain_id"],),
+                )
+            ]
+            self.assertEqual(domain["count"], len(scores))
+            self.assertAlmostEqual(domain["mean"], statistics.fmean(scores), places=3)
+            self.assertAlmostEqual(domain["std"], statistics.pstdev(scores), places=3)
+            self.assertAlmostEqual(
+                domain["p50"], statistics.quantiles(scores, n=4, method="inclusive")[1]
+                if len(scores) > 1 else scores[0],
+                places=3,
+            )
+        self.assertEqual(
+            sum(sum(period["histogram"]) for period in result["timeline"]), result["scores"]
+        )
+
+    @unittest.skipIf(portfolio.load_numpy() is None, "numpy not installed")
+    def test_numpy_engine_matches_fallback(self) -> None:
+        columns = portfolio.load_columns(self.conn)
+        vectorized = portfolio.compute_portfolio(columns, use_numpy=True)
+        fallback = portfolio.compute_portfolio(columns, use_numpy=False)
+        self.assertEqual(vectorized["engine"], "numpy")
+        for key in ("domains", "practices", "timeline"):
+            self.assertEqual(vectorized[key], fallback[key])
+
+    def test_result_is_cached_per_revision(self) -> None:
+        first = portfolio.get_portfolio(self.conn)
+        self.assertIs(portfolio.get_portfolio(self.conn), first)
+        services.upsert_practice_score(
+            self.conn, {"assessment_id": 1, "practice_id": 1, "score": 3}
+        )
+        second = portfolio.get_portfolio(self.conn)
+        self.assertIsNot(second, first)
+        self.assertNotEqual(second["revision"], first["revision"])
@@ -0,0 +1,101 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import budget, querylog
+from app.db import connect_readonly, init_db
+
+SLOW_SQL = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50000000)"
+    " SELECT count(*) FROM n;"
+)
+
+
+async def _call(app, path: str):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+class TestQueryBudget(unittest.TestCase):
+    def setUp(self) -> None:
+        budget.reset_budget_stats()
+        self.query_log = querylog.SlowQueryLog(threshold_ms=None)
+        querylog.set_slow_query_log(self.query_log)
+
+    def tearDown(self) -> None:
+        querylog.set_slow_query_log(None)
+
+    def test_policy_defaults_and_overrides(self) -> None:
+        env = {"APP_QUERY_BUDGETS": "/api/evolution=250,/api/assets=off"}
+        with mock.patch.dict(os.environ, env):
+            policy = budget.BudgetPolicy()
+        self.assertEqual(
+            budget.route_key("/t/acme/api/practices/12/missing-assets"),
+            "/api/practices/{id}/missing-assets",
+        )
+        self.assertEqual(policy.budget_for("/api/evolution"), 250)
+        self.assertIsNone(policy.budget_for("/api/assets"))
+        self.assertEqual(policy.budget_for("/api/portfolio"), 15000)
+        self.assertEqual(policy.budget_for("/api/assessments"), 5000)
+        self.assertIsNone(policy.budget_for("/api/admin/audit/storage"))
+
+    def test_runaway_query_is_interrupted_logged_and_counted(self) -> None:
+        with mock.patch.dict(os.environ, {"APP_QUERY_BUDGETS": "/api/evolution=50"}):
+            policy = budget.BudgetPolicy()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+
+            async def inner(scope, receive, send):
+                conn = connect_readonly(db_path)
+                try:
+                    budget.run_with_budget(conn, lambda c: c.execute(SLOW_SQL).fetchone())
+                    status = 200
+                except budget.QueryBudgetExceeded:
+                    status = 503
+                finally:
+                    conn.close()
+                await send({"type": "http.response.start", "status": status, "headers": []})
+                await send({"type": "http.response.body", "body": b""})
+
+            middleware = budget.QueryBudgetMiddleware(inner, policy)
+            self.assertEqual(asyncio.run(_call(middleware, "/t/acme/api/evolution")), 503)
+
+        stats = budget.budget_stats(policy)
+        self.assertEqual(stats["by_route"], {"/api/evolution": 1})
+        self.assertEqual(stats["overrides_ms"], {"/api/evolution": 50})
+        entry = self.query_log.entries()[-1]
+        self.assertTrue(entry["budget_exceeded"])
+        self.assertEqual((entry["route"], entry["budget_ms"]), ("/api/evolution", 50))
+        self.assertIn("WITH RECURSIVE", entry["sql"])
+
+    def test_no_budget_outside_requests(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conn = connect_readonly(init_db(Path(tmpdir) / "app.db"))
+            try:
+                row = budget.run_with_budget(conn, lambda c: c.execute("SELECT 1;").fetchone())
+            finally:
+                conn.close()
+        self.assertEqual(row[0], 1)
+        self.assertEqual(budget.budget_stats()["violations"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
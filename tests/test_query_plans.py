@@ -0,0 +1,178 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+
+Runs every service read query against a generated large database and checks
+the captured EXPLAIN QUERY PLAN output for unexpected full table scans.
+Set APP_QUERY_PLAN_SCALE to grow the generated data set.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app import querylog, services
+from app.db import apply_migrations, connect
+
+SCALE = max(1, int(os.getenv("APP_QUERY_PLAN_SCALE", "1")))
+
+# Queries allowed to walk a whole table or index, by SQL fragment: top-level
+# listings over their driving table, the practice count of the trends and the
+# recent-changes feed, whose ordered index walk stops after LIMIT rows.
+ALLOWED_FULL_SCANS = {
+    "FROM domain d": {"d"},
+    "FROM assessment ORDER BY": {"assessment"},
+    "FROM assessment a": {"a"},
+    "FROM asset ORDER BY": {"asset"},
+    "FROM asset a": {"a"},
+    "SELECT COUNT(*) AS count FROM practice;": {"practice"},
+    "FROM audit_log ORDER BY created_at DESC, id DESC LIMIT ?": {"audit_log"},
+}
+
+
+def _allowed_scans(sql: str) -> set:
+    allowed: set = set()
+    for fragment, tables in ALLOWED_FULL_SCANS.items():
+        if fragment in sql:
+            allowed |= tables
+    return allowed
+
+
+def _populate(conn) -> None:
+    for d in range(11):
+        domain_id = conn.execute(
+            "INSERT INTO domain (code, name) VALUES (?, ?);", (f"D{d}", f"Domain {d}")
+        ).lastrowid
+        for o in range(4):
+            objective_id = conn.execute(
+                "INSERT INTO objective (domain_id, code, name) VALUES (?, ?, ?);",
+                (domain_id, f"D{d}-O{o}", f"Objective {o}"),
+            ).lastrowid
+            conn.executemany(
+                "INSERT INTO practice (objective_id, code, name) VALUES (?, ?, ?);",
+                [(objective_id, f"D{d}-O{o}-P{p}", f"Practice {p}") for p in range(6)],
+            )
+    practice_ids = [row[0] for row in conn.execute("SELECT id FROM practice;")]
+    for a in range(25 * SCALE):
+        assessment_id = conn.execute(
+            "INSERT INTO assessment (name, assessment_date) VALUES (?, ?);",
+            (f"Assessment {a}", f"2025-{(a % 12) + 1:02d}-01"),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO practice_score (assessment_id, practice_id, score, target_score)"
+            " VALUES (?, ?, ?, 3);",
+            [(assessment_id, pid, pid % 4) for pid in practice_ids],
+        )
+    for s in range(60 * SCALE):
+        asset_id = conn.execute(
+            "INSERT INTO asset (name, criticality) VALUES (?, ?);",
+            (f"Asset {s}", s % 5),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO asset_practice (asset_id, practice_id) VALUES (?, ?);",
+            [(asset_id, pid) for pid in practice_ids[s % 7 :: 7]],
+        )
+        conn.executemany(
+            "INSERT INTO asset_practice_score (assessment_id, practice_id, asset_id, score)"
+            " VALUES (1, ?, ?, ?);",
+            [(pid, asset_id, (pid + s) % 4) for pid in practice_ids[s % 3 :: 3]],
+        )
+    conn.executemany(
+        "INSERT INTO audit_log (entity_type, entity_id, action, new_data, created_at)"
+        " VALUES ('practice_score', ?, 'update', '{}', datetime('now', ?));",
+        [(i, f"-{i % 400} days") for i in range(3000 * SCALE)],
+    )
+    conn.commit()
+
+
+class TestQueryPlans(unittest.TestCase):
+    def test_service_reads_avoid_unexpected_scans(self) -> None:
+        query_log = querylog.SlowQueryLog(threshold_ms=0, buffer_size=1000)
+        querylog.set_slow_query_log(query_log)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conn = connect(Path(tmpdir) / "app.db")
+            try:
+                apply_migrations(conn)
+                _populate(conn)
+                query_log.clear()
+
+                services.get_domains(conn, 1)
+                services.get_domains(conn, None)
+                services.get_domain_summaries(conn, 1)
+                services.get_domain_objectives(conn, 1, 1)
+                services.get_objective_practices(conn, 1, 1, 0, 3)
+                services.list_assessments(conn)
+                services.assessment_exists(conn, 1)
+                services.list_assets(conn)
+                services.get_asset_coverage(conn)
+                services.get_dashboard(conn, 1)
+                services.get_backlog(conn, 1)
+                services.get_assessment_trends(conn)
+                services.get_evolution(conn, 30)
+                services.get_recent_changes(conn, 100)
+                services.get_asset_score_rollup(conn, 1, "en")
+                services.get_asset_scores(conn, 1, 1)
+                services.upsert_practice_score(
+                    conn, {"assessment_id": 1, "practice_id": 1, "score": 2}
+                )
+            finally:
+                conn.close()
+                querylog.set_slow_query_log(None)
+
+        entries = query_log.entries()
+        self.assertGreater(len(entries), 10)
+        unexpected = [
+            (entry["sql"], entry["plan"])
+            for entry in entries
+            if set(entry["scanned_tables"]) - _allowed_scans(entry["sql"])
+        ]
+        self.assertEqual(unexpected, [])
+
+    def test_profiling_covers_fetching_and_executemany(self) -> None:
+        query_log = querylog.SlowQueryLog(threshold_ms=20)
+        querylog.set_slow_query_log(query_log)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conn = connect(Path(tmpdir) / "app.db")
+            try:
+                apply_migrations(conn)
+                # Each row costs 2 ms to produce; execute() only steps to the first.
+                conn.create_function("slow", 1, lambda value: time.sleep(0.002) or value)
+                sql = (
+                    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 30)"
+                    " SELECT slow(i) FROM n;"
+                )
+                self.assertEqual(len([row for row in conn.execute(sql)]), 30)
+                conn.execute("SELECT slow(1);").fetchone()
+
+                query_log.threshold_ms = 0
+                conn.executemany("INSERT INTO asset (name) VALUES (?);", [("a",), ("b",)])
+            finally:
+                conn.close()
+                querylog.set_slow_query_log(None)
+
+        entries = query_log.entries()
+        self.assertEqual(len(entries), 2)
+        self.assertGreaterEqual(entries[0]["elapsed_ms"], 20)
+        self.assertIn("slow(i)", entries[0]["sql"])
+        self.assertEqual(entries[1]["params_shape"], ["str"])
+
+    def test_full_scan_detection(self) -> None:
+        self.assertEqual(querylog.full_scans(["SCAN audit_log"]), ["audit_log"])
+        self.assertEqual(
+            querylog.full_scans(["SCAN audit_log USING INDEX idx_audit_log_created_at"]),
+            ["audit_log"],
+        )
+        self.assertEqual(
+            querylog.full_scans(["SCAN p USING COVERING INDEX idx_practice_objective"]), ["p"]
+        )
+        self.assertEqual(
+            querylog.full_scans(["SEARCH p USING INDEX idx_practice_objective (objective_id=?)"]),
+            [],
+        )
+        self.assertEqual(
+            querylog.full_scans(["SEARCH o USING AUTOMATIC COVERING INDEX (domain_id=?)"]),
+            ["o"],
+        )
+        self.assertEqual(querylog.params_shape((1, "x", None)), ["int", "str", "NoneType"])
@@ -0,0 +1,59 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import executors
+from app.db import connect, connect_readonly, init_db
+
+
+class TestReadConnections(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self._env = mock.patch.dict(os.environ, {"APP_DATA_DIR": self._tmp.name})
+        self._env.start()
+        self.db_path = init_db(Path(self._tmp.name) / "app.db")
+
+    def tearDown(self) -> None:
+        self._env.stop()
+        self._tmp.cleanup()
+
+    def _count_assets(self, conn) -> int:
+        return conn.execute("SELECT COUNT(*) FROM asset;").fetchone()[0]
+
+    def test_reader_is_read_only_and_wal(self) -> None:
+        reader = connect_readonly(self.db_path)
+        try:
+            self.assertEqual(reader.execute("PRAGMA journal_mode;").fetchone()[0], "wal")
+            with self.assertRaises(sqlite3.OperationalError):
+                reader.execute("INSERT INTO asset (name) VALUES ('x');")
+        finally:
+            reader.close()
+
+    def test_snapshot_is_stable_while_writer_commits(self) -> None:
+        writer = connect(self.db_path)
+
+        def analytics(conn):
+            before = self._count_assets(conn)
+            # The writer is not blocked by the open read transaction...
+            writer.execute("INSERT INTO asset (name) VALUES ('during');")
+            writer.commit()
+            # ...and the reader keeps seeing its snapshot.
+            return before, self._count_assets(conn)
+
+        try:
+            self.assertEqual(executors.call_with_reader(analytics), (0, 0))
+            self.assertEqual(executors.call_with_reader(self._count_assets), 1)
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
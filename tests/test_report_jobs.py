@@ -0,0 +1,143 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import os
+import tempfile
+import time
+import unittest
+import zipfile
+from pathlib import Path
+
+from app import jobs, reports, services
+from app.db import connect, connect_readonly, init_db
+from app.seed import import_translations
+
+
+class TestReportJobs(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db_path = init_db(self.root / "app.db")
+        self.report_dir = self.root / "reports"
+        conn = connect(self.db_path)
+        try:
+            conn.execute("INSERT INTO domain (id, code, name) VALUES (1, 'GOV', 'Gov <&>');")
+            conn.execute("INSERT INTO objective (domain_id, code, name) VALUES (1, 'O1', 'O');")
+            conn.execute("INSERT INTO practice (objective_id, code, name) VALUES (1, 'P1', 'P');")
+            self.ids = [
+                services.create_assessment(conn, name, "2026-01-01", None) for name in ("Q1", "Q2")
+            ]
+            services.upsert_practice_score(
+                conn,
+                {"assessment_id": self.ids[0], "practice_id": 1, "score": 1, "target_score": 3},
+            )
+        finally:
+            conn.close()
+        self.manager = jobs.JobManager(workers=1)
+
+    def tearDown(self) -> None:
+        self.manager.shutdown()
+        self._tmp.cleanup()
+
+    def _plan(self):
+        conn = connect_readonly(self.db_path)
+        try:
+            return reports.plan_reports(conn, self.ids, self.report_dir)
+        finally:
+            conn.close()
+
+    def _wait(self, job_id: str):
+        job_dir = jobs.get_job_dir(self.report_dir)
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            job = jobs.load_job(job_id, job_dir)
+            if job["status"] != "running":
+                return job
+            time.sleep(0.05)
+        self.fail("report job did not finish")
+
+    def test_report_renders_escaped_html_with_charts(self) -> None:
+        conn = connect_readonly(self.db_path)
+        try:
+            document = reports.render_report(conn, self.ids[0])
+        finally:
+            conn.close()
+        self.assertIn("<svg", document)
+        self.assertIn("Gov &lt;&amp;&gt;", document)
+        self.assertIn("<h2>Backlog</h2>", document)
+
+    def test_job_renders_on_pool_then_reuses_artifacts(self) -> None:
+        job = self.manager.submit_reports(str(self.db_path), self._plan(), self.report_dir)
+        done = self._wait(job["id"])
+        self.assertEqual((done["status"], done["done"], done["total"]), ("done", 2, 2))
+        self.assertEqual(jobs.job_view(done)["progress"], 1.0)
+
+        archive = jobs.result_path(done, jobs.get_job_dir(self.report_dir))
+        with zipfile.ZipFile(archive) as bundle:
+            self.assertEqual(len(bundle.namelist()), 2)
+
+        # Unchanged data: the next job never reaches the pool.
+        again = self.manager.submit_reports(str(self.db_path), self._plan(), self.report_dir)
+        self.assertEqual(again["status"], "done")
+        self.assertTrue(all(artifact["reused"] for artifact in again["artifacts"]))
+
+        # A score change gives a new revision key and a fresh render.
+        conn = connect(self.db_path)
+        try:
+            services.upsert_practice_score(
+                conn, {"assessment_id": self.ids[0], "practice_id": 1, "score": 2}
+            )
+        finally:
+            conn.close()
+        self.assertFalse(any(item["cached"] for item in self._plan()))
+        stats = self.manager.stats()
+        self.assertEqual((stats["rendered"], stats["reused"], stats["completed"]), (2, 2, 2))
+
+    def test_build_renders_the_revision_it_reads(self) -> None:
+        planned = self._plan()[0]
+        conn = connect(self.db_path)
+        try:
+            services.upsert_practice_score(
+                conn, {"assessment_id": self.ids[0], "practice_id": 1, "score": 3}
+            )
+        finally:
+            conn.close()
+
+        result = reports.build_report(str(self.db_path), self.ids[0], planned["path"])
+        current = self._plan()[0]
+        self.assertFalse(Path(planned["path"]).exists())
+        self.assertEqual(result["path"], current["path"])
+        self.assertTrue(current["cached"])
+        document = Path(result["path"]).read_text(encoding="utf-8")
+        self.assertIn("<td>P1</td><td>P</td><td>3</td>", document)
+
+        # Translated framework texts are part of the key as well.
+        conn = connect(self.db_path)
+        try:
+            import_translations(
+                conn, {"lang": "en", "domains": [{"code": "GOV", "name": "Governance"}]}
+            )
+        finally:
+            conn.close()
+        self.assertFalse(self._plan()[0]["cached"])
+
+    def test_only_expired_reports_of_older_revisions_are_pruned(self) -> None:
+        self.report_dir.mkdir()
+        old = self.report_dir / f"assessment-{self.ids[0]}-old.html"
+        recent = self.report_dir / f"assessment-{self.ids[0]}-recent.html"
+        other = self.report_dir / f"assessment-{self.ids[1]}-old.html"
+        for path in (old, recent, other):
+            path.write_text("<html></html>", encoding="utf-8")
+        expired = time.time() - reports.REPORT_TTL_SECONDS - 60
+        os.utime(old, (expired, expired))
+        os.utime(other, (expired, expired))
+
+        result = reports.build_report(str(self.db_path), self.ids[0], self._plan()[0]["path"])
+        self.assertTrue(Path(result["path"]).exists())
+        self.assertEqual((old.exists(), recent.exists(), other.exists()), (False, True, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
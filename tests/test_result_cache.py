@@ -0,0 +1,97 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import sqlite3
+import unittest
+from unittest import mock
+
+from app import cache, services
+from app.db import apply_migrations
+from app.querylog import ProfiledConnection
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = sqlite3.connect(":memory:", factory=ProfiledConnection)
+        self.conn.row_factory = sqlite3.Row
+        apply_migrations(self.conn)
+        cache.invalidate()
+
+    def tearDown(self) -> None:
+        cache.invalidate()
+        self.conn.close()
+
+    def _counts(self, fn):
+        stats = cache.cache_stats()["functions"].get(fn.cache_name, {})
+        return tuple(stats.get(event, 0) for event in ("hits", "misses", "stale"))
+
+    def _delta(self, fn, before):
+        return tuple(after - start for after, start in zip(self._counts(fn), before))
+
+    def test_hits_until_a_read_table_changes(self) -> None:
+        services.create_asset(self.conn, "Alpha", None, None, None)
+        before = self._counts(services.list_assets)
+        first = services.list_assets(self.conn)
+        self.assertIs(services.list_assets(self.conn), first)
+
+        # Writes to tables the function does not read keep the entry.
+        services.create_assessment(self.conn, "Q1", "2026-01-01", None)
+        self.assertIs(services.list_assets(self.conn), first)
+
+        # Any write to a table it reads, even raw SQL, replaces it.
+        self.conn.execute("UPDATE asset SET name = 'Renamed';")
+        self.conn.commit()
+        fresh = services.list_assets(self.conn)
+        self.assertEqual(fresh[0]["name"], "Renamed")
+
+        self.assertEqual(self._delta(services.list_assets, before), (2, 2, 1))
+        self.assertEqual(cache.cache_stats()["entries"], 1)
+
+    def test_memory_databases_never_share_entries(self) -> None:
+        services.create_asset(self.conn, "Alpha", None, None, None)
+        self.assertEqual(len(services.list_assets(self.conn)), 1)
+        for _ in range(3):
+            # A new connection may reuse the id() of a collected one.
+            other = sqlite3.connect(":memory:", factory=ProfiledConnection)
+            other.row_factory = sqlite3.Row
+            apply_migrations(other)
+            self.assertEqual(services.list_assets(other), [])
+            other.close()
+            del other
+
+        # Connections that cannot carry a token are simply not cached.
+        plain = sqlite3.connect(":memory:")
+        plain.row_factory = sqlite3.Row
+        apply_migrations(plain)
+        before = self._counts(services.list_assets)
+        self.assertEqual(services.list_assets(plain), [])
+        self.assertEqual(self._delta(services.list_assets, before), (0, 0, 0))
+        plain.close()
+
+    def test_lru_eviction_respects_entry_and_size_limits(self) -> None:
+        small = cache.ResultCache(max_entries=2, max_bytes=1000)
+        for index in range(3):
+            small.put("f", ("f", index), (0,), [index])
+        self.assertEqual(small.get("f", ("f", 0), (0,)), (False, None))
+        self.assertEqual(small.get("f", ("f", 2), (0,)), (True, [2]))
+        small.put("f", ("f", "big"), (0,), "x" * 996)
+        stats = small.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertLessEqual(stats["bytes"], 1000)
+        self.assertEqual(stats["functions"]["f"]["evictions"], 3)
+        self.assertEqual(stats["functions"]["f"]["hit_rate"], 0.5)
+
+    def test_rolling_window_varies_with_the_day(self) -> None:
+        before = self._counts(services.get_evolution)
+        services.get_evolution(self.conn, days=7)
+        services.get_evolution(self.conn, days=7)
+        with mock.patch.object(services, "datetime") as clock:
+            clock.now.return_value.date.return_value.isoformat.return_value = "2999-01-01"
+            services.get_evolution(self.conn, days=7)
+        self.assertEqual(self._delta(services.get_evolution, before)[:2], (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
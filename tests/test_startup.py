@@ -0,0 +1,91 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from app.main import StaticFileCache
+from app.startup import Startup, StartupGate, StartupProfile
+
+
+async def _call(app, path: str):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+class TestStartup(unittest.TestCase):
+    def test_gate_holds_api_until_init_then_warms(self) -> None:
+        release = threading.Event()
+        seen = []
+        startup = Startup(
+            release.wait,
+            [("cache", lambda: seen.append("warm")), ("broken", lambda: 1 / 0)],
+            profile=StartupProfile(),
+        )
+
+        async def inner(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        gate = StartupGate(inner, startup)
+
+        async def scenario():
+            self.assertEqual(await _call(gate, "/api/healthz"), 200)
+            pending = asyncio.ensure_future(_call(gate, "/api/domains"))
+            await asyncio.sleep(0.05)
+            self.assertFalse(pending.done())
+            self.assertEqual(startup.status()["status"], "starting")
+            release.set()
+            return await pending
+
+        startup.start()
+        self.assertEqual(asyncio.run(scenario()), 200)
+        self.assertTrue(startup.wait(5))
+        status = startup.status()
+        self.assertEqual((status["status"], status["db_ready"]), ("ready", True))
+        self.assertEqual(seen, ["warm"])
+        phases = {phase["name"]: phase for phase in status["phases"]}
+        self.assertEqual(set(phases), {"init_db", "warm_cache", "warm_broken"})
+        self.assertIn("ZeroDivisionError", phases["warm_broken"]["error"])
+
+    def test_failed_init_answers_503(self) -> None:
+        def fail():
+            raise RuntimeError("disk full")
+
+        startup = Startup(fail, profile=StartupProfile())
+        startup.run()
+        gate = StartupGate(None, startup)
+        self.assertEqual(asyncio.run(_call(gate, "/t/acme/api/assets")), 503)
+        self.assertEqual(startup.status()["error"], "disk full")
+
+    def test_static_cache_reloads_on_change(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "index.html"
+            path.write_text("<p>one</p>", encoding="utf-8")
+            static = StaticFileCache(path)
+            first = static.get()
+            self.assertIs(static.get(), first)
+            path.write_text("<p>two</p>", encoding="utf-8")
+            os.utime(path, ns=(first[0] + 10**9, first[0] + 10**9))
+            second = static.get()
+            self.assertEqual(second[1], b"<p>two</p>")
+            self.assertNotEqual(second[2], first[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
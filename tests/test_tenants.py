@@ -0,0 +1,141 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import tenants, writer
+from app.config import get_db_path
+from app.db import connect
+
+
+class TestTenants(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self._tmp.name)
+        self._env = mock.patch.dict(
+            os.environ,
+            {
+                "APP_DATA_DIR": str(self.data_dir),
+                "APP_MULTI_TENANT": "1",
+                "APP_DB_HANDLES": "2",
+            },
+        )
+        self._env.start()
+
+    def tearDown(self) -> None:
+        writer.close_write_queues()
+        with tenants._ready_lock:
+            tenants._ready.clear()
+        self._env.stop()
+        self._tmp.cleanup()
+
+    def _request(self, path: str, headers=()):
+        seen = {}
+
+        async def downstream(scope, receive, send):
+            seen["db_path"] = get_db_path()
+            seen["root_path"] = scope.get("root_path", "")
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "path": path,
+            "root_path": "",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        }
+        asyncio.run(tenants.TenantMiddleware(downstream)(scope, receive, send))
+        return messages[0]["status"], seen
+
+    def test_requests_are_routed_to_tenant_databases(self) -> None:
+        self.assertTrue(tenants.provision_tenant("Acme"))
+        self.assertTrue(tenants.provision_tenant("globex"))
+        self.assertFalse(tenants.provision_tenant("acme"))
+        status, seen = self._request("/api/domains", [("X-Tenant", "Acme")])
+        self.assertEqual(status, 200)
+        acme_db = self.data_dir / "tenants" / "acme" / "app.db"
+        self.assertEqual(seen["db_path"], acme_db)
+        self.assertTrue(tenants.is_ready("acme"))
+
+        status, seen = self._request("/t/globex/api/domains")
+        self.assertEqual(status, 200)
+        self.assertEqual(seen["root_path"], "/t/globex")
+        self.assertEqual(seen["db_path"], self.data_dir / "tenants" / "globex" / "app.db")
+
+        conn = connect(acme_db)
+        try:
+            domains = conn.execute("SELECT COUNT(*) FROM domain;").fetchone()[0]
+        finally:
+            conn.close()
+        self.assertGreater(domains, 0)
+
+        self.assertEqual(self._request("/api/domains")[0], 400)
+        self.assertEqual(self._request("/api/domains", [("X-Tenant", "../x")])[0], 400)
+        self.assertEqual(self._request("/api/healthz")[0], 200)
+
+    def test_unknown_tenants_are_not_created(self) -> None:
+        self.assertEqual(self._request("/api/domains", [("X-Tenant", "nobody")])[0], 404)
+        self.assertEqual(self._request("/t/nobody/api/domains")[0], 404)
+        self.assertFalse((self.data_dir / "tenants" / "nobody").exists())
+
+    def test_ready_tenants_are_bounded(self) -> None:
+        for key in ("t1", "t2", "t3"):
+            tenants.provision_tenant(key)
+        self.assertEqual(tenants.ready_tenants(), ["t2", "t3"])
+        # An evicted tenant is checked again and served on its next request.
+        self.assertEqual(self._request("/api/domains", [("X-Tenant", "t1")])[0], 200)
+        self.assertEqual(tenants.ready_tenants(), ["t1", "t3"])
+
+    def test_readiness_probe_needs_no_tenant(self) -> None:
+        from app.main import create_app
+
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/readyz",
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+        # Startup is not run here, so the probe answers "not ready yet".
+        asyncio.run(create_app()(scope, receive, send))
+        self.assertIn(messages[0]["status"], (200, 503))
+        self.assertEqual(self._request("/api/readyz")[0], 200)
+
+    def test_write_queues_are_bounded(self) -> None:
+        paths = [self.data_dir / f"db{n}.db" for n in range(4)]
+        for path in paths:
+            writer.run_write(lambda conn: conn.execute("SELECT 1;"), db_path=path)
+        open_paths = [stats["db_path"] for stats in writer.write_queue_stats()]
+        self.assertEqual(open_paths, [str(paths[2]), str(paths[3])])
+        # An evicted database reopens transparently on the next write.
+        writer.run_write(lambda conn: conn.execute("SELECT 1;"), db_path=paths[0])
+        open_paths = [stats["db_path"] for stats in writer.write_queue_stats()]
+        self.assertEqual(open_paths, [str(paths[3]), str(paths[0])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Author: eric vanoverbeke
+Date: 2026-10-19
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app import services
+from app.db import connect, init_db
+from app.writer import WriteQueue
+
+
+class TestWriteQueue(unittest.TestCase):
+    def test_group_commit_resolves_every_future(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            write_queue = WriteQueue(db_path, batch_ms=20, batch_size=16)
+            futures = []
+            futures_lock = threading.Lock()
+
+            def _submit(worker: int) -> None:
+                for index in range(10):
+                    future = write_queue.submit(
+                        services.create_assessment, f"A{worker}-{index}", "2026-01-01", None
+                    )
+                    with futures_lock:
+                        futures.append(future)
+
+            threads = [threading.Thread(target=_submit, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            ids = {future.result(timeout=5) for future in futures}
+            stats = write_queue.stats()
+            write_queue.close()
+
+            self.assertEqual(len(ids), 40)
+            self.assertEqual(stats["committed"], 40)
+            self.assertLess(stats["batches"], 40)
+            conn = connect(db_path)
+            try:
+                count = conn.execute("SELECT COUNT(*) FROM assessment;").fetchone()[0]
+                audits = conn.execute("SELECT COUNT(*) FROM audit_log;").fetchone()[0]
+            finally:
+                conn.close()
+            self.assertEqual(count, 40)
+            self.assertEqual(audits, 40)
+
+    def test_failed_operation_does_not_abort_batch(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            write_queue = WriteQueue(db_path, batch_ms=50, batch_size=8, durability="normal")
+            ok = write_queue.submit(services.create_asset, "Asset", None, None, None)
+            bad = write_queue.submit(services.link_asset_practice, 999, 999)
+            ok_after = write_queue.submit(services.create_asset, "Other", None, None, None)
+
+            self.assertGreater(ok.result(timeout=5), 0)
+            with self.assertRaises(sqlite3.IntegrityError):
+                bad.result(timeout=5)
+            self.assertGreater(ok_after.result(timeout=5), 0)
+            write_queue.close()
+
+            conn = connect(db_path)
+            try:
+                assets = conn.execute("SELECT COUNT(*) FROM asset;").fetchone()[0]
+                links = conn.execute(
+                    "SELECT COUNT(*) FROM audit_log WHERE entity_type = 'asset_practice';"
+                ).fetchone()[0]
+            finally:
+                conn.close()
+            self.assertEqual(assets, 2)
+            self.assertEqual(links, 0)
+
+    def test_operation_rollback_only_undoes_its_own_writes(self) -> None:
+        def _create_then_roll_back(conn) -> None:
+            services.create_asset(conn, "Undone", None, None, None)
+            conn.rollback()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            write_queue = WriteQueue(db_path, batch_ms=50, batch_size=8, durability="normal")
+            first = write_queue.submit(services.create_asset, "First", None, None, None)
+            undone = write_queue.submit(_create_then_roll_back)
+            last = write_queue.submit(services.create_asset, "Last", None, None, None)
+            for future in (first, undone, last):
+                future.result(timeout=5)
+            stats = write_queue.stats()
+            write_queue.close()
+
+            conn = connect(db_path)
+            try:
+                names = [row[0] for row in conn.execute("SELECT name FROM asset ORDER BY id;")]
+            finally:
+                conn.close()
+            self.assertEqual(stats["batches"], 1)
+            self.assertEqual(names, ["First", "Last"])
+
+    def test_writer_that_cannot_open_fails_its_callers(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            db_path = init_db(Path(tmpdir) / "app.db")
+            write_queue = WriteQueue(db_path, batch_ms=0)
+            error = sqlite3.OperationalError("unable to open database file")
+            with mock.patch("app.writer.connect", side_effect=error):
+                future = write_queue.submit(services.create_asset, "Lost", None, None, None)
+                with self.assertRaises(sqlite3.OperationalError):
+                    future.result(timeout=5)
+
+            # The dead thread was cleared: the next submit starts a fresh one.
+            asset_id = write_queue.call(services.create_asset, "Kept", None, None, None)
+            write_queue.close()
+            self.assertGreater(asset_id, 0)
+
+    def test_busy_database_is_retried_with_backoff(self) -> None:
+        env = {"APP_DB_BUSY_TIMEOUT_MS": "20", "APP_DB_BUSY_RETRIES": "8"}
+        with tempfile.TemporaryDirectory() as tmpdir, mock.patch.dict(os.environ, env):
+            db_path = init_db(Path(tmpdir) / "app.db")
+            # Stands in for another server process holding the write lock.
+            other = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            other.execute("BEGIN IMMEDIATE;")
+            release = threading.Timer(0.2, other.execute, args=("COMMIT;",))
+            release.start()
+            write_queue = WriteQueue(db_path, batch_ms=0)
+            try:
+                asset_id = write_queue.call(services.create_asset, "Asset", None, None, None)
+                self.assertGreater(asset_id, 0)
+                self.assertGreater(write_queue.stats()["busy_retries"], 0)
+            finally:
+                release.join()
+                other.close()
+                write_queue.close()